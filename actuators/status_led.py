@@ -20,16 +20,31 @@ class StatusLED:
         
         if state == "IDLE":
             soil_ok = kwargs.get('soil_ok', False)
-            gpio_central.set_led_green(soil_ok)
-            gpio_central.set_led_white(kwargs.get('online', False))
+            # Vert + blanc appliqués ensemble (une seule écriture de groupe)
+            gpio_central.set_leds({
+                'green': soil_ok,
+                'white': kwargs.get('online', False)
+            })
             
         elif state == "IRRIGATING":
             gpio_central.set_led_yellow(True, blink=True, blink_interval=0.5)
             logger.info("🟡 Irrigation en cours")
             
         elif state == "ERROR":
-            gpio_central.set_led_red(True, blink=True, blink_interval=0.3)
-            logger.error("🔴 Erreur système")
+            error_code = kwargs.get('error_code')
+            if error_code:
+                # Code d'erreur lisible: N impulsions puis pause
+                gpio_central.show_error_code(int(error_code))
+            else:
+                gpio_central.set_led_red(True, blink=True, blink_interval=0.3)
+            logger.error(f"🔴 Erreur système{f' (code {error_code})' if error_code else ''}")
+            
+        elif state == "STARTUP":
+            # Chenillard non bloquant sur les 4 LEDs
+            leds = ('red', 'yellow', 'green', 'white')
+            frames = [(tuple(i == j for j in range(len(leds))), 0.15) for i in range(len(leds))]
+            gpio_central.play_led_sequence('startup', leds, frames)
+            logger.info("🚦 Démarrage système")
             
         elif state == "NO_WATER":
             gpio_central.set_led_red(True)
@@ -99,9 +114,6 @@ class StatusLED:
     def cleanup(self):
         """Éteint toutes les LEDs"""
         from core.gpio_manager import gpio_central
-        gpio_central.set_led_red(False)
-        gpio_central.set_led_green(False)
-        gpio_central.set_led_yellow(False)
-        gpio_central.set_led_white(False)   
+        gpio_central.set_leds({'red': False, 'green': False, 'yellow': False, 'white': False})
 # Instance globale
 status_led = StatusLED()
\ No newline at end of file
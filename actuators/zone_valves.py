@@ -0,0 +1,85 @@
+"""
+Électrovannes des zones d'arrosage (un relais par zone) - UTILISE GPIO CENTRAL
+La pompe reste pilotée par water_pump; l'ordonnancement est dans decision_engine/zones.py
+"""
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List
+from config.settings import config
+from core.gpio_manager import gpio_central
+
+logger = logging.getLogger(__name__)
+
+class ZoneValves:
+    """Commande groupée des vannes (un seul write_many par changement)"""
+
+    def __init__(self, pins: Dict[str, int]):
+        self.pins = dict(pins)
+        self._open: Dict[str, float] = {}     # zone -> instant d'ouverture
+        self._lock = threading.Lock()
+        self.total_open_time: Dict[str, float] = {zone: 0.0 for zone in self.pins}
+
+        logger.info(f"✅ Vannes initialisées: "
+                    f"{', '.join(f'{zone}=GPIO{pin}' for zone, pin in self.pins.items())}")
+
+    def switch(self, open_zones: Iterable[str] = (), close_zones: Iterable[str] = ()) -> bool:
+        """
+        Ouvre / ferme des vannes dans le même appel GPIO
+        (relève d'une zone par la suivante sans couper la pompe)
+        """
+        open_zones = [zone for zone in open_zones if zone in self.pins]
+        close_zones = [zone for zone in close_zones if zone in self.pins]
+        values = {self.pins[zone]: False for zone in close_zones}
+        values.update({self.pins[zone]: True for zone in open_zones})
+        if not values:
+            return True
+
+        try:
+            gpio_central.write_many(values)
+        except Exception as e:
+            logger.error(f"❌ Erreur commande vannes: {e}")
+            return False
+
+        now = time.time()
+        with self._lock:
+            for zone in close_zones:
+                opened = self._open.pop(zone, None)
+                if opened is not None:
+                    self.total_open_time[zone] += now - opened
+            for zone in open_zones:
+                self._open.setdefault(zone, now)
+        return True
+
+    def open(self, zone: str) -> bool:
+        return self.switch(open_zones=[zone])
+
+    def close(self, zone: str) -> bool:
+        return self.switch(close_zones=[zone])
+
+    def close_all(self) -> bool:
+        return self.switch(close_zones=list(self.pins))
+
+    def open_zones(self) -> List[str]:
+        with self._lock:
+            return list(self._open)
+
+    def get_status(self) -> dict:
+        with self._lock:
+            return {
+                zone: {
+                    "pin": pin,
+                    "open": zone in self._open,
+                    "total_open_time": round(self.total_open_time[zone], 1)
+                }
+                for zone, pin in self.pins.items()
+            }
+
+    def cleanup(self):
+        """Ferme toutes les vannes"""
+        if self.open_zones():
+            logger.info("🛑 Fermeture des vannes...")
+        self.close_all()
+
+# Instance globale unique
+zone_valves = ZoneValves(config.gpio.ZONE_VALVE_PINS)
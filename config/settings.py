@@ -2,7 +2,8 @@
 Configuration centrale du système - VERSION FINALE
 """
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,6 +25,11 @@ class GPIOConfig:
     
     # Actionneurs
     PUMP_RELAY_PIN: int = 26          # GPIO26
+    
+    # Électrovannes des zones (relais, pompe commune): {zone: GPIO}
+    # Vide: installation à pompe unique, aucune broche réservée. Exemple câblé:
+    #   {"potager": 5, "aromatiques": 6, "massif": 13}   # GPIO5, GPIO6, GPIO13
+    ZONE_VALVE_PINS: Dict[str, int] = field(default_factory=dict)
 
 @dataclass
 class PlantProfile:
@@ -48,11 +54,99 @@ class IrrigationSettings:
     
     # Gestion eau
     MIN_WATER_LEVEL: float = 20.0       # % minimal dans réservoir
+    PUMP_FLOW_LPM: float = 0.0          # débit de la pompe (L/min, 0: volume non calculé)
+    
+    # Échantillonnage du sol en rafale (0 ou 1: lecture unique)
+    SOIL_BURST_SAMPLES: int = 200       # lectures par mesure
+    SOIL_BURST_WINDOW: float = 0.1      # durée de la rafale (s)
     
     # Mode hors ligne
     OFFLINE_MODE_ENABLED: bool = True
     HISTORY_DAYS: int = 7               # Jours d'historique à conserver
     DATABASE_CLEANUP_INTERVAL: int = 3600  # Nettoyage toutes les heures
+    ALERT_UPDATE_INTERVAL: int = 300    # Écriture max d'une alerte persistante (s)
+
+@dataclass
+class SensorFilterConfig:
+    """
+    Filtrage des mesures par capteur: {capteur: {champ: [(filtre, paramètres), ...]}}
+    Filtres: median, ema, hampel, rate_limit (voir sensors/filters.py)
+    """
+    chains: Dict[str, Dict[str, List[Tuple[str, Dict[str, float]]]]] = field(default_factory=lambda: {
+        "dht22": {
+            "temperature": [("hampel", {"window": 7, "n_sigmas": 3.0}),
+                            ("rate_limit", {"max_rate": 0.05}),   # 3°C/min max
+                            ("ema", {"alpha": 0.4})],
+            "humidity": [("hampel", {"window": 7, "n_sigmas": 3.0}),
+                         ("ema", {"alpha": 0.4})],
+        },
+        # Capteurs numériques: médiane = vote majoritaire sur les dernières lectures
+        "soil": {"moisture_percent": [("median", {"window": 5})]},
+        "water": {"water_percent": [("median", {"window": 3})]},
+    })
+
+@dataclass
+class PersistenceConfig:
+    """
+    Enregistrement des mesures sur changement uniquement (core/deadband.py)
+    fields: {colonne sensor_readings: (mode, tolérance)}, modes: change, deadband, swinging_door
+    """
+    CHANGE_ONLY: bool = True
+    HEARTBEAT_INTERVAL: int = 1800      # une ligne au moins toutes les 30 minutes
+    DEVICE_ID: str = "raspberry_pi"     # appareil local (table devices, core/compact_schema.py)
+    MIGRATION_CHUNK_SIZE: int = 5000    # lignes copiées par transaction lors de la migration
+    QUERY_CACHE_SIZE: int = 256         # résultats de lecture en cache (core/query_cache.py)
+    fields: Dict[str, Tuple[str, float]] = field(default_factory=lambda: {
+        "soil_moisture": ("swinging_door", 2.0),   # %
+        "soil_is_dry": ("change", 0.0),
+        "water_level": ("deadband", 5.0),          # %
+        "water_detected": ("change", 0.0),
+        "rain_detected": ("change", 0.0),
+        "temperature": ("swinging_door", 0.3),     # °C
+        "air_humidity": ("swinging_door", 1.5),    # %
+    })
+
+@dataclass
+class RetentionConfig:
+    """
+    Rétention par paliers (core/retention.py), appliquée en arrière-plan par petits blocs
+    Lectures brutes: irrigation.HISTORY_DAYS, puis agrégats horaires et blocs compressés; 0 jour = conservé
+    """
+    ROLLUP_DAYS: int = 365              # agrégats horaires (sensor_rollups)
+    COMPRESSED_DAYS: int = 365          # lectures compressées sans perte (sensor_chunks, NumPy)
+    IRRIGATION_DAYS: int = 0            # événements d'irrigation: conservés
+    CHUNK_ROWS: int = 2000              # lignes supprimées par transaction
+    CHUNK_PAUSE: float = 0.05           # s entre deux blocs (le cycle et l'API écrivent)
+    VACUUM_PAGES: int = 256             # pages rendues par incremental_vacuum
+    MIN_FREE_PAGES: int = 1024          # pages libres avant de réduire le fichier
+    # Base existante (auto_vacuum=NONE): python -m core.retention --convert-auto-vacuum, service arrêté
+
+@dataclass
+class StorageConfig:
+    """
+    Mode « RAM d'abord » (core/snapshot.py): base vivante sur tmpfs, instantanés sur la carte SD
+    Perte maximale sur coupure de courant: SNAPSHOT_INTERVAL s (arrêt propre: aucune)
+    """
+    RAM_FIRST: bool = os.getenv("IRRIGATION_RAM_DB", "False").lower() == "true"
+    RAM_DIR: str = "/dev/shm/irrigation"    # tmpfs
+    SNAPSHOT_INTERVAL: int = 300            # s, fenêtre de perte de données maximale
+    SNAPSHOT_PAGES: int = 256               # pages copiées par pas de sauvegarde
+    SNAPSHOT_STEP_PAUSE: float = 0.01       # s entre deux pas (les écrivains passent)
+
+@dataclass
+class ZoneConfig:
+    """
+    Arrosage multi-zones (decision_engine/zones.py)
+    zones: {zone: (profil config/plant_profiles.py, appareil des mesures, durée en s)}
+    Appareil vide: appareil local (persistence.DEVICE_ID); durée 0: IRRIGATION_DURATION
+    Vide par défaut (multi-zones sur option), avec GPIOConfig.ZONE_VALVE_PINS; exemple:
+        {"potager": ("tomato", "", 0), "aromatiques": ("basil", "", 0), "massif": ("rose", "", 0)}
+    """
+    MAX_OPEN_VALVES: int = 2            # budget pression/alimentation de la pompe
+    SWITCH_ON_INTERVAL: float = 2.0     # s entre deux mises sous tension (appel de courant)
+    MAX_RUN_SLICE: int = 60             # s d'arrosage d'affilée avant de laisser la place
+    AGING_PER_MINUTE: float = 1.0       # priorité gagnée par minute d'attente (équité)
+    zones: Dict[str, Tuple[str, str, int]] = field(default_factory=dict)
 
 @dataclass
 class APIConfig:
@@ -66,10 +160,58 @@ class APIConfig:
     SERVER_HOST: str = "0.0.0.0"
     SERVER_PORT: int = 5000
     DEBUG_MODE: bool = False
+    SERVER_MODE: str = os.getenv("IRRIGATION_SERVER_MODE", "auto")  # auto, dev, waitress, gunicorn
+    SERVER_WORKERS: int = 2             # workers gunicorn
+    SERVER_THREADS: int = 4             # threads par worker
+    HARDWARE_SOCKET: str = "/tmp/irrigation_hardware.sock"  # IPC workers -> GPIO
     
     # Gemini API
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
 
+@dataclass
+class CaptureConfig:
+    """
+    Capture brute à haute fréquence pour le diagnostic (core/ring_file.py)
+    Fichier circulaire de taille fixe, hors SQLite; lu par GET /api/sensors/raw
+    """
+    ENABLED: bool = os.getenv("IRRIGATION_RAW_CAPTURE", "False").lower() == "true"
+    RATE_HZ: float = 1.0                # échantillons par seconde
+    PATH: str = "raw_samples.ring"
+    CAPACITY: int = 86400               # 24 h à 1 Hz (32 octets par échantillon: 2.8 Mo)
+    FLUSH_INTERVAL: float = 10.0        # s entre deux msync (perte max sur coupure de courant)
+
+@dataclass
+class IngestConfig:
+    """
+    Agrégation multi-appareils (serre avec plusieurs nœuds)
+    - agrégateur: POST /api/ingest, écriture groupée en arrière-plan (core/ingest.py)
+    - nœud: AGGREGATOR_URL défini -> lectures transmises par lots (core/ingest_client.py)
+    """
+    TOKEN: str = os.getenv("IRRIGATION_INGEST_TOKEN", "")   # jeton partagé (vide: pas de contrôle)
+    MAX_PENDING_ROWS: int = 50000       # file d'écriture de l'agrégateur, au-delà: 429
+    MAX_REQUEST_READINGS: int = 5000    # lectures max par requête
+    MAX_REQUEST_BYTES: int = 8 * 1024 * 1024  # corps décompressé max
+    WRITE_BATCH_ROWS: int = 5000        # lignes max par transaction d'écriture
+    MAX_CLOCK_SKEW: int = 300           # lectures datées du futur refusées au-delà (s)
+    
+    # Côté nœud
+    AGGREGATOR_URL: str = os.getenv("IRRIGATION_AGGREGATOR_URL", "")  # ex: http://serre-pi:5000
+    CLIENT_BATCH_SIZE: int = 500        # lectures par envoi
+    CLIENT_FLUSH_INTERVAL: float = 10.0 # envoi au moins toutes les N secondes
+    CLIENT_MAX_BUFFER: int = 20000      # lectures gardées hors ligne (les plus anciennes perdues)
+
+@dataclass
+class EgressConfig:
+    """
+    Budget de données sortantes (core/egress.py): liaison LTE facturée au volume
+    Comptage toujours actif; dégradation (cadence réduite, résumés seuls) si METERED_LINK
+    """
+    METERED_LINK: bool = os.getenv("IRRIGATION_METERED_LINK", "False").lower() == "true"
+    MONTHLY_BUDGET_MB: float = float(os.getenv("IRRIGATION_DATA_BUDGET_MB", "0"))  # 0: comptage seul
+    PACE_MARGIN: float = 1.1            # tolérance au-dessus du rythme mensuel avant réduction
+    REDUCED_CADENCE_FACTOR: int = 4     # intervalles de sync / sonde multipliés au-delà du rythme
+    FLUSH_INTERVAL: float = 60.0        # s entre deux écritures des compteurs
+
 @dataclass
 class FirebaseConfig:
     """Configuration Firebase"""
@@ -78,6 +220,19 @@ class FirebaseConfig:
     COLLECTION_IRRIGATION: str = "irrigation_events"
     COLLECTION_SYSTEM: str = "system_status"
     COLLECTION_USERS: str = "users"
+    
+    # Envoi groupé: un document par appareil et par heure (firebase/sensor_chunks.py)
+    PACKED_UPLOAD: bool = os.getenv("IRRIGATION_FIREBASE_PACKED", "False").lower() == "true"
+    COLLECTION_SENSOR_CHUNKS: str = "sensor_chunks"
+    
+    # Planification des envois (core/sync_manager.py)
+    SYNC_INTERVAL: int = 300            # s entre deux envois une fois à jour
+    SYNC_BATCH_SIZE: int = 200          # lectures (documents horaires en mode groupé) par passe
+    SYNC_BATCH_PAUSE: float = 2.0       # s entre deux passes de rattrapage (débit limité)
+    SYNC_BACKOFF_BASE: float = 10.0     # 1er délai après erreur, doublé à chaque échec
+    SYNC_BACKOFF_MAX: float = 900.0     # délai max après erreurs (s)
+    SYNC_BACKFILL_HOURS: int = 24       # historique envoyé au tout premier envoi (sans curseur)
+    COLLECTION_DAILY_SUMMARIES: str = "daily_summaries"  # résumés jour / semaine (core/daily_summary.py)
 
 class SystemConfig:
     """Configuration globale"""
@@ -86,8 +241,16 @@ class SystemConfig:
         self.gpio = GPIOConfig()
         self.plant = PlantProfile()
         self.irrigation = IrrigationSettings()
+        self.filters = SensorFilterConfig()
+        self.persistence = PersistenceConfig()
+        self.ingest = IngestConfig()
+        self.capture = CaptureConfig()
+        self.zones = ZoneConfig()
+        self.retention = RetentionConfig()
+        self.storage = StorageConfig()
         self.api = APIConfig()
         self.firebase = FirebaseConfig()
+        self.egress = EgressConfig()
         
         # États système
         self.debug_mode: bool = os.getenv("DEBUG_MODE", "False").lower() == "true"
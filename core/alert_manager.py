@@ -0,0 +1,200 @@
+"""
+Gestion des alertes système avec déduplication
+- Une seule ligne `system_alerts` par alerte ouverte, clé (type, capteur)
+- Répétitions comptées en mémoire (occurrences, first/last seen), écrites au plus
+  une fois par intervalle, puis à la résolution
+"""
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AlertKey = Tuple[str, str]
+
+
+def sql_time(ts: float) -> str:
+    """Même format que CURRENT_TIMESTAMP (UTC) pour rester comparable à `timestamp`"""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@dataclass
+class OpenAlert:
+    """Alerte ouverte suivie en mémoire"""
+    id: int
+    alert_type: str
+    sensor_name: Optional[str]
+    message: str
+    occurrences: int
+    first_seen: float
+    last_seen: float
+    last_written: float
+    written_occurrences: int
+
+    @property
+    def dirty(self) -> bool:
+        return self.occurrences != self.written_occurrences
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "alert_type": self.alert_type,
+            "sensor_name": self.sensor_name,
+            "message": self.message,
+            "occurrences": self.occurrences,
+            "first_seen": sql_time(self.first_seen),
+            "last_seen": sql_time(self.last_seen),
+            "resolved": False
+        }
+
+
+class AlertManager:
+    """Alertes ouvertes, dédupliquées et limitées en écriture"""
+
+    def __init__(self, db, update_interval: float = 300.0):
+        self.db = db
+        self.update_interval = update_interval
+        self._open: Dict[AlertKey, OpenAlert] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.stats = {"raised": 0, "deduplicated": 0, "writes": 0, "resolved": 0}
+
+    @staticmethod
+    def _key(alert_type: str, sensor_name: Optional[str]) -> AlertKey:
+        return alert_type, sensor_name or ""
+
+    def _ensure_loaded(self):
+        """Recharge les alertes ouvertes au premier usage (pas de doublon après redémarrage)"""
+        if self._loaded:
+            return
+        merged = []
+        for row in self.db.query_open_alerts():
+            first_seen = self._parse_time(row.first_seen or row.timestamp)
+            last_seen = self._parse_time(row.last_seen or row.timestamp)
+            occurrences = row.occurrences or 1
+            key = self._key(row.alert_type, row.sensor_name)
+            existing = self._open.get(key)
+            if existing is not None:
+                # Doublons hérités de l'ancien comportement: fusionnés dans une seule alerte
+                existing.occurrences += occurrences
+                existing.first_seen = min(existing.first_seen, first_seen)
+                existing.last_seen = max(existing.last_seen, last_seen)
+                merged.append(row.id)
+                continue
+            self._open[key] = OpenAlert(
+                id=row.id, alert_type=row.alert_type, sensor_name=row.sensor_name,
+                message=row.message, occurrences=occurrences, first_seen=first_seen,
+                last_seen=last_seen, last_written=time.time(), written_occurrences=occurrences
+            )
+
+        if merged:
+            self.db.resolve_alerts(merged, sql_time(time.time()))
+            logger.info(f"🧹 {len(merged)} alertes en double fusionnées")
+        self._loaded = True
+
+    @staticmethod
+    def _parse_time(value: Optional[str]) -> float:
+        if not value:
+            return time.time()
+        try:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            return time.time()
+
+    # === API PUBLIQUE ===
+
+    def raise_alert(self, alert_type: str, message: str, sensor_name: Optional[str] = None) -> bool:
+        """Ouvre une alerte ou compte une occurrence de plus si elle est déjà ouverte"""
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            key = self._key(alert_type, sensor_name)
+            alert = self._open.get(key)
+
+            if alert is None:
+                alert_id = self.db.insert_alert(alert_type, message, sensor_name, sql_time(now))
+                if alert_id is None:
+                    return False
+                self._open[key] = OpenAlert(
+                    id=alert_id, alert_type=alert_type, sensor_name=sensor_name, message=message,
+                    occurrences=1, first_seen=now, last_seen=now, last_written=now,
+                    written_occurrences=1
+                )
+                self.stats["raised"] += 1
+                self.stats["writes"] += 1
+                logger.warning(f"⚠️ Alerte ouverte: {alert_type} - {message}")
+                return True
+
+            alert.occurrences += 1
+            alert.last_seen = now
+            alert.message = message
+            self.stats["deduplicated"] += 1
+
+            # Limitation: une écriture au plus par intervalle tant que l'alerte persiste
+            if now - alert.last_written >= self.update_interval:
+                return self._write(alert)
+            return True
+
+    def resolve(self, alert_type: str, sensor_name: Optional[str] = None) -> bool:
+        """Ferme l'alerte (type, capteur) si elle est ouverte"""
+        with self._lock:
+            self._ensure_loaded()
+            alert = self._open.pop(self._key(alert_type, sensor_name), None)
+            if alert is None:
+                return False
+
+            if not self.db.update_alert(alert.id, alert.occurrences, sql_time(alert.last_seen),
+                                        alert.message, resolved_at=sql_time(time.time())):
+                # Échec d'écriture: l'alerte reste ouverte pour une nouvelle tentative
+                self._open[self._key(alert_type, sensor_name)] = alert
+                return False
+
+            self.stats["resolved"] += 1
+            self.stats["writes"] += 1
+            logger.info(f"✅ Alerte résolue: {alert_type} ({alert.occurrences} occurrences)")
+            return True
+
+    def is_open(self, alert_type: str, sensor_name: Optional[str] = None) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return self._key(alert_type, sensor_name) in self._open
+
+    def get_open_alerts(self, alert_type: Optional[str] = None,
+                        sensor_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Alertes ouvertes (requête sur l'index partiel), compteurs en mémoire à jour"""
+        with self._lock:
+            self._ensure_loaded()
+            rows = self.db.query_open_alerts(alert_type, sensor_name)
+            by_id = {alert.id: alert for alert in self._open.values()}
+
+        alerts = []
+        for row in rows:
+            alert = by_id.get(row.id)
+            alerts.append(alert.to_dict() if alert is not None else row._asdict())
+        return alerts
+
+    def flush(self) -> int:
+        """Écrit les compteurs en attente (arrêt, nettoyage)"""
+        written = 0
+        with self._lock:
+            for alert in self._open.values():
+                if alert.dirty and self._write(alert):
+                    written += 1
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "open": len(self._open)}
+
+    # === INTERNE ===
+
+    def _write(self, alert: OpenAlert) -> bool:
+        if not self.db.update_alert(alert.id, alert.occurrences, sql_time(alert.last_seen), alert.message):
+            return False
+        alert.last_written = time.time()
+        alert.written_occurrences = alert.occurrences
+        self.stats["writes"] += 1
+        return True
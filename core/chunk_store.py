@@ -0,0 +1,355 @@
+"""
+Historique long compressé façon Gorilla: un bloc par appareil et par heure (sensor_chunks)
+- horodatages: premier ts, premier écart, puis delta-of-delta en zigzag; lectures régulières
+  = 0 bit par point
+- valeurs (entiers virgule fixe du schéma compact, en float64; NULL = NaN): XOR avec la
+  valeur précédente, 1 bit « inchangé » par point, puis les bits significatifs du XOR
+- fenêtre de bits significatifs commune au bloc (Gorilla: fenêtre par valeur): le décodage
+  est vectoriel (np.unpackbits + np.bitwise_xor.accumulate), pas de boucle Python par point
+- sans perte: lectures brutes compressées par la rétention avant suppression, relues en
+  tableaux NumPy par read_arrays (blocs + lectures brutes encore présentes)
+
+NumPy est optionnel: sans NumPy, la rétention ne compresse pas (agrégats horaires seuls)
+
+Banc de mesure (taille, décodage d'un intervalle vs lecture SQL ligne à ligne):
+    python -m core.chunk_store --days 90
+"""
+import os
+import time
+import struct
+import sqlite3
+import logging
+import argparse
+import tempfile
+from typing import Any, Dict, Optional, Sequence
+
+from core.compact_schema import FLAG_BITS, SCALES, SENSOR_TABLE
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TABLE = "sensor_chunks"
+HOUR_MS = 3600 * 1000
+
+# Séries compressées: champs virgule fixe + champ de bits
+SERIES = (*SCALES, "flags")
+
+CHUNK_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {CHUNK_TABLE} (
+        device INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        samples INTEGER NOT NULL,
+        ts BLOB NOT NULL,
+        {', '.join(f'{name} BLOB NOT NULL' for name in SERIES)},
+        PRIMARY KEY (device, hour)
+    ) WITHOUT ROWID
+"""
+
+UPSERT_SQL = f"""
+    INSERT OR REPLACE INTO {CHUNK_TABLE} (device, hour, samples, ts, {', '.join(SERIES)})
+    VALUES (?, ?, ?, ?, {', '.join('?' for _ in SERIES)})
+"""
+
+_TS_HEADER = struct.Struct("<IqqB")       # points, premier ts, premier écart, largeur dod
+_VALUE_HEADER = struct.Struct("<QBB")     # bits de la première valeur, zéros de droite, largeur
+
+
+def available() -> bool:
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute(CHUNK_DDL)
+
+
+# === CODAGE BINAIRE ===
+
+def _pack(values, width: int) -> bytes:
+    """Entiers uint64 sur `width` bits chacun, bout à bout"""
+    import numpy as np
+    if width == 0 or not len(values):
+        return b""
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    bits = ((values[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+    return np.packbits(bits.ravel()).tobytes()
+
+
+def _unpack(data: bytes, count: int, width: int):
+    import numpy as np
+    if width == 0 or count == 0:
+        return np.zeros(count, dtype=np.uint64)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count * width)
+    weights = np.left_shift(np.uint64(1), np.arange(width - 1, -1, -1, dtype=np.uint64))
+    return (bits.reshape(count, width).astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+
+def encode_timestamps(ts) -> bytes:
+    """Horodatages ms croissants -> delta-of-delta zigzag à largeur fixe"""
+    import numpy as np
+    ts = np.asarray(ts, dtype=np.int64)
+    first_delta = int(ts[1] - ts[0]) if len(ts) > 1 else 0
+    dod = np.diff(ts, n=2)
+    zigzag = ((dod << 1) ^ (dod >> 63)).astype(np.uint64)
+    width = int(np.bitwise_or.reduce(zigzag)).bit_length() if len(zigzag) else 0
+    return _TS_HEADER.pack(len(ts), int(ts[0]), first_delta, width) + _pack(zigzag, width)
+
+
+def decode_timestamps(blob: bytes):
+    import numpy as np
+    count, first, first_delta, width = _TS_HEADER.unpack_from(blob)
+    if count == 1:
+        return np.array([first], dtype=np.int64)
+    zigzag = _unpack(blob[_TS_HEADER.size:], count - 2, width)
+    dod = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    deltas = np.empty(count - 1, dtype=np.int64)
+    deltas[0] = first_delta
+    np.cumsum(dod, out=deltas[1:])
+    deltas[1:] += first_delta
+    out = np.empty(count, dtype=np.int64)
+    out[0] = first
+    np.cumsum(deltas, out=out[1:])
+    out[1:] += first
+    return out
+
+
+def encode_values(values) -> bytes:
+    """Valeurs float64 -> XOR avec la précédente, bitmap « modifié », bits significatifs"""
+    import numpy as np
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xors = bits[1:] ^ bits[:-1]
+    changed = xors != 0
+    meaningful = xors[changed]
+    trailing = width = 0
+    if len(meaningful):
+        combined = int(np.bitwise_or.reduce(meaningful))
+        trailing = (combined & -combined).bit_length() - 1
+        width = combined.bit_length() - trailing
+    return (_VALUE_HEADER.pack(int(bits[0]), trailing, width)
+            + np.packbits(changed).tobytes()
+            + _pack(meaningful >> np.uint64(trailing), width))
+
+
+def decode_values(blob: bytes, count: int):
+    import numpy as np
+    first, trailing, width = _VALUE_HEADER.unpack_from(blob)
+    offset = _VALUE_HEADER.size
+    bitmap_size = (count - 1 + 7) // 8
+    changed = np.unpackbits(np.frombuffer(blob, dtype=np.uint8, count=bitmap_size, offset=offset),
+                            count=count - 1).view(bool)
+    xors = np.zeros(count, dtype=np.uint64)
+    xors[0] = first
+    xors[1:][changed] = _unpack(blob[offset + bitmap_size:], int(changed.sum()), width) << np.uint64(trailing)
+    return np.bitwise_xor.accumulate(xors).view(np.float64)
+
+
+# === BLOCS HORAIRES ===
+
+def _raw_arrays(cursor: sqlite3.Cursor, device: int, start_ms: int, end_ms: int) -> Dict[str, Any]:
+    """Lectures brutes [start, end) en tableaux (valeurs virgule fixe, NULL = NaN)"""
+    import numpy as np
+    cursor.execute(f"""
+        SELECT ts, {', '.join(SERIES)} FROM {SENSOR_TABLE}
+        WHERE device = ? AND ts >= ? AND ts < ?
+        ORDER BY ts
+    """, (device, start_ms, end_ms))
+    rows = cursor.fetchall()
+    columns = list(zip(*rows)) if rows else [()] * (len(SERIES) + 1)
+    arrays = {"ts": np.array(columns[0], dtype=np.int64)}
+    for name, values in zip(SERIES, columns[1:]):
+        arrays[name] = np.array(values, dtype=np.float64)
+    return arrays
+
+
+def _decode_chunk(row: Sequence[Any], series: Sequence[str]) -> Dict[str, Any]:
+    """Ligne (samples, ts, séries demandées...) -> tableaux"""
+    samples, ts_blob, *blobs = row
+    arrays = {"ts": decode_timestamps(ts_blob)}
+    for name, blob in zip(series, blobs):
+        arrays[name] = decode_values(blob, samples)
+    return arrays
+
+
+def compress_range(cursor: sqlite3.Cursor, device: int, start_ms: int, end_ms: int) -> int:
+    """
+    Compresse les lectures brutes [start, end) en blocs horaires (dans la transaction de
+    l'appelant, avant la suppression des lignes); une heure déjà compressée (lectures
+    arrivées en retard) est décodée et fusionnée. Retourne le nombre d'heures écrites
+    """
+    import numpy as np
+    raw = _raw_arrays(cursor, device, start_ms, end_ms)
+    if not len(raw["ts"]):
+        return 0
+
+    hours = raw["ts"] // HOUR_MS * HOUR_MS
+    bounds = [0, *(np.flatnonzero(np.diff(hours)) + 1), len(hours)]
+    written = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        hour = int(hours[lo])
+        part = {name: values[lo:hi] for name, values in raw.items()}
+
+        cursor.execute(f"SELECT samples, ts, {', '.join(SERIES)} FROM {CHUNK_TABLE} "
+                       f"WHERE device = ? AND hour = ?", (device, hour))
+        existing = cursor.fetchone()
+        if existing is not None:
+            old = _decode_chunk(existing, SERIES)
+            merged_ts = np.concatenate((part["ts"], old["ts"]))
+            # Premier exemplaire d'un horodatage gardé: la lecture brute
+            merged_ts, first = np.unique(merged_ts, return_index=True)
+            part = {"ts": merged_ts,
+                    **{name: np.concatenate((part[name], old[name]))[first] for name in SERIES}}
+
+        written.append((device, hour, len(part["ts"]), encode_timestamps(part["ts"]),
+                        *(encode_values(part[name]) for name in SERIES)))
+    cursor.executemany(UPSERT_SQL, written)
+    return len(written)
+
+
+def read_arrays(cursor: sqlite3.Cursor, device: int, start_ms: int, end_ms: int,
+                fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Historique [start, end) en tableaux NumPy: blocs compressés + lectures brutes restantes
+    'ts' (int64 ms), champs virgule fixe en float64 (NaN = NULL), drapeaux en bool
+    """
+    import numpy as np
+    fields = list(fields) if fields else [*SCALES, *FLAG_BITS]
+    unknown = [f for f in fields if f not in SCALES and f not in FLAG_BITS]
+    if unknown:
+        raise ValueError(f"Champs inconnus: {unknown}")
+    series = [f for f in SCALES if f in fields]
+    if any(f in FLAG_BITS for f in fields):
+        series.append("flags")
+
+    cursor.execute(f"""
+        SELECT samples, ts, {', '.join(series)} FROM {CHUNK_TABLE}
+        WHERE device = ? AND hour >= ? AND hour < ?
+        ORDER BY hour
+    """, (device, start_ms // HOUR_MS * HOUR_MS, end_ms))
+    parts = [_decode_chunk(row, series) for row in cursor.fetchall()]
+    parts.append(_raw_arrays(cursor, device, start_ms, end_ms))
+
+    ts = np.concatenate([part["ts"] for part in parts])
+    order = np.argsort(ts, kind="stable")
+    ts = ts[order]
+    keep = (ts >= start_ms) & (ts < end_ms)
+    result = {"ts": ts[keep]}
+    columns = {name: np.concatenate([part[name] for part in parts])[order][keep] for name in series}
+    for name in fields:
+        if name in SCALES:
+            result[name] = columns[name] / SCALES[name]
+        else:
+            result[name] = ((columns["flags"].astype(np.int64) >> FLAG_BITS[name]) & 1).astype(bool)
+    return result
+
+
+# === BANC DE MESURE ===
+
+def run_benchmark(days: float = 90.0, interval: float = 30.0, window_days: float = 30.0,
+                  repeat: int = 3, work_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Mêmes lectures synthétiques en lignes brutes (schéma compact) et en blocs compressés:
+    taille des fichiers, durée d'une lecture d'intervalle en tableaux NumPy
+    """
+    import numpy as np
+    from core import compact_schema
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="irrigation_chunks_")
+    raw_path = os.path.join(work_dir, "raw.db")
+    chunk_path = os.path.join(work_dir, "chunks.db")
+    for path in (raw_path, chunk_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    rows = int(days * 86400 / interval)
+    start = int(time.time() - rows * interval) // 3600 * 3600
+    conn = sqlite3.connect(raw_path)
+    compact_schema.create_tables(conn.cursor())
+    device = compact_schema.device_id(conn.cursor(), "bench")
+    for offset in range(0, rows, 10000):
+        conn.executemany(compact_schema.INSERT_SQL, [
+            compact_schema.encode_row(device, *compact_schema._synthetic(index, start, interval))
+            for index in range(offset, min(rows, offset + 10000))
+        ])
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    started = time.perf_counter()
+    with sqlite3.connect(raw_path) as source, sqlite3.connect(chunk_path) as target:
+        source.backup(target)
+    conn = sqlite3.connect(chunk_path)
+    create_tables(conn.cursor())
+    end_ms = (start + rows * interval) * 1000 + HOUR_MS
+    hours = compress_range(conn.cursor(), device, start * 1000, int(end_ms))
+    conn.execute(f"DELETE FROM {SENSOR_TABLE}")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    compress_s = time.perf_counter() - started
+
+    window_ms = int(window_days * 86400 * 1000)
+    window = (start * 1000 + (rows * interval * 1000 - window_ms) // 2,)
+    window = (window[0], window[0] + window_ms)
+    fields = ("soil_moisture", "temperature", "air_humidity", "soil_is_dry")
+
+    def sql_rows():
+        # Lecture ligne à ligne puis conversion en tableaux (chemin actuel)
+        with sqlite3.connect(raw_path) as c:
+            rows_ = c.execute(f"SELECT ts, {compact_schema.select_columns(fields)} FROM {SENSOR_TABLE} "
+                              f"WHERE device = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                              (device, *window)).fetchall()
+        columns = list(zip(*rows_))
+        return {"ts": np.array(columns[0], dtype=np.int64),
+                **{name: np.array(values, dtype=np.float64) for name, values in zip(fields, columns[1:])}}
+
+    def chunks():
+        with sqlite3.connect(chunk_path) as c:
+            return read_arrays(c.cursor(), device, *window, fields)
+
+    timings = {}
+    for name, reader in (("sql", sql_rows), ("chunks", chunks)):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            arrays = reader()
+            best = min(best, time.perf_counter() - t0)
+        timings[name] = {"ms": round(best * 1000, 2), "points": len(arrays["ts"])}
+
+    expected, decoded = sql_rows(), chunks()
+    lossless = all(np.array_equal(expected[f], decoded[f].astype(expected[f].dtype)) for f in ("ts", *fields))
+    raw_size, chunk_size = os.path.getsize(raw_path), os.path.getsize(chunk_path)
+    return {
+        "rows": rows, "hours": hours, "work_dir": work_dir, "lossless": lossless,
+        "raw_bytes": raw_size, "chunk_bytes": chunk_size,
+        "bytes_per_row": round(chunk_size / rows, 2), "size_ratio": round(chunk_size / raw_size, 3),
+        "compress_s": round(compress_s, 2), "window_days": window_days, **timings,
+        "decode_speedup": round(timings["sql"]["ms"] / timings["chunks"]["ms"], 2),
+    }
+
+
+def format_benchmark(results: Dict[str, Any]) -> str:
+    return "\n".join([
+        f"📏 {results['rows']} lectures, {results['hours']} blocs horaires ({results['work_dir']})",
+        f"💾 brut {results['raw_bytes'] / 1e6:.2f} Mo -> blocs {results['chunk_bytes'] / 1e6:.2f} Mo "
+        f"({results['bytes_per_row']} o/lecture, x{results['size_ratio']}), compression {results['compress_s']}s",
+        f"⚡ {results['window_days']} j en tableaux: SQL {results['sql']['ms']} ms, "
+        f"blocs {results['chunks']['ms']} ms (x{results['decode_speedup']}), "
+        f"{results['chunks']['points']} points, sans perte: {results['lossless']}",
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesure de l'historique compressé")
+    parser.add_argument("--days", type=float, default=90.0)
+    parser.add_argument("--interval", type=float, default=30.0, help="secondes entre lectures")
+    parser.add_argument("--window-days", type=float, default=30.0, help="durée de l'intervalle lu")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dir", default=None, help="répertoire de travail")
+    args = parser.parse_args()
+    print(format_benchmark(run_benchmark(args.days, args.interval, args.window_days, args.repeat, args.dir)))
+
+
+if __name__ == "__main__":
+    main()
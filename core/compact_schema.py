@@ -0,0 +1,417 @@
+"""
+Schéma compact (v2) des lectures de capteurs
+- ts: epoch en millisecondes (INTEGER), plus de texte CURRENT_TIMESTAMP
+- pourcentages et température en virgule fixe (entiers x100, résolution 0.01)
+- soil_is_dry / water_detected / rain_detected dans un champ de bits `flags`
+- appareils dans une table dictionnaire `devices` (plus de TEXT répété par ligne)
+- WITHOUT ROWID, clé primaire (device, ts): les lignes d'un appareil sont rangées
+  par date, un intervalle de temps se lit d'un seul tenant
+
+Migration depuis l'ancienne table `sensor_readings` par blocs (une transaction par bloc)
+
+Banc de mesure (taille sur disque, lecture d'intervalles):
+    python -m core.compact_schema --rows 200000
+"""
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SENSOR_TABLE = "sensor_samples"
+LEGACY_TABLE = "sensor_readings"
+
+# Champs en virgule fixe: valeur stockée = round(valeur * échelle)
+SCALES: Dict[str, int] = {
+    "soil_moisture": 100,
+    "water_level": 100,
+    "temperature": 100,
+    "air_humidity": 100,
+}
+
+# Champs booléens -> bit de `flags`
+FLAG_BITS: Dict[str, int] = {
+    "soil_is_dry": 0,
+    "water_detected": 1,
+    "rain_detected": 2,
+}
+
+DEVICES_DDL = """
+    CREATE TABLE IF NOT EXISTS devices (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+"""
+
+SENSOR_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {SENSOR_TABLE} (
+        device INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        soil_moisture INTEGER,
+        water_level INTEGER,
+        temperature INTEGER,
+        air_humidity INTEGER,
+        flags INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (device, ts)
+    ) WITHOUT ROWID
+"""
+
+# Ancien schéma (banc de mesure uniquement)
+LEGACY_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {LEGACY_TABLE} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        soil_moisture REAL,
+        soil_is_dry BOOLEAN,
+        water_level REAL,
+        water_detected BOOLEAN,
+        rain_detected BOOLEAN,
+        temperature REAL,
+        air_humidity REAL,
+        device_id TEXT DEFAULT 'raspberry_pi'
+    )
+"""
+
+# Colonnes historiques (noms de l'ancienne table) -> expression SQL sur le schéma compact
+COLUMN_SQL: Dict[str, str] = {
+    "id": "ts",
+    "timestamp": "datetime(ts / 1000, 'unixepoch')",
+    **{name: f"{name} / {float(scale)}" for name, scale in SCALES.items()},
+    **{name: f"(flags >> {bit}) & 1" for name, bit in FLAG_BITS.items()},
+    "device_id": "(SELECT name FROM devices WHERE devices.id = device)",
+}
+
+Row = Tuple[int, int, Optional[int], Optional[int], Optional[int], Optional[int], int]
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute(DEVICES_DDL)
+    cursor.execute(SENSOR_DDL)
+
+
+def device_id(cursor: sqlite3.Cursor, name: str) -> int:
+    """Identifiant d'un appareil (créé au premier usage)"""
+    cursor.execute("INSERT OR IGNORE INTO devices (name) VALUES (?)", (name,))
+    cursor.execute("SELECT id FROM devices WHERE name = ?", (name,))
+    return cursor.fetchone()[0]
+
+
+def to_ms(value: Union[str, float, int]) -> int:
+    """
+    Borne temporelle -> epoch ms
+    Accepte un epoch en secondes ou un texte 'YYYY-MM-DD[ HH:MM:SS]' (UTC si sans fuseau)
+    """
+    if isinstance(value, (int, float)):
+        return int(round(value * 1000))
+    try:
+        return int(round(float(value) * 1000))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"Date invalide: {value!r} (attendu YYYY-MM-DD[ HH:MM:SS] ou epoch)")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def reading_values(sensor_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Lecture de sensor_manager.read_all() -> {colonne: valeur}"""
+    sensors = sensor_data.get("sensors", {})
+    soil = sensors.get("soil", {})
+    water = sensors.get("water", {})
+    rain = sensors.get("rain", {})
+    dht22 = sensors.get("dht22", {})
+
+    temperature = dht22.get('temperature')
+    air_humidity = dht22.get('humidity')  # Note: c'est 'humidity' dans le dict, 'air_humidity' dans la table
+
+    return {
+        "soil_moisture": soil.get('moisture_percent', 0.0),
+        "soil_is_dry": bool(soil.get('is_dry', True)),
+        "water_level": water.get('water_percent', 0.0),
+        "water_detected": bool(water.get('water_detected', False)),
+        "rain_detected": bool(rain.get('rain_detected', False)),
+        "temperature": temperature if temperature is not None else 0.0,
+        "air_humidity": air_humidity if air_humidity is not None else 0.0
+    }
+
+
+def _fixed(value: Any, scale: int) -> Optional[int]:
+    return None if value is None else int(round(float(value) * scale))
+
+
+def encode_row(device: int, timestamp: float, values: Dict[str, Any]) -> Row:
+    """Lecture (timestamp epoch, {colonne: valeur}) -> ligne du schéma compact"""
+    flags = 0
+    for name, bit in FLAG_BITS.items():
+        if values.get(name):
+            flags |= 1 << bit
+    return (
+        device,
+        int(round(timestamp * 1000)),
+        _fixed(values.get("soil_moisture"), SCALES["soil_moisture"]),
+        _fixed(values.get("water_level"), SCALES["water_level"]),
+        _fixed(values.get("temperature"), SCALES["temperature"]),
+        _fixed(values.get("air_humidity"), SCALES["air_humidity"]),
+        flags,
+    )
+
+
+INSERT_SQL = f"""
+    INSERT OR REPLACE INTO {SENSOR_TABLE}
+    (device, ts, soil_moisture, water_level, temperature, air_humidity, flags)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def select_columns(columns: Sequence[str]) -> str:
+    """Projection SQL qui restitue les noms et unités de l'ancienne table"""
+    return ", ".join(f"{COLUMN_SQL[name]} AS {name}" for name in columns)
+
+
+# === MIGRATION ===
+
+def legacy_exists(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                       (LEGACY_TABLE,)).fetchone()
+    return row is not None
+
+
+def migrate_legacy(conn: sqlite3.Connection, default_device: str = "raspberry_pi",
+                   chunk_size: int = 5000, vacuum: bool = True) -> Dict[str, Any]:
+    """
+    Copie `sensor_readings` vers le schéma compact par blocs de chunk_size lignes
+    Chaque bloc est copié puis supprimé de l'ancienne table dans la même transaction:
+    reprise possible après coupure, et les pages libérées sont réutilisées (pas de
+    doublement de la taille du fichier sur la carte SD). Table supprimée à la fin.
+    Horodatages identiques à la seconde pour un même appareil: la première ligne est gardée.
+    """
+    result = {"copied": 0, "skipped": 0, "chunks": 0, "duration": 0.0}
+    if not legacy_exists(conn):
+        return result
+
+    started = time.time()
+    cursor = conn.cursor()
+    create_tables(cursor)
+    cursor.execute(f"""
+        INSERT OR IGNORE INTO devices (name)
+        SELECT DISTINCT COALESCE(device_id, ?) FROM {LEGACY_TABLE}
+    """, (default_device,))
+    conn.commit()
+
+    flags_sql = " | ".join(f"((COALESCE({name}, 0) != 0) << {bit})" for name, bit in FLAG_BITS.items())
+    fixed_sql = ", ".join(f"CAST(ROUND({name} * {scale}) AS INTEGER)" for name, scale in SCALES.items())
+
+    last_id = 0
+    while True:
+        cursor.execute(f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM {LEGACY_TABLE} "
+                       f"WHERE id > ? ORDER BY id LIMIT ?)", (last_id, chunk_size))
+        chunk_end, count = cursor.fetchone()
+        if not count:
+            break
+
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO {SENSOR_TABLE}
+            (device, ts, {', '.join(SCALES)}, flags)
+            SELECT (SELECT id FROM devices WHERE name = COALESCE(r.device_id, ?)),
+                   CAST(strftime('%s', r.timestamp) AS INTEGER) * 1000,
+                   {fixed_sql}, {flags_sql}
+            FROM {LEGACY_TABLE} AS r
+            WHERE r.id > ? AND r.id <= ? AND r.timestamp IS NOT NULL
+            ORDER BY r.id
+        """, (default_device, last_id, chunk_end))
+        copied = cursor.rowcount
+        cursor.execute(f"DELETE FROM {LEGACY_TABLE} WHERE id > ? AND id <= ?", (last_id, chunk_end))
+        conn.commit()
+
+        result["copied"] += copied
+        result["skipped"] += count - copied
+        result["chunks"] += 1
+        last_id = chunk_end
+        if result["chunks"] % 20 == 0:
+            logger.info(f"🔄 Migration lectures capteurs: {result['copied']} lignes copiées")
+
+    cursor.execute(f"DROP TABLE {LEGACY_TABLE}")
+    conn.commit()
+    if vacuum:
+        # Rend au système les pages de l'ancienne table (fichier réécrit une fois)
+        conn.execute("VACUUM")
+
+    result["duration"] = round(time.time() - started, 3)
+    logger.info(f"✅ Migration schéma compact: {result['copied']} lignes, "
+                f"{result['skipped']} doublons ignorés, {result['duration']}s")
+    return result
+
+
+# === BANC DE MESURE ===
+
+def _synthetic(index: int, start: float, interval: float) -> Tuple[float, Dict[str, Any]]:
+    import math
+    soil = 55 + 15 * math.sin(index / 700)
+    return start + index * interval, {
+        "soil_moisture": round(soil, 1),
+        "soil_is_dry": soil < 45,
+        "water_level": float(100 - (index // 400) % 100),
+        "water_detected": True,
+        "rain_detected": (index // 1000) % 7 == 0,
+        "temperature": round(21 + 6 * math.sin(index / 1440), 1),
+        "air_humidity": round(60 + 12 * math.cos(index / 900), 1),
+    }
+
+
+def _build_legacy(path: str, rows: int, start: float, interval: float, batch: int = 10000):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_DDL)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_sensor_readings_timestamp ON {LEGACY_TABLE}(timestamp)")
+    columns = ("soil_moisture", "soil_is_dry", "water_level", "water_detected",
+               "rain_detected", "temperature", "air_humidity")
+    for offset in range(0, rows, batch):
+        data = []
+        for index in range(offset, min(rows, offset + batch)):
+            ts, values = _synthetic(index, start, interval)
+            stamp = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            data.append((stamp, *(values[c] for c in columns)))
+        conn.executemany(f"INSERT INTO {LEGACY_TABLE} (timestamp, {', '.join(columns)}) "
+                         f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)", data)
+        conn.commit()
+    conn.close()
+
+
+def _drop_caches() -> bool:
+    """Vide le cache de pages du noyau (root): lectures réellement servies par la carte SD"""
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def _time_scans(path: str, query: str, windows: Sequence[Tuple[Any, ...]],
+                repeat: int, cold: bool = False) -> Tuple[float, int]:
+    """Durée moyenne (ms) d'une requête, lignes retournées par requête"""
+    rows = 0
+    elapsed = 0.0
+    conn = sqlite3.connect(path)
+    try:
+        for _ in range(repeat):
+            for params in windows:
+                if cold:
+                    # Nouvelle connexion: cache SQLite vide aussi
+                    conn.close()
+                    _drop_caches()
+                    conn = sqlite3.connect(path)
+                started = time.perf_counter()
+                rows = len(conn.execute(query, params).fetchall())
+                elapsed += time.perf_counter() - started
+    finally:
+        conn.close()
+    return elapsed * 1000 / (repeat * len(windows)), rows
+
+
+def run_benchmark(rows: int = 200000, interval: float = 30.0, window_hours: float = 24.0,
+                  repeat: int = 5, work_dir: Optional[str] = None, cold: bool = False) -> Dict[str, Any]:
+    """
+    Compare ancien schéma et schéma compact sur les mêmes données synthétiques:
+    taille du fichier, octets par ligne, durée d'une lecture d'intervalle et d'un parcours
+    complet, durée de migration
+    cold: cache noyau vidé avant chaque requête (root requis), sinon cache chaud
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="irrigation_bench_")
+    legacy_path = os.path.join(work_dir, "legacy.db")
+    compact_path = os.path.join(work_dir, "compact.db")
+    for path in (legacy_path, compact_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    start = int(time.time() - rows * interval)
+    _build_legacy(legacy_path, rows, start, interval)
+    with sqlite3.connect(legacy_path) as legacy_conn:
+        legacy_conn.execute("VACUUM")
+        # Migration sur une copie de la base ancienne
+        with sqlite3.connect(compact_path) as compact_conn:
+            legacy_conn.backup(compact_conn)
+    legacy_size = os.path.getsize(legacy_path)
+
+    compact_conn = sqlite3.connect(compact_path)
+    migration = migrate_legacy(compact_conn)
+    compact_conn.close()
+    compact_size = os.path.getsize(compact_path)
+
+    # Intervalles répartis sur toute la période (bornes à la seconde, identiques pour les deux schémas)
+    span = int(window_hours * 3600)
+    count = 10
+    starts = [start + int((rows * interval - span) * i / (count - 1)) for i in range(count)]
+    fields = ("soil_moisture", "temperature", "air_humidity", "soil_is_dry")
+
+    def stamp(ts):
+        return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    results = {"rows": rows, "work_dir": work_dir, "cold": cold and _drop_caches(), "migration": migration}
+    queries = {
+        "legacy": (
+            legacy_path, legacy_size,
+            f"SELECT timestamp, {', '.join(fields)} FROM {LEGACY_TABLE} "
+            f"WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+            [(stamp(s), stamp(s + span)) for s in starts],
+            f"SELECT AVG(temperature), SUM(rain_detected) FROM {LEGACY_TABLE}",
+        ),
+        "compact": (
+            compact_path, compact_size,
+            f"SELECT ts, {select_columns(fields)} FROM {SENSOR_TABLE} "
+            f"WHERE device = 1 AND ts >= ? AND ts < ? ORDER BY ts",
+            [(to_ms(s), to_ms(s + span)) for s in starts],
+            f"SELECT AVG({COLUMN_SQL['temperature']}), SUM({COLUMN_SQL['rain_detected']}) FROM {SENSOR_TABLE}",
+        ),
+    }
+    for name, (path, size, range_query, windows, full_query) in queries.items():
+        scan_ms, scan_rows = _time_scans(path, range_query, windows, repeat, results["cold"])
+        full_ms, _ = _time_scans(path, full_query, [()], repeat, results["cold"])
+        results[name] = {"bytes": size, "bytes_per_row": round(size / rows, 1),
+                         "scan_ms": round(scan_ms, 3), "scan_rows": scan_rows, "full_ms": round(full_ms, 3)}
+
+    legacy, compact = results["legacy"], results["compact"]
+    results["size_ratio"] = round(compact["bytes"] / legacy["bytes"], 3)
+    results["scan_speedup"] = round(legacy["scan_ms"] / compact["scan_ms"], 2) if compact["scan_ms"] else 0.0
+    results["full_speedup"] = round(legacy["full_ms"] / compact["full_ms"], 2) if compact["full_ms"] else 0.0
+    return results
+
+
+def format_benchmark(results: Dict[str, Any]) -> str:
+    lines = [
+        f"📏 {results['rows']} lignes ({results['work_dir']}, cache {'froid' if results['cold'] else 'chaud'})",
+        f"{'schéma':<10}{'octets':>12}{'o/ligne':>10}{'scan ms':>10}{'lignes':>8}{'complet ms':>12}",
+    ]
+    for name, label in (("legacy", "ancien"), ("compact", "compact")):
+        r = results[name]
+        lines.append(f"{label:<10}{r['bytes']:>12}{r['bytes_per_row']:>10}"
+                     f"{r['scan_ms']:>10}{r['scan_rows']:>8}{r['full_ms']:>12}")
+    lines.append(f"📉 taille x{results['size_ratio']} | ⚡ intervalle x{results['scan_speedup']} | "
+                 f"⚡ complet x{results['full_speedup']} | 🔄 migration {results['migration']['duration']}s")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesure du schéma compact des lectures")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--interval", type=float, default=30.0, help="secondes entre lectures")
+    parser.add_argument("--window-hours", type=float, default=24.0, help="durée d'un intervalle lu")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dir", default=None, help="répertoire de travail (sur la carte SD pour un test réaliste)")
+    parser.add_argument("--cold", action="store_true", help="vider le cache noyau avant chaque requête (root)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.interval, args.window_hours, args.repeat, args.dir, args.cold)
+    print(format_benchmark(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Résumés journaliers calculés sur l'appareil (table daily_summaries, jour UTC)
+- eau utilisée, déclenchements de pompe, humidité du sol min / moyenne / max, alertes
+  ouvertes et heures de pluie, mis à jour au fil des événements
+- les lectures sont cumulées en mémoire (DailyAccumulator) puis fusionnées dans la table
+  par la prochaine transaction d'écriture de DatabaseManager (lecture retenue, irrigation,
+  alerte): aucune transaction supplémentaire par lecture
+- deltas pris (take) au début de la transaction, remis (restore) si elle échoue, commit compris;
+  ceux d'une écriture (événement, lot ingéré) ne comptent que si elle est validée
+- heures de pluie: masque de 24 bits par jour (OU à la fusion, popcount à la lecture)
+- résumé hebdomadaire (semaine ISO) recalculé depuis les 7 lignes journalières
+- chaque ligne modifiée est poussée vers Firestore (collection daily_summaries) par
+  SyncManager: l'application lit un petit document au lieu de milliers de lectures
+"""
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+SUMMARY_TABLE = "daily_summaries"
+
+SUMMARY_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+        device INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        samples INTEGER NOT NULL DEFAULT 0,
+        moisture_min REAL,
+        moisture_max REAL,
+        moisture_sum REAL NOT NULL DEFAULT 0,
+        moisture_count INTEGER NOT NULL DEFAULT 0,
+        rain_hours INTEGER NOT NULL DEFAULT 0,
+        pump_runs INTEGER NOT NULL DEFAULT 0,
+        failed_runs INTEGER NOT NULL DEFAULT 0,
+        water_seconds REAL NOT NULL DEFAULT 0,
+        alerts INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL,
+        pushed_at REAL,
+        PRIMARY KEY (device, day)
+    ) WITHOUT ROWID
+"""
+
+# Colonnes cumulées (ordre des deltas de DailyAccumulator)
+DELTA_COLUMNS = ("samples", "moisture_min", "moisture_max", "moisture_sum", "moisture_count",
+                 "rain_hours", "pump_runs", "failed_runs", "water_seconds", "alerts")
+
+MERGE_SQL = f"""
+    INSERT INTO {SUMMARY_TABLE} (device, day, {', '.join(DELTA_COLUMNS)}, updated_at)
+    VALUES (?, ?, {', '.join('?' for _ in DELTA_COLUMNS)}, ?)
+    ON CONFLICT (device, day) DO UPDATE SET
+        samples = samples + excluded.samples,
+        moisture_min = MIN(COALESCE(moisture_min, excluded.moisture_min),
+                           COALESCE(excluded.moisture_min, moisture_min)),
+        moisture_max = MAX(COALESCE(moisture_max, excluded.moisture_max),
+                           COALESCE(excluded.moisture_max, moisture_max)),
+        moisture_sum = moisture_sum + excluded.moisture_sum,
+        moisture_count = moisture_count + excluded.moisture_count,
+        rain_hours = rain_hours | excluded.rain_hours,
+        pump_runs = pump_runs + excluded.pump_runs,
+        failed_runs = failed_runs + excluded.failed_runs,
+        water_seconds = water_seconds + excluded.water_seconds,
+        alerts = alerts + excluded.alerts,
+        updated_at = excluded.updated_at
+"""
+
+# Deltas en attente par (appareil, jour)
+Deltas = Dict[Tuple[int, str], List[Any]]
+
+SUMMARY_COLUMNS = ("device", "day") + DELTA_COLUMNS + ("updated_at", "pushed_at")
+SummaryRow = namedtuple("SummaryRow", SUMMARY_COLUMNS)
+
+RANGE_SQL = f"""
+    SELECT {', '.join(SUMMARY_COLUMNS)}
+    FROM {SUMMARY_TABLE}
+    WHERE device = ? AND day >= ? AND day <= ?
+    ORDER BY day
+"""
+
+UNPUSHED_SQL = f"""
+    SELECT {', '.join(SUMMARY_COLUMNS)}
+    FROM {SUMMARY_TABLE}
+    WHERE pushed_at IS NULL OR updated_at > pushed_at
+    ORDER BY device, day
+"""
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute(SUMMARY_DDL)
+
+
+def utc_day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def week_days(day: str) -> Tuple[str, str]:
+    """Premier et dernier jour (lundi, dimanche) de la semaine ISO contenant day"""
+    monday = date.fromisoformat(day) - timedelta(days=date.fromisoformat(day).weekday())
+    return monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+
+
+class DailyAccumulator:
+    """Deltas des résumés en attente de fusion, par (appareil, jour)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Deltas = {}
+
+    def _delta(self, device: int, ts: float) -> List[Any]:
+        key = (device, utc_day(ts))
+        delta = self._pending.get(key)
+        if delta is None:
+            delta = self._pending[key] = [0, None, None, 0.0, 0, 0, 0, 0, 0.0, 0]
+        return delta
+
+    def add_reading(self, device: int, ts: float, values: Dict[str, Any]):
+        """Lecture de capteur (clés de compact_schema.reading_values), avant l'écriture sur changement"""
+        moisture = values.get("soil_moisture")
+        with self._lock:
+            delta = self._delta(device, ts)
+            delta[0] += 1
+            if moisture is not None:
+                delta[1] = moisture if delta[1] is None else min(delta[1], moisture)
+                delta[2] = moisture if delta[2] is None else max(delta[2], moisture)
+                delta[3] += moisture
+                delta[4] += 1
+            if values.get("rain_detected"):
+                delta[5] |= 1 << datetime.fromtimestamp(ts, tz=timezone.utc).hour
+
+    def add_irrigation(self, device: int, ts: float, duration: float, success: bool):
+        with self._lock:
+            delta = self._delta(device, ts)
+            delta[6] += 1
+            if not success:
+                delta[7] += 1
+            delta[8] += duration or 0.0
+
+    def add_alert(self, device: int, ts: float):
+        with self._lock:
+            self._delta(device, ts)[9] += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def take(self) -> Deltas:
+        """Retire les deltas en attente (à fusionner par merge, à remettre par restore si échec)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending: Deltas):
+        """Remet des deltas pris dont la transaction n'a pas été validée"""
+        with self._lock:
+            for key, delta in pending.items():
+                self._restore(key, delta)
+
+    def _restore(self, key: Tuple[int, str], delta: List[Any]):
+        current = self._pending.get(key)
+        if current is None:
+            self._pending[key] = delta
+            return
+        for i, value in enumerate(delta):
+            if i in (1, 2):
+                if value is not None:
+                    current[i] = value if current[i] is None else (min if i == 1 else max)(current[i], value)
+            elif i == 5:
+                current[i] |= value
+            else:
+                current[i] += value
+
+
+def merge(cursor: sqlite3.Cursor, pending: Deltas) -> int:
+    """Fusionne des deltas dans la table (transaction de l'appelant); lignes touchées"""
+    if not pending:
+        return 0
+    now = time.time()
+    cursor.executemany(MERGE_SQL, [(device, day, *delta, now)
+                                   for (device, day), delta in pending.items()])
+    return len(pending)
+
+
+def read_days(cursor: sqlite3.Cursor, device: int, first_day: str, last_day: str) -> List[SummaryRow]:
+    cursor.execute(RANGE_SQL, (device, first_day, last_day))
+    return list(map(SummaryRow._make, cursor))
+
+
+def read_unpushed(cursor: sqlite3.Cursor) -> List[SummaryRow]:
+    cursor.execute(UNPUSHED_SQL)
+    return list(map(SummaryRow._make, cursor))
+
+
+def count_unpushed(cursor: sqlite3.Cursor) -> int:
+    cursor.execute(f"SELECT COUNT(*) FROM {SUMMARY_TABLE} WHERE pushed_at IS NULL OR updated_at > pushed_at")
+    return cursor.fetchone()[0]
+
+
+def mark_pushed(cursor: sqlite3.Cursor, rows: List[SummaryRow]):
+    """pushed_at = updated_at envoyé: une mise à jour arrivée entre-temps reste à pousser"""
+    cursor.executemany(f"UPDATE {SUMMARY_TABLE} SET pushed_at = ? WHERE device = ? AND day = ?",
+                       [(row.updated_at, row.device, row.day) for row in rows])
+
+
+def to_document(rows: List[SummaryRow], device_name: str, period: str, flow_lpm: float = 0.0) -> Dict[str, Any]:
+    """Document JSON (API, Firestore) d'un jour ou d'une semaine (plusieurs lignes journalières)"""
+    moisture_count = sum(row.moisture_count for row in rows)
+    minimums = [row.moisture_min for row in rows if row.moisture_min is not None]
+    maximums = [row.moisture_max for row in rows if row.moisture_max is not None]
+    water_seconds = sum(row.water_seconds for row in rows)
+    updated = [row.updated_at for row in rows if row.updated_at]
+    return {
+        "device_id": device_name,
+        "period": period,
+        "first_day": rows[0].day if rows else None,
+        "last_day": rows[-1].day if rows else None,
+        "days": len(rows),
+        "samples": sum(row.samples for row in rows),
+        "moisture": {
+            "min": round(min(minimums), 2) if minimums else None,
+            "avg": round(sum(row.moisture_sum for row in rows) / moisture_count, 2) if moisture_count else None,
+            "max": round(max(maximums), 2) if maximums else None,
+        },
+        "water_seconds": round(water_seconds, 1),
+        "water_liters": round(water_seconds / 60.0 * flow_lpm, 2) if flow_lpm else None,
+        "pump_runs": sum(row.pump_runs for row in rows),
+        "failed_runs": sum(row.failed_runs for row in rows),
+        "alerts": sum(row.alerts for row in rows),
+        "rain_hours": sum(bin(row.rain_hours).count("1") for row in rows),
+        "updated_at": max(updated) if updated else None,
+    }
@@ -3,19 +3,271 @@ Base de données SQLite locale - VERSION CORRIGÉE
 """
 import sqlite3
 import time
+import threading
 import logging
+import zipfile
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, NamedTuple, Sequence, Tuple
 from pathlib import Path
+from core.startup import LazyInstance
+from core.alert_manager import AlertManager
+from core.deadband import ChangeOnlyRecorder, interpolate_series
+from core import chunk_store, compact_schema, daily_summary, egress, query_cache, retention, snapshot
+from core.query_cache import QueryCache, bump_versions
+from core.db_access import ConnectionPool, fetch_all
+from core.compact_schema import COLUMN_SQL, SENSOR_TABLE, to_ms
 
 logger = logging.getLogger(__name__)
 
+
+class _Source(NamedTuple):
+    """Table SQL derrière un nom d'historique ou d'export"""
+    table: str
+    key: str                  # clé de pagination, exposée comme "id"
+    time_column: str
+    day_sql: str              # jour de partition (export)
+    columns: Dict[str, str]   # nom exposé -> expression SQL (identité si absent)
+    compact: bool = False     # schéma compact: temps en epoch ms, clé (device, ts)
+    
+    def column(self, name: str) -> str:
+        return self.columns.get(name, name)
+    
+    def bound(self, value: str) -> Any:
+        """Borne start/end de l'API -> valeur comparable à time_column"""
+        return to_ms(value) if self.compact else value
+
+
+SOURCES: Dict[str, _Source] = {
+    "sensor_readings": _Source(SENSOR_TABLE, "ts", "ts", "date(ts / 1000, 'unixepoch')", COLUMN_SQL, compact=True),
+    "irrigation_events": _Source("irrigation_events", "id", "timestamp", "date(timestamp)", {}),
+    "system_alerts": _Source("system_alerts", "id", "timestamp", "date(timestamp)", {}),
+}
+
+# Colonnes exportées par table: (nom, expression SQL, type colonne)
+# Les timestamps sont convertis en epoch ms directement par SQLite
+EXPORT_SCHEMAS: Dict[str, Tuple[Tuple[str, str, str], ...]] = {
+    "sensor_readings": (
+        ("id", "ts", "int64"),
+        ("timestamp", "ts", "timestamp"),
+        ("soil_moisture", COLUMN_SQL["soil_moisture"], "float64"),
+        ("soil_is_dry", COLUMN_SQL["soil_is_dry"], "bool"),
+        ("water_level", COLUMN_SQL["water_level"], "float64"),
+        ("water_detected", COLUMN_SQL["water_detected"], "bool"),
+        ("rain_detected", COLUMN_SQL["rain_detected"], "bool"),
+        ("temperature", COLUMN_SQL["temperature"], "float64"),
+        ("air_humidity", COLUMN_SQL["air_humidity"], "float64"),
+        ("device_id", COLUMN_SQL["device_id"], "string"),
+    ),
+    "irrigation_events": (
+        ("id", "id", "int64"),
+        ("timestamp", "CAST(strftime('%s', timestamp) AS INTEGER) * 1000", "timestamp"),
+        ("duration", "duration", "float64"),
+        ("reason", "reason", "string"),
+        ("triggered_by", "triggered_by", "string"),
+        ("success", "success", "bool"),
+    ),
+}
+
+
+# Colonnes exposées par l'API d'historique (projection autorisée)
+# sensor_readings: noms de l'ancienne table, décodés depuis le schéma compact (id = ts en ms)
+HISTORY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "sensor_readings": ("id", "timestamp", "soil_moisture", "soil_is_dry", "water_level",
+                        "water_detected", "rain_detected", "temperature", "air_humidity", "device_id"),
+    "irrigation_events": ("id", "timestamp", "duration", "reason", "triggered_by", "success"),
+    "system_alerts": ("id", "timestamp", "alert_type", "message", "sensor_name", "resolved",
+                      "occurrences", "first_seen", "last_seen", "resolved_at"),
+}
+
+# Lignes typées (core/db_access.py): un champ par colonne exposée
+SensorRow = namedtuple("SensorRow", HISTORY_COLUMNS["sensor_readings"])
+IrrigationEventRow = namedtuple("IrrigationEventRow", HISTORY_COLUMNS["irrigation_events"])
+AlertRow = namedtuple("AlertRow", HISTORY_COLUMNS["system_alerts"])
+
+# Requêtes fixes (texte constant: instruction préparée réutilisée par connexion)
+RECENT_SENSOR_SQL = f"""
+    SELECT {compact_schema.select_columns(HISTORY_COLUMNS['sensor_readings'])}
+    FROM {SENSOR_TABLE}
+    WHERE device = ?
+    ORDER BY ts DESC
+    LIMIT ?
+"""
+
+SENSOR_AFTER_SQL = f"""
+    SELECT {compact_schema.select_columns(HISTORY_COLUMNS['sensor_readings'])}
+    FROM {SENSOR_TABLE}
+    WHERE device = ? AND ts > ?
+    ORDER BY ts
+    LIMIT ?
+"""
+
+EVENTS_AFTER_SQL = f"""
+    SELECT {', '.join(HISTORY_COLUMNS['irrigation_events'])}
+    FROM irrigation_events
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+
+RANGE_SENSOR_SQL = f"""
+    SELECT {compact_schema.select_columns(HISTORY_COLUMNS['sensor_readings'])}
+    FROM {SENSOR_TABLE}
+    WHERE device = ? AND ts >= ? AND ts < ?
+    ORDER BY ts
+"""
+
+RECENT_EVENTS_SQL = f"""
+    SELECT {', '.join(HISTORY_COLUMNS['irrigation_events'])}
+    FROM irrigation_events
+    WHERE timestamp > datetime('now', ?)
+    ORDER BY timestamp DESC
+"""
+
+# Colonnes de déduplication des alertes (ajoutées aux bases existantes)
+ALERT_DEDUP_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("occurrences", "INTEGER DEFAULT 1"),
+    ("first_seen", "DATETIME"),
+    ("last_seen", "DATETIME"),
+    ("resolved_at", "DATETIME"),
+)
+
+MAX_HISTORY_PAGE = 1000
+
+# Points max d'une série reconstruite (graphiques)
+MAX_SERIES_POINTS = 5000
+
+class _DayPartitionWriter:
+    """Écrit les lignes d'une table en fichiers colonnes, un fichier par jour"""
+
+    def __init__(self, out_dir: Path, schema: Tuple[Tuple[str, str, str], ...], fmt: str):
+        self.out_dir = out_dir
+        self.schema = schema
+        self.fmt = fmt
+        self.files: List[str] = []
+        self.rows = 0
+
+        self._day: Optional[str] = None
+        self._writer = None          # pyarrow.parquet.ParquetWriter
+        self._buffer: List[tuple] = []  # repli NumPy: lignes du jour courant
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(self, day: str, rows: List[tuple]):
+        if day != self._day:
+            self._flush_day()
+            self._day = day
+
+        if self.fmt == "parquet":
+            table = self._to_arrow(rows)
+            if self._writer is None:
+                import pyarrow.parquet as pq
+                path = self._next_path("parquet")
+                self._writer = pq.ParquetWriter(str(path), table.schema, compression="snappy")
+                self.files.append(str(path))
+            self._writer.write_table(table)
+        else:
+            self._buffer.extend(rows)
+
+        self.rows += len(rows)
+
+    def close(self):
+        self._flush_day()
+
+    def _next_path(self, ext: str) -> Path:
+        path = self.out_dir / f"date={self._day}.{ext}"
+        index = 1
+        while path.exists():
+            path = self.out_dir / f"date={self._day}-{index}.{ext}"
+            index += 1
+        return path
+
+    def _flush_day(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        if self._buffer:
+            import numpy as np
+            path = self._next_path("npz")
+            np.savez_compressed(str(path), **self._to_numpy(self._buffer))
+            self.files.append(str(path))
+            self._buffer = []
+
+    def _to_arrow(self, rows: List[tuple]):
+        import pyarrow as pa
+        columns = list(zip(*rows))
+        arrays = []
+        for (name, _, kind), values in zip(self.schema, columns):
+            if kind == "timestamp":
+                arrays.append(pa.array(values, pa.int64()).cast(pa.timestamp("ms", tz="UTC")))
+            elif kind == "bool":
+                arrays.append(pa.array([None if v is None else bool(v) for v in values], pa.bool_()))
+            elif kind == "string":
+                arrays.append(pa.array(values, pa.string()))
+            else:
+                arrays.append(pa.array(values, getattr(pa, kind)()))
+        return pa.Table.from_arrays(arrays, names=[name for name, _, _ in self.schema])
+
+    def _to_numpy(self, rows: List[tuple]) -> Dict[str, Any]:
+        import numpy as np
+        columns = list(zip(*rows))
+        arrays = {}
+        for (name, _, kind), values in zip(self.schema, columns):
+            if kind == "timestamp":
+                arrays[name] = np.array([v or 0 for v in values], dtype="int64").astype("datetime64[ms]")
+            elif kind == "bool":
+                arrays[name] = np.array([bool(v) for v in values], dtype=bool)
+            elif kind == "string":
+                arrays[name] = np.array(["" if v is None else v for v in values], dtype=str)
+            elif kind == "int64":
+                arrays[name] = np.array(values, dtype="int64")
+            else:
+                # None -> NaN
+                arrays[name] = np.array(values, dtype="float64")
+        return arrays
+
 class DatabaseManager:
     """Gestion de la base de données SQLite locale - VERSION CORRIGÉE"""
     
     def __init__(self, db_path: str = "irrigation.db"):
-        self.db_path = Path(db_path)
+        from config.settings import config
+        
+        # Mode RAM d'abord: connexions sur la copie tmpfs, la carte SD ne reçoit que les instantanés
+        self.durable_path = Path(db_path)
+        self.db_path = self.durable_path
+        restored_from = None
+        if config.storage.RAM_FIRST:
+            self.db_path = snapshot.live_path(self.durable_path, config.storage.RAM_DIR)
+            restored_from = snapshot.restore(self.durable_path, self.db_path)
+        self.snapshots = snapshot.create_worker(self.durable_path, self.db_path,
+                                                enabled=config.storage.RAM_FIRST)
+        self.snapshots.restored_from = restored_from
+        # Connexions réutilisées par thread (cache d'instructions préparées conservé)
+        self.pool = ConnectionPool(self.db_path)
+        # Résumés journaliers: deltas fusionnés par la prochaine transaction d'écriture
+        self.summaries = daily_summary.DailyAccumulator()
+        
+        self.device_name = config.persistence.DEVICE_ID
+        self.device_id = 0
+        self._device_ids: Dict[str, int] = {}
         self.initialize_database()
+        
+        self.alerts = AlertManager(self, update_interval=config.irrigation.ALERT_UPDATE_INTERVAL)
+        
+        # Rétention par paliers (thread démarré au premier trigger)
+        self.retention = retention.create_worker(self)
+        
+        # Lectures répétées servies depuis le cache tant que les tables lues n'ont pas changé
+        self.cache = QueryCache(self.db_path, max_entries=config.persistence.QUERY_CACHE_SIZE)
+        
+        # Enregistrement des mesures sur changement uniquement
+        self.recorder: Optional[ChangeOnlyRecorder] = None
+        self._recorder_lock = threading.Lock()
+        if config.persistence.CHANGE_ONLY:
+            self.recorder = ChangeOnlyRecorder(config.persistence.fields,
+                                               heartbeat=config.persistence.HEARTBEAT_INTERVAL)
     
     def initialize_database(self):
         """Initialise la base de données avec les bonnes colonnes - CORRIGÉ"""
@@ -23,21 +275,27 @@ class DatabaseManager:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Table des lectures de capteurs - COLONNES CORRIGÉES
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sensor_readings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    soil_moisture REAL,
-                    soil_is_dry BOOLEAN,
-                    water_level REAL,
-                    water_detected BOOLEAN,
-                    rain_detected BOOLEAN,
-                    temperature REAL,
-                    air_humidity REAL,  -- NOM CORRIGÉ (était 'humidity')
-                    device_id TEXT DEFAULT 'raspberry_pi'
-                )
-            """)
+            # Pages libérées rendues par incremental_vacuum (core/retention.py); effectif tout de
+            # suite sur une base neuve, sinon après le VACUUM de migration ou la commande de
+            # maintenance (service arrêté): python -m core.retention --convert-auto-vacuum
+            retention.enable_incremental_vacuum(cursor)
+            
+            # Lectures de capteurs: schéma compact (core/compact_schema.py)
+            compact_schema.create_tables(cursor)
+            retention.create_tables(cursor)
+            chunk_store.create_tables(cursor)
+            query_cache.create_tables(cursor)
+            daily_summary.create_tables(cursor)
+            egress.create_tables(cursor)
+            
+            # Migration: anciennes lectures copiées par blocs, puis ancienne table supprimée
+            if compact_schema.legacy_exists(conn):
+                from config.settings import config
+                logger.info("🔄 Migration de sensor_readings vers le schéma compact...")
+                compact_schema.migrate_legacy(conn, default_device=self.device_name,
+                                              chunk_size=config.persistence.MIGRATION_CHUNK_SIZE)
+            
+            self.device_id = compact_schema.device_id(cursor, self.device_name)
             
             # Table des événements d'irrigation
             cursor.execute("""
@@ -59,17 +317,46 @@ class DatabaseManager:
                     alert_type TEXT,
                     message TEXT,
                     sensor_name TEXT,
-                    resolved BOOLEAN DEFAULT 0
+                    resolved BOOLEAN DEFAULT 0,
+                    occurrences INTEGER DEFAULT 1,
+                    first_seen DATETIME,
+                    last_seen DATETIME,
+                    resolved_at DATETIME
                 )
             """)
             
+            # Migration: colonnes de déduplication sur les bases existantes
+            cursor.execute("PRAGMA table_info(system_alerts)")
+            alert_columns = {col[1] for col in cursor.fetchall()}
+            for column, definition in ALERT_DEDUP_COLUMNS:
+                if column not in alert_columns:
+                    cursor.execute(f"ALTER TABLE system_alerts ADD COLUMN {column} {definition}")
+            
+            # Curseurs d'envoi vers Firebase (SyncManager): reprise après coupure ou redémarrage
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sync_cursors (
+                    name TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            
+            # Index pour les filtres temporels de l'historique
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_irrigation_events_timestamp ON irrigation_events(timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_system_alerts_timestamp ON system_alerts(timestamp)")
+            
+            # Index partiel: seules les alertes ouvertes y figurent (reste petit)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_system_alerts_open
+                ON system_alerts(alert_type, sensor_name) WHERE resolved = 0
+            """)
+            
             conn.commit()
             logger.info(f"✅ Base de données initialisée: {self.db_path}")
             
             # Vérifier les colonnes
-            cursor.execute("PRAGMA table_info(sensor_readings)")
+            cursor.execute(f"PRAGMA table_info({SENSOR_TABLE})")
             columns = [col[1] for col in cursor.fetchall()]
-            logger.info(f"📋 Colonnes table sensor_readings: {columns}")
+            logger.info(f"📋 Colonnes table {SENSOR_TABLE}: {columns}")
             
         except Exception as e:
             logger.error(f"❌ Erreur initialisation BD: {e}")
@@ -79,221 +366,629 @@ class DatabaseManager:
                 conn.close()
     
     def save_sensor_data(self, sensor_data: Dict[str, Any]) -> bool:
-        """Sauvegarde les données des capteurs - VERSION CORRIGÉE"""
+        """
+        Sauvegarde les données des capteurs
+        Mode changement seul (config.persistence): une ligne n'est écrite que si une valeur
+        sort de sa bande morte / porte battante, ou au plus tard à chaque heartbeat
+        """
+        values = compact_schema.reading_values(sensor_data)
+        timestamp = sensor_data.get("timestamp") or time.time()
+        # Toutes les lectures comptent dans le résumé, même celles que le mode changement écarte
+        self.summaries.add_reading(self.device_id, timestamp, values)
+        
+        if self.recorder is None:
+            rows = [(timestamp, values)]
+        else:
+            with self._recorder_lock:
+                rows = self.recorder.offer(timestamp, values)
+        
+        return self._insert_sensor_rows(rows)
+    
+    def flush_sensor_data(self) -> bool:
+        """Écrit la dernière lecture retenue (arrêt du système)"""
+        if self.recorder is None:
+            return True
+        with self._recorder_lock:
+            rows = self.recorder.flush()
+        return self._insert_sensor_rows(rows) and self.flush_summaries()
+    
+    def _insert_sensor_rows(self, rows: List[Tuple[float, Dict[str, Any]]]) -> bool:
+        if not rows:
+            return True
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            sensors = sensor_data.get("sensors", {})
-            soil = sensors.get("soil", {})
-            water = sensors.get("water", {})
-            rain = sensors.get("rain", {})
-            dht22 = sensors.get("dht22", {})
-            
-            # Vérifier que toutes les valeurs sont présentes
-            temperature = dht22.get('temperature')
-            air_humidity = dht22.get('humidity')  # Note: c'est 'humidity' dans le dict, 'air_humidity' dans la table
-            
-            cursor.execute("""
-                INSERT INTO sensor_readings 
-                (soil_moisture, soil_is_dry, water_level, water_detected, 
-                 rain_detected, temperature, air_humidity)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                soil.get('moisture_percent', 0.0),
-                soil.get('is_dry', True),
-                water.get('water_percent', 0.0),
-                water.get('water_detected', False),
-                rain.get('rain_detected', False),
-                temperature if temperature is not None else 0.0,
-                air_humidity if air_humidity is not None else 0.0
-            ))
-            
-            conn.commit()
-            logger.debug("✅ Données capteurs sauvegardées")
+            with self._write_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(compact_schema.INSERT_SQL, [
+                    compact_schema.encode_row(self.device_id, ts, values) for ts, values in rows
+                ])
+                bump_versions(cursor, SENSOR_TABLE)
+            
+            logger.debug(f"✅ Données capteurs sauvegardées ({len(rows)} lignes)")
             return True
-            
+        
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde données: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
     
-    # ... (le reste du code reste identique)
+    def insert_readings(self, batches: Dict[str, List[Tuple[float, Dict[str, Any]]]]) -> int:
+        """
+        Écriture groupée de lectures de plusieurs appareils (agrégateur, /api/ingest)
+        Une transaction, un executemany; une lecture déjà reçue (appareil, ts) est remplacée,
+        ce qui rend les renvois d'un nœud sans effet
+        """
+        # Nouveaux appareils mis en cache après le commit (un rollback annule aussi leur ligne devices)
+        created: Dict[str, int] = {}
+        # Résumés comptés seulement si le lot est validé (IngestWriter réessaie les lots en échec)
+        batch_summaries = daily_summary.DailyAccumulator()
+        with self._write_transaction(batch_summaries) as conn:
+            cursor = conn.cursor()
+            encoded = []
+            for name, rows in batches.items():
+                device = self._device_ids.get(name)
+                if device is None:
+                    device = created[name] = compact_schema.device_id(cursor, name)
+                encoded.extend(compact_schema.encode_row(device, ts, values) for ts, values in rows)
+                for ts, values in rows:
+                    batch_summaries.add_reading(device, ts, values)
+            
+            cursor.executemany(compact_schema.INSERT_SQL, encoded)
+            bump_versions(cursor, SENSOR_TABLE)
+        self._device_ids.update(created)
+        return len(encoded)
     
-    def save_sensor_data(self, sensor_data: Dict[str, Any]) -> bool:
-        """Sauvegarde les données des capteurs"""
+    def get_sensor_series(self, fields: Optional[Sequence[str]] = None,
+                          start: Optional[float] = None, end: Optional[float] = None,
+                          step: float = 300.0, device: Optional[str] = None) -> Dict[str, List[Any]]:
+        """
+        Série régulière reconstruite pour les graphiques (epoch secondes en entrée, ms en sortie)
+        Interpolation linéaire des champs swinging_door, dernière valeur connue pour les autres
+        """
+        from config.settings import config
+        
+        columns = [c for c in HISTORY_COLUMNS["sensor_readings"] if c not in ("id", "timestamp", "device_id")]
+        fields = list(fields) if fields else columns
+        invalid = [f for f in fields if f not in columns]
+        if invalid:
+            raise ValueError(f"Champs inconnus: {invalid}")
+        if step <= 0:
+            raise ValueError("step doit être > 0")
+        
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 86400
+        if (end - start) / step > MAX_SERIES_POINTS:
+            raise ValueError(f"Trop de points (max {MAX_SERIES_POINTS}): augmenter step")
+        
+        selected = compact_schema.select_columns(fields)
+        cursor = self.pool.connection().cursor()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            sensors = sensor_data.get("sensors", {})
-            soil = sensors.get("soil", {})
-            water = sensors.get("water", {})
-            rain = sensors.get("rain", {})
-            dht22 = sensors.get("dht22", {})
-            
-            cursor.execute("""
-                INSERT INTO sensor_readings 
-                (soil_moisture, soil_is_dry, water_level, water_detected, 
-                 rain_detected, temperature, air_humidity)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                soil.get('moisture_percent', 0.0),
-                soil.get('is_dry', True),
-                water.get('water_percent', 0.0),
-                water.get('water_detected', False),
-                rain.get('rain_detected', False),
-                dht22.get('temperature', 0.0),
-                dht22.get('humidity', 0.0)
-            ))
-            
-            conn.commit()
-            logger.debug("✅ Données capteurs sauvegardées")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde données: {e}")
-            return False
+            device_ref = self._device_ref(cursor, device)
+            # Ligne précédant la fenêtre (valeur de départ), lignes de la fenêtre, puis la suivante
+            # Parcours de la clé primaire (device, ts): lecture contiguë
+            cursor.execute(f"""
+                SELECT * FROM (SELECT ts / 1000.0, {selected} FROM {SENSOR_TABLE}
+                               WHERE device = ? AND ts < ? ORDER BY ts DESC LIMIT 1)
+                UNION ALL
+                SELECT * FROM (SELECT ts / 1000.0, {selected} FROM {SENSOR_TABLE}
+                               WHERE device = ? AND ts >= ? AND ts <= ? ORDER BY ts)
+                UNION ALL
+                SELECT * FROM (SELECT ts / 1000.0, {selected} FROM {SENSOR_TABLE}
+                               WHERE device = ? AND ts > ? ORDER BY ts LIMIT 1)
+            """, (device_ref, to_ms(start), device_ref, to_ms(start), to_ms(end), device_ref, to_ms(end)))
+            rows = [(row[0], row[1:]) for row in cursor.fetchall()]
         finally:
-            if conn:
-                conn.close()
+            cursor.close()
+        
+        modes = {name: mode for name, (mode, _) in config.persistence.fields.items()}
+        return interpolate_series(rows, fields, modes, start, end, step)
+    
+    def _device_ref(self, cursor: sqlite3.Cursor, name: Optional[str]) -> int:
+        """Identifiant d'un appareil par nom (appareil local par défaut, -1 si inconnu)"""
+        if name is None or name == self.device_name:
+            return self.device_id
+        cursor.execute("SELECT id FROM devices WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        return row[0] if row else -1
+    
+    def get_persistence_stats(self) -> Dict[str, Any]:
+        """Lignes proposées / écrites par l'enregistrement sur changement"""
+        if self.recorder is None:
+            return {"change_only": False}
+        with self._recorder_lock:
+            return {"change_only": True, **self.recorder.get_stats()}
     
     def save_irrigation_event(self, duration: float, reason: str, 
                             triggered_by: str = "auto", success: bool = True) -> bool:
         """Sauvegarde un événement d'irrigation"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO irrigation_events (duration, reason, triggered_by, success)
-                VALUES (?, ?, ?, ?)
-            """, (duration, reason, triggered_by, success))
+            event = daily_summary.DailyAccumulator()
+            event.add_irrigation(self.device_id, time.time(), duration, success)
+            with self._write_transaction(event) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO irrigation_events (duration, reason, triggered_by, success)
+                    VALUES (?, ?, ?, ?)
+                """, (duration, reason, triggered_by, success))
+                bump_versions(cursor, "irrigation_events")
             
-            conn.commit()
             logger.info(f"✅ Irrigation sauvegardée: {duration}s - {reason}")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde irrigation: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
     
     def save_alert(self, alert_type: str, message: str, sensor_name: str = None) -> bool:
-        """Sauvegarde une alerte système"""
+        """
+        Signale une alerte système
+        Dédupliquée par (type, capteur): une alerte déjà ouverte n'est pas réinsérée,
+        son compteur d'occurrences est mis à jour (écriture limitée)
+        """
+        return self.alerts.raise_alert(alert_type, message, sensor_name)
+    
+    def resolve_alert(self, alert_type: str, sensor_name: str = None) -> bool:
+        """Ferme une alerte quand la condition a disparu"""
+        return self.alerts.resolve(alert_type, sensor_name)
+    
+    def get_open_alerts(self, alert_type: str = None, sensor_name: str = None) -> List[Dict[str, Any]]:
+        """Alertes ouvertes (compteurs à jour)"""
+        return self.alerts.get_open_alerts(alert_type, sensor_name)
+    
+    # === ALERTES (SQL) ===
+    
+    def insert_alert(self, alert_type: str, message: str, sensor_name: Optional[str],
+                     seen_at: str) -> Optional[int]:
+        """Insère une nouvelle alerte ouverte, retourne son id"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO system_alerts (alert_type, message, sensor_name)
-                VALUES (?, ?, ?)
-            """, (alert_type, message, sensor_name))
+            alert = daily_summary.DailyAccumulator()
+            alert.add_alert(self.device_id, time.time())
+            with self._write_transaction(alert) as conn:
+                cursor = conn.execute("""
+                    INSERT INTO system_alerts (alert_type, message, sensor_name, occurrences, first_seen, last_seen)
+                    VALUES (?, ?, ?, 1, ?, ?)
+                """, (alert_type, message, sensor_name, seen_at, seen_at))
+            return cursor.lastrowid
             
-            conn.commit()
-            logger.warning(f"⚠️ Alerte enregistrée: {alert_type} - {message}")
+        except Exception as e:
+            logger.error(f"❌ Erreur sauvegarde alerte: {e}")
+            return None
+    
+    def update_alert(self, alert_id: int, occurrences: int, last_seen: str, message: str,
+                     resolved_at: Optional[str] = None) -> bool:
+        """Met à jour le compteur d'une alerte (et la ferme si resolved_at)"""
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute("""
+                    UPDATE system_alerts
+                    SET occurrences = ?, last_seen = ?, message = ?,
+                        first_seen = COALESCE(first_seen, timestamp),
+                        resolved = ?, resolved_at = ?
+                    WHERE id = ?
+                """, (occurrences, last_seen, message, resolved_at is not None, resolved_at, alert_id))
             return True
             
         except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde alerte: {e}")
+            logger.error(f"❌ Erreur mise à jour alerte: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
     
-    def get_today_irrigation_time(self) -> float:
-        """Retourne le temps total d'irrigation aujourd'hui"""
+    def resolve_alerts(self, alert_ids: Sequence[int], resolved_at: str) -> int:
+        """Ferme plusieurs alertes en une transaction"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT SUM(duration) as total 
-                FROM irrigation_events 
-                WHERE DATE(timestamp) = DATE('now') 
-                AND success = 1
-            """)
+            with self.pool.transaction() as conn:
+                cursor = conn.executemany(
+                    "UPDATE system_alerts SET resolved = 1, resolved_at = ? WHERE id = ?",
+                    [(resolved_at, alert_id) for alert_id in alert_ids]
+                )
+            return cursor.rowcount
             
-            result = cursor.fetchone()
-            return result[0] or 0.0
+        except Exception as e:
+            logger.error(f"❌ Erreur fermeture alertes: {e}")
+            return 0
+    
+    def query_open_alerts(self, alert_type: Optional[str] = None,
+                          sensor_name: Optional[str] = None) -> List[AlertRow]:
+        """Alertes ouvertes en base (index partiel idx_system_alerts_open)"""
+        try:
+            query = f"SELECT {', '.join(AlertRow._fields)} FROM system_alerts WHERE resolved = 0"
+            params: List[Any] = []
+            if alert_type is not None:
+                query += " AND alert_type = ?"
+                params.append(alert_type)
+            if sensor_name is not None:
+                query += " AND sensor_name = ?"
+                params.append(sensor_name)
+            query += " ORDER BY id"
+            
+            return fetch_all(self.pool.connection(), query, params, AlertRow)
             
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture alertes: {e}")
+            return []
+    
+    def get_today_irrigation_time(self) -> float:
+        """Retourne le temps total d'irrigation aujourd'hui (en cache jusqu'au prochain événement)"""
+        try:
+            # Jour UTC dans la clé: DATE('now') change à minuit sans écriture
+            return self.cache.get("today_irrigation_time", (time.strftime("%Y-%m-%d", time.gmtime()),),
+                                  ("irrigation_events",), self._query_today_irrigation_time)
         except Exception as e:
             logger.error(f"❌ Erreur calcul temps irrigation: {e}")
             return 0.0
-        finally:
-            if conn:
-                conn.close()
     
-    def get_recent_sensor_data(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Récupère les dernières lectures de capteurs"""
+    def _query_today_irrigation_time(self) -> float:
+        row = self.pool.connection().execute("""
+            SELECT SUM(duration) as total 
+            FROM irrigation_events 
+            WHERE DATE(timestamp) = DATE('now') 
+            AND success = 1
+        """).fetchone()
+        return row[0] or 0.0
+    
+    def get_recent_sensor_data(self, limit: int = 10, device: Optional[str] = None) -> List[SensorRow]:
+        """Récupère les dernières lectures de capteurs (colonnes de l'ancienne table)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(f"""
-                SELECT * FROM sensor_readings 
-                ORDER BY timestamp DESC 
-                LIMIT {limit}
-            """)
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
-            
+            # Lignes immuables: copie superficielle de la liste en cache
+            return self.cache.get("recent_sensor_data", (int(limit), device or self.device_name),
+                                  (SENSOR_TABLE,), lambda: self._query_recent_sensor_data(limit, device),
+                                  deep=False)
         except Exception as e:
             logger.error(f"❌ Erreur récupération données: {e}")
             return []
-        finally:
-            if conn:
-                conn.close()
     
-    def cleanup_old_data(self, days_to_keep: int = 7) -> int:
-        """Nettoie les vieilles données pour gagner de l'espace"""
+    def _query_recent_sensor_data(self, limit: int, device: Optional[str]) -> List[SensorRow]:
+        conn = self.pool.connection()
+        return fetch_all(conn, RECENT_SENSOR_SQL, (self._device_ref(conn.cursor(), device), int(limit)),
+                         SensorRow)
+    
+    def get_sensor_rows(self, start: float, end: Optional[float] = None,
+                        device: Optional[str] = None) -> List[SensorRow]:
+        """Lectures brutes [start, end[ (epoch secondes), ordre chronologique"""
+        end = end if end is not None else time.time()
+        conn = self.pool.connection()
+        return fetch_all(conn, RANGE_SENSOR_SQL,
+                         (self._device_ref(conn.cursor(), device), to_ms(start), to_ms(end)), SensorRow)
+    
+    def get_sensor_rows_after(self, after_ms: int, limit: int = 500) -> List[SensorRow]:
+        """Lectures locales postérieures à after_ms (epoch ms), ordre chronologique"""
+        return fetch_all(self.pool.connection(), SENSOR_AFTER_SQL, (self.device_id, int(after_ms), int(limit)),
+                         SensorRow)
+    
+    def get_irrigation_events_after(self, after_id: int, limit: int = 500) -> List[IrrigationEventRow]:
+        return fetch_all(self.pool.connection(), EVENTS_AFTER_SQL, (int(after_id), int(limit)),
+                         IrrigationEventRow)
+    
+    def count_sync_backlog(self, sensor_after_ms: Optional[int], event_after_id: Optional[int]) -> Dict[str, int]:
+        """Éléments pas encore envoyés par flux (curseur None: aucun envoi encore fait)"""
+        conn = self.pool.connection()
+        backlog = {"sensor_readings": 0, "irrigation_events": 0}
+        if sensor_after_ms is not None:
+            backlog["sensor_readings"] = conn.execute(
+                f"SELECT COUNT(*) FROM {SENSOR_TABLE} WHERE device = ? AND ts > ?",
+                (self.device_id, int(sensor_after_ms))).fetchone()[0]
+        if event_after_id is not None:
+            backlog["irrigation_events"] = conn.execute(
+                "SELECT COUNT(*) FROM irrigation_events WHERE id > ?", (int(event_after_id),)).fetchone()[0]
+        backlog["daily_summaries"] = daily_summary.count_unpushed(conn.cursor())
+        return backlog
+    
+    def get_sync_cursor(self, name: str) -> Optional[int]:
+        row = self.pool.connection().execute("SELECT position FROM sync_cursors WHERE name = ?",
+                                             (name,)).fetchone()
+        return row[0] if row else None
+    
+    def set_sync_cursor(self, name: str, position: int):
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                INSERT INTO sync_cursors (name, position) VALUES (?, ?)
+                ON CONFLICT (name) DO UPDATE SET position = excluded.position
+            """, (name, int(position)))
+    
+    def get_recent_irrigation_events(self, hours: float = 24) -> List[IrrigationEventRow]:
+        """Événements d'irrigation des dernières heures, plus récents d'abord"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Supprimer les données de capteurs vieilles de plus de X jours
-            cursor.execute("""
-                DELETE FROM sensor_readings 
-                WHERE timestamp < datetime('now', ?)
-            """, (f'-{days_to_keep} days',))
-            
-            deleted_rows = cursor.rowcount
-            
-            # Supprimer les événements d'irrigation vieux
-            cursor.execute("""
-                DELETE FROM irrigation_events 
-                WHERE timestamp < datetime('now', ?)
-            """, (f'-{days_to_keep} days',))
-            
-            deleted_rows += cursor.rowcount
-            
-            # Marquer les anciennes alertes comme résolues
-            cursor.execute("""
-                UPDATE system_alerts 
-                SET resolved = 1 
-                WHERE timestamp < datetime('now', ?)
-            """, (f'-{days_to_keep} days',))
-            
-            conn.commit()
-            logger.info(f"🧹 Données nettoyées: {deleted_rows} lignes supprimées")
-            return deleted_rows
-            
+            return fetch_all(self.pool.connection(), RECENT_EVENTS_SQL, (f"-{hours} hours",),
+                             IrrigationEventRow)
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération événements: {e}")
+            return []
+    
+    @contextmanager
+    def _write_transaction(self, local: Optional[daily_summary.DailyAccumulator] = None) -> Iterator[sqlite3.Connection]:
+        """
+        Transaction d'écriture qui fusionne aussi les résumés en attente, plus les deltas `local`
+        propres à cette écriture; échec (commit compris): deltas en attente remis, locaux abandonnés
+        """
+        pending = self.summaries.take()
+        try:
+            with self.pool.transaction() as conn:
+                yield conn
+                cursor = conn.cursor()
+                merged = daily_summary.merge(cursor, pending)
+                if local is not None:
+                    merged += daily_summary.merge(cursor, local.take())
+                if merged:
+                    bump_versions(cursor, daily_summary.SUMMARY_TABLE)
+        except BaseException:
+            self.summaries.restore(pending)
+            raise
+    
+    def flush_summaries(self) -> bool:
+        """Fusionne les résumés en attente (lectures écartées par le mode changement)"""
+        if not self.summaries.pending:
+            return True
+        try:
+            with self._write_transaction():
+                pass
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erreur fusion résumés journaliers: {e}")
+            return False
+    
+    def get_daily_summaries(self, days: int = 7, device: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Résumés des `days` derniers jours UTC (plus récent d'abord)"""
+        self.flush_summaries()
+        now = time.time()
+        first = daily_summary.utc_day(now - (max(1, days) - 1) * 86400)
+        last = daily_summary.utc_day(now)
+        return self.cache.get("daily_summaries", (first, last, device or self.device_name),
+                              (daily_summary.SUMMARY_TABLE,),
+                              lambda: self._query_daily_summaries(first, last, device))
+    
+    def _query_daily_summaries(self, first: str, last: str, device: Optional[str]) -> List[Dict[str, Any]]:
+        rows = self._query_summaries(first, last, device)
+        return [self._summary_document([row], "day", device) for row in reversed(rows)]
+    
+    def get_weekly_summary(self, day: Optional[str] = None, device: Optional[str] = None) -> Dict[str, Any]:
+        """Résumé de la semaine ISO contenant `day` (YYYY-MM-DD, semaine en cours par défaut)"""
+        self.flush_summaries()
+        first, last = daily_summary.week_days(day or daily_summary.utc_day(time.time()))
+        return self._summary_document(self._query_summaries(first, last, device), "week", device)
+    
+    def _query_summaries(self, first: str, last: str, device: Optional[str]) -> List[daily_summary.SummaryRow]:
+        cursor = self.pool.connection().cursor()
+        return daily_summary.read_days(cursor, self._device_ref(cursor, device), first, last)
+    
+    def _summary_document(self, rows: List[daily_summary.SummaryRow], period: str,
+                          device: Optional[str]) -> Dict[str, Any]:
+        from config.settings import config
+        return daily_summary.to_document(rows, device or self.device_name, period,
+                                         config.irrigation.PUMP_FLOW_LPM)
+    
+    def get_unpushed_summaries(self) -> List[Tuple[str, Dict[str, Any], List[daily_summary.SummaryRow]]]:
+        """
+        Documents à pousser (SyncManager): chaque jour modifié depuis son dernier envoi, puis
+        la semaine de chacun de ces jours; (identifiant, document, lignes à marquer)
+        """
+        self.flush_summaries()
+        cursor = self.pool.connection().cursor()
+        rows = daily_summary.read_unpushed(cursor)
+        names = dict(cursor.execute("SELECT id, name FROM devices").fetchall())
+        documents = []
+        weeks = set()
+        for row in rows:
+            name = names.get(row.device, str(row.device))
+            documents.append((f"{name}_{row.day}", self._summary_document([row], "day", name), [row]))
+            weeks.add((row.device, name, daily_summary.week_days(row.day)))
+        for device_id, name, (first, last) in sorted(weeks):
+            week = daily_summary.read_days(cursor, device_id, first, last)
+            documents.append((f"{name}_week_{first}", self._summary_document(week, "week", name), []))
+        return documents
+    
+    def mark_summaries_pushed(self, rows: List[daily_summary.SummaryRow]):
+        with self.pool.transaction() as conn:
+            daily_summary.mark_pushed(conn.cursor(), rows)
+    
+    def cleanup_old_data(self, days_to_keep: Optional[int] = None) -> int:
+        """
+        Passe de rétention immédiate (core/retention.py): lectures brutes agrégées par heure puis
+        supprimées par petits blocs; retention.trigger() pour ne pas attendre
+        """
+        try:
+            result = self.retention.run_once(raw_days=days_to_keep)
+            return result["raw_deleted"] + result["events_deleted"] + result["rollups_deleted"]
         except Exception as e:
             logger.error(f"❌ Erreur nettoyage données: {e}")
             return 0
+    
+    def get_sensor_rollups(self, start: Optional[float] = None, end: Optional[float] = None,
+                           device: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Agrégats horaires (lectures plus anciennes que la rétention brute), epoch secondes"""
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 30 * 86400
+        cursor = self.pool.connection().cursor()
+        try:
+            rows = retention.read_rollups(cursor, self._device_ref(cursor, device), to_ms(start), to_ms(end))
         finally:
-            if conn:
-                conn.close()
+            cursor.close()
+        columns = retention.rollup_columns()
+        return [dict(zip(columns, row)) for row in rows]
+    
+    def get_sensor_arrays(self, fields: Optional[Sequence[str]] = None, start: Optional[float] = None,
+                          end: Optional[float] = None, device: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Historique complet en tableaux NumPy (epoch secondes en entrée, 'ts' en ms):
+        blocs compressés des lectures anciennes + lectures brutes récentes
+        """
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 30 * 86400
+        cursor = self.pool.connection().cursor()
+        try:
+            return chunk_store.read_arrays(cursor, self._device_ref(cursor, device),
+                                           to_ms(start), to_ms(end), fields)
+        finally:
+            cursor.close()
+    
+    # === HISTORIQUE PAGINÉ ===
+    
+    def iter_history(self, table: str, fields: Optional[Sequence[str]] = None,
+                     after_id: Optional[int] = None, before_id: Optional[int] = None,
+                     start: Optional[str] = None, end: Optional[str] = None,
+                     limit: int = 100, descending: bool = False,
+                     device: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt l'historique ligne par ligne avec pagination par clé (id)
+        - after_id / before_id: curseur (page suivante = id de la dernière ligne reçue)
+        - start / end: filtre sur timestamp
+        - fields: projection (id toujours inclus)
+        - device: appareil (sensor_readings uniquement, appareil local par défaut)
+        Mémoire constante: les lignes sont lues par fetchmany et produites une à une
+        """
+        columns = HISTORY_COLUMNS.get(table)
+        if columns is None:
+            raise ValueError(f"Table inconnue: {table}")
+        
+        if fields:
+            invalid = [f for f in fields if f not in columns]
+            if invalid:
+                raise ValueError(f"Champs inconnus: {invalid}")
+            selected = ["id"] + [f for f in fields if f != "id"]
+        else:
+            selected = list(columns)
+        
+        source = SOURCES[table]
+        where = []
+        params: List[Any] = []
+        if after_id is not None:
+            where.append(f"{source.key} > ?")
+            params.append(int(after_id))
+        if before_id is not None:
+            where.append(f"{source.key} < ?")
+            params.append(int(before_id))
+        if start:
+            where.append(f"{source.time_column} >= ?")
+            params.append(source.bound(start))
+        if end:
+            where.append(f"{source.time_column} < ?")
+            params.append(source.bound(end))
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            if source.compact:
+                where.insert(0, "device = ?")
+                params.insert(0, self._device_ref(cursor, device))
+            
+            query = f"SELECT {', '.join(f'{source.column(c)} AS {c}' for c in selected)} FROM {source.table}"
+            if where:
+                query += " WHERE " + " AND ".join(where)
+            query += f" ORDER BY {source.key} {'DESC' if descending else 'ASC'} LIMIT ?"
+            params.append(max(1, min(int(limit), MAX_HISTORY_PAGE)))
+            
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(200)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(selected, row))
+        finally:
+            conn.close()
+    
+    # === EXPORT COLONNES ===
+    
+    def iter_table_chunks(self, table: str, columns: Sequence[str],
+                          start: Optional[str] = None, end: Optional[str] = None,
+                          chunk_size: int = 5000) -> Iterator[List[tuple]]:
+        """
+        Parcourt une table par blocs (fetchmany) - mémoire constante
+        start/end: bornes sur timestamp ('YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM:SS', UTC)
+        """
+        if table not in EXPORT_SCHEMAS:
+            raise ValueError(f"Table non exportable: {table}")
+        
+        source = SOURCES[table]
+        where = []
+        params = []
+        if start:
+            where.append(f"{source.time_column} >= ?")
+            params.append(source.bound(start))
+        if end:
+            where.append(f"{source.time_column} < ?")
+            params.append(source.bound(end))
+        
+        query = f"SELECT {', '.join(columns)} FROM {source.table}"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        # Schéma compact: ordre de la clé primaire (appareil, date)
+        query += f" ORDER BY {'device, ' if source.compact else ''}{source.key}"
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.arraysize = chunk_size
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+    
+    def export_columnar(self, out_dir: str,
+                        tables: Sequence[str] = ("sensor_readings", "irrigation_events"),
+                        start: Optional[str] = None, end: Optional[str] = None,
+                        fmt: str = "auto", chunk_size: int = 5000) -> Dict[str, Any]:
+        """
+        Exporte l'historique en fichiers colonnes partitionnés par jour
+        fmt: 'parquet' (pyarrow), 'npz' (NumPy) ou 'auto' (parquet si disponible)
+        Returns: {"format", "files", "rows", "duration"}
+        """
+        if fmt == "auto":
+            try:
+                import pyarrow.parquet  # noqa: F401
+                fmt = "parquet"
+            except ImportError:
+                logger.info("💡 pyarrow non installé, export NumPy (.npz)")
+                fmt = "npz"
+        
+        started = time.time()
+        result = {"format": fmt, "files": [], "rows": {}}
+        
+        for table in tables:
+            schema = EXPORT_SCHEMAS[table]
+            # Dernière colonne = jour de partition
+            columns = [expr for _, expr, _ in schema] + [SOURCES[table].day_sql]
+            writer = _DayPartitionWriter(Path(out_dir) / table, schema, fmt)
+            
+            try:
+                for rows in self.iter_table_chunks(table, columns, start, end, chunk_size):
+                    # Découper le bloc en séries consécutives d'un même jour
+                    run_start = 0
+                    for i in range(1, len(rows) + 1):
+                        if i == len(rows) or rows[i][-1] != rows[run_start][-1]:
+                            day = rows[run_start][-1] or "unknown"
+                            writer.write(day, [row[:-1] for row in rows[run_start:i]])
+                            run_start = i
+            finally:
+                writer.close()
+            
+            result["files"].extend(writer.files)
+            result["rows"][table] = writer.rows
+        
+        result["duration"] = round(time.time() - started, 3)
+        logger.info(f"📦 Export {fmt}: {result['rows']} en {result['duration']}s")
+        return result
+    
+    def export_archive(self, archive_path: str, work_dir: str, **kwargs) -> Dict[str, Any]:
+        """Exporte puis regroupe les fichiers dans une archive zip (non recompressée)"""
+        result = self.export_columnar(work_dir, **kwargs)
+        
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for file_path in result["files"]:
+                archive.write(file_path, arcname=str(Path(file_path).relative_to(work_dir)))
+        
+        result["archive"] = archive_path
+        return result
     
     def close(self):
         """Ferme proprement la connexion"""
+        self.flush_sensor_data()
+        self.alerts.flush()
+        self.cache.close()
+        self.pool.close()
+        self.snapshots.stop()
         logger.info("🔒 Base de données fermée")
 
-# Instance globale
-db_manager = DatabaseManager()
\ No newline at end of file
+# Instance globale (tables créées au premier accès)
+db_manager = LazyInstance(DatabaseManager, "db_manager")
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Accès SQLite commun: connexions réutilisées et lignes typées
+- ConnectionPool: une connexion par thread (et par processus: rouverte après fork), gardée
+  ouverte tant que le thread vit (fermée à sa fin: serveur de dev threaded, threads de
+  synchronisation manuelle); le cache d'instructions préparées de sqlite3 (cached_statements) n'est plus perdu
+  à chaque requête: une requête paramétrée répétée n'est analysée qu'une fois
+- requêtes toujours paramétrées (jamais de valeur dans le texte SQL: une instruction par
+  texte dans le cache)
+- lignes décodées en NamedTuple (fetch_all / fetch_one): pas de dict par ligne; _asdict()
+  seulement à la frontière JSON
+
+Banc de mesure (lignes décodées par seconde, coût par requête, connexions ouvertes après
+N threads courts successifs: doit rester borné):
+    python -m core.db_access --rows 100000 --threads 300
+"""
+import os
+import time
+import sqlite3
+import logging
+import weakref
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+class _ThreadConnection:
+    """Connexion d'un thread; libérée avec le stockage local du thread (weakref.finalize)"""
+
+    __slots__ = ("conn", "pid", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.pid = os.getpid()
+
+
+def _release(conn: sqlite3.Connection, pid: int, connections: List[sqlite3.Connection], lock: threading.Lock):
+    """Fin du thread: connexion retirée du pool et fermée (jamais dans un processus fils)"""
+    with lock:
+        try:
+            connections.remove(conn)
+        except ValueError:
+            return  # déjà fermée par close()
+    if os.getpid() == pid:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+class ConnectionPool:
+    """Connexions par thread vers une base SQLite (cache d'instructions conservé)"""
+
+    def __init__(self, db_path, cached_statements: int = 128, timeout: float = 30.0):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "queries": 0}
+
+    def connection(self) -> sqlite3.Connection:
+        """Connexion du thread courant (ouverte au premier usage)"""
+        holder = getattr(self._local, "holder", None)
+        if holder is None or holder.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                                   cached_statements=self.cached_statements,
+                                   check_same_thread=False)
+            holder = _ThreadConnection(conn)
+            with self._lock:
+                self._connections.append(conn)
+                self.stats["opened"] += 1
+            weakref.finalize(holder, _release, conn, holder.pid, self._connections, self._lock)
+            self._local.holder = holder
+        self.stats["queries"] += 1
+        return holder.conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Connexion du thread dans une transaction (commit, ou rollback sur exception)"""
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def close(self):
+        """Ferme les connexions de tous les threads (arrêt)"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()  # liste partagée avec les finaliseurs
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local.holder = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "open": len(self._connections)}
+
+
+def fetch_all(conn: sqlite3.Connection, sql: str, params: Sequence[Any] = (),
+              record: Optional[Type[R]] = None) -> List[R]:
+    """Lignes d'une requête paramétrée, en NamedTuple `record` (tuples bruts si None)"""
+    cursor = conn.execute(sql, params)
+    if record is None:
+        return cursor.fetchall()
+    return list(map(record._make, cursor))
+
+
+def fetch_one(conn: sqlite3.Connection, sql: str, params: Sequence[Any] = (),
+              record: Optional[Type[R]] = None) -> Optional[R]:
+    row = conn.execute(sql, params).fetchone()
+    if row is None or record is None:
+        return row
+    return record._make(row)
+
+
+# === BANC DE MESURE ===
+
+class _BenchRow(NamedTuple):
+    id: int
+    timestamp: str
+    soil_moisture: float
+    temperature: float
+    air_humidity: float
+    device_id: str
+
+
+def run_benchmark(rows: int = 100000, queries: int = 2000, work_dir: Optional[str] = None,
+                  threads: int = 300) -> Dict[str, Any]:
+    """
+    Décodage de `rows` lignes selon la méthode (lignes/s), puis coût d'une petite requête
+    paramétrée répétée: connexion neuve par requête vs connexion réutilisée (cache d'instructions)
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="irrigation_dal_")
+    path = os.path.join(work_dir, "bench.db")
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, timestamp TEXT, soil_moisture REAL, "
+                 "temperature REAL, air_humidity REAL, device_id TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?, ?)",
+                     [(i, "2024-01-01 00:00:00", 40.0 + i % 20, 21.5, 60.0, "raspberry_pi")
+                      for i in range(rows)])
+    conn.commit()
+    sql = "SELECT id, timestamp, soil_moisture, temperature, air_humidity, device_id FROM t"
+    columns = _BenchRow._fields
+
+    def row_dict():
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(sql)]
+        finally:
+            conn.row_factory = None
+
+    decoders = {
+        "sqlite3.Row -> dict": row_dict,
+        "tuple -> dict (à la main)": lambda: [dict(zip(columns, row)) for row in conn.execute(sql)],
+        "tuple brut": lambda: conn.execute(sql).fetchall(),
+        "NamedTuple": lambda: fetch_all(conn, sql, (), _BenchRow),
+    }
+    results: Dict[str, Any] = {"rows": rows, "queries": queries, "work_dir": work_dir, "decode": {}}
+    for name, decode in decoders.items():
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            decoded = decode()
+            best = min(best, time.perf_counter() - started)
+        assert len(decoded) == rows
+        results["decode"][name] = round(rows / best)
+    conn.close()
+
+    point = f"{sql} WHERE id = ?"
+
+    def fresh(i):
+        c = sqlite3.connect(path)
+        try:
+            return fetch_one(c, point, (i,), _BenchRow)
+        finally:
+            c.close()
+
+    pool = ConnectionPool(path)
+    per_query = {
+        "connexion par requête": fresh,
+        "connexion réutilisée": lambda i: fetch_one(pool.connection(), point, (i,), _BenchRow),
+    }
+    results["query_us"] = {}
+    for name, run in per_query.items():
+        started = time.perf_counter()
+        for i in range(queries):
+            run(i % rows)
+        results["query_us"][name] = round((time.perf_counter() - started) / queries * 1e6, 1)
+    pool.close()
+    results["threads"] = check_thread_churn(path, threads)
+    return results
+
+
+def check_thread_churn(path, threads: int = 300) -> Dict[str, Any]:
+    """
+    Une requête par thread court, threads lancés l'un après l'autre (serveur de dev threaded):
+    les connexions des threads terminés doivent être fermées
+    """
+    pool = ConnectionPool(path)
+
+    def query():
+        pool.connection().execute("SELECT 1").fetchone()
+
+    peak = 0
+    for _ in range(threads):
+        worker = threading.Thread(target=query)
+        worker.start()
+        worker.join()
+        peak = max(peak, pool.get_stats()["open"])
+    stats = pool.get_stats()
+    pool.close()
+    if stats["open"] > 1 or peak > 2:
+        raise AssertionError(f"Connexions non fermées: {stats['open']} ouvertes (pic {peak}) "
+                             f"après {threads} threads")
+    return {"threads": threads, "opened": stats["opened"], "open": stats["open"], "peak": peak}
+
+
+def format_benchmark(results: Dict[str, Any]) -> str:
+    lines = [f"📏 {results['rows']} lignes ({results['work_dir']})", "Décodage (lignes/s):"]
+    lines += [f"  {name:<28}{rate:>12,}" for name, rate in results["decode"].items()]
+    lines.append(f"Requête ponctuelle ({results['queries']} fois, µs/requête):")
+    lines += [f"  {name:<28}{us:>12}" for name, us in results["query_us"].items()]
+    churn = results["threads"]
+    lines.append(f"Threads courts successifs: {churn['threads']}, connexions ouvertes "
+                 f"{churn['opened']}, encore ouvertes {churn['open']} (pic {churn['peak']})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesure de la couche d'accès SQLite")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--dir", default=None)
+    parser.add_argument("--threads", type=int, default=300)
+    args = parser.parse_args()
+    print(format_benchmark(run_benchmark(args.rows, args.queries, args.dir, args.threads)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Enregistrement des mesures sur changement uniquement
+- change: valeurs binaires, ligne écrite à chaque changement d'état
+- deadband: ligne écrite si l'écart à la dernière valeur écrite dépasse la tolérance
+- swinging_door: compression "porte battante" des valeurs continues
+  (l'interpolation linéaire entre lignes écrites reste dans la tolérance)
+- heartbeat: une ligne au moins toutes les N secondes, même sans changement
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+FIELD_MODES = ("change", "deadband", "swinging_door")
+
+# Ligne de mesures: (timestamp epoch, {colonne: valeur})
+Row = Tuple[float, Dict[str, Any]]
+
+
+@dataclass
+class _Door:
+    """État de la porte battante d'un champ (pivot = dernière valeur écrite)"""
+    pivot_t: float
+    pivot_v: float
+    max_upper: float = float("-inf")
+    min_lower: float = float("inf")
+
+    def admits(self, t: float, v: float, tolerance: float) -> bool:
+        """Ajoute le point; False si la porte se ferme (le point précédent doit être écrit)"""
+        dt = t - self.pivot_t
+        if dt <= 0:
+            return abs(v - self.pivot_v) <= tolerance
+        upper = (v - (self.pivot_v + tolerance)) / dt
+        lower = (v - (self.pivot_v - tolerance)) / dt
+        max_upper = max(self.max_upper, upper)
+        min_lower = min(self.min_lower, lower)
+        if max_upper > min_lower:
+            return False
+        self.max_upper, self.min_lower = max_upper, min_lower
+        return True
+
+
+class ChangeOnlyRecorder:
+    """
+    Décide quelles lignes écrire
+    offer() retourne 0, 1 ou 2 lignes: la précédente (retenue) quand elle marque
+    la fin d'un palier ou d'une pente, puis la courante si elle change
+    """
+
+    def __init__(self, policies: Dict[str, Tuple[str, float]], heartbeat: float = 1800.0):
+        for name, (mode, _) in policies.items():
+            if mode not in FIELD_MODES:
+                raise ValueError(f"Mode inconnu pour {name}: {mode} ({', '.join(FIELD_MODES)})")
+        self.policies = policies
+        self.heartbeat = heartbeat
+        self._written: Optional[Row] = None
+        self._pending: Optional[Row] = None
+        self._doors: Dict[str, _Door] = {}
+        self.stats = {"offered": 0, "written": 0, "heartbeats": 0}
+
+    def offer(self, timestamp: float, values: Dict[str, Any]) -> List[Row]:
+        """Propose une lecture; retourne les lignes à écrire (dans l'ordre)"""
+        self.stats["offered"] += 1
+        current: Row = (timestamp, dict(values))
+
+        if self._written is None:
+            return self._emit([current])
+
+        to_write: List[Row] = []
+
+        # Porte fermée sur un champ continu: la lecture retenue termine la pente
+        if not self._doors_admit(current) and self._pending is not None:
+            to_write.append(self._pending)
+            self._reset(self._pending)
+            self._doors_admit(current)
+
+        if self._changed(current[1]):
+            # Fin de palier: la lecture retenue (ancienne valeur) est écrite avant le changement
+            if self._pending is not None and not to_write:
+                to_write.append(self._pending)
+            to_write.append(current)
+        elif timestamp - self._written[0] >= self.heartbeat:
+            self.stats["heartbeats"] += 1
+            to_write.append(current)
+
+        if to_write and to_write[-1] is current:
+            return self._emit(to_write)
+
+        # Lecture retenue: écrite plus tard seulement si elle termine un palier ou une pente
+        self.stats["written"] += len(to_write)
+        self._pending = current
+        return to_write
+
+    def flush(self) -> List[Row]:
+        """Dernière lecture retenue (arrêt): la série reconstruite va jusqu'au bout"""
+        if self._pending is None:
+            return []
+        return self._emit([self._pending])
+
+    def get_stats(self) -> Dict[str, Any]:
+        offered = self.stats["offered"]
+        return {
+            **self.stats,
+            "ratio": round(self.stats["written"] / offered, 3) if offered else 0.0
+        }
+
+    # === INTERNE ===
+
+    def _emit(self, rows: List[Row]) -> List[Row]:
+        self._reset(rows[-1])
+        self._pending = None
+        self.stats["written"] += len(rows)
+        return rows
+
+    def _reset(self, row: Row):
+        """Nouvelle référence: dernière ligne écrite, portes repositionnées dessus"""
+        self._written = row
+        t, values = row
+        self._doors = {
+            name: _Door(t, float(values[name]))
+            for name, (mode, _) in self.policies.items()
+            if mode == "swinging_door" and isinstance(values.get(name), (int, float))
+        }
+
+    def _doors_admit(self, row: Row) -> bool:
+        t, values = row
+        admitted = True
+        for name, door in self._doors.items():
+            value = values.get(name)
+            if value is None:
+                continue
+            if not door.admits(t, float(value), self.policies[name][1]):
+                admitted = False
+        return admitted
+
+    def _changed(self, values: Dict[str, Any]) -> bool:
+        reference = self._written[1]
+        for name, value in values.items():
+            mode, tolerance = self.policies.get(name, ("change", 0.0))
+            previous = reference.get(name)
+            if mode == "swinging_door":
+                # Valeur apparue/disparue: changement; sinon géré par la porte
+                if (value is None) != (previous is None):
+                    return True
+                continue
+            if value is None or previous is None:
+                if value is not previous:
+                    return True
+            elif mode == "deadband":
+                if abs(float(value) - float(previous)) > tolerance:
+                    return True
+            elif value != previous:
+                return True
+        return False
+
+
+def interpolate_series(rows: Sequence[Tuple[float, Sequence[Any]]], fields: Sequence[str],
+                       modes: Dict[str, str], start: float, end: float, step: float) -> Dict[str, List[Any]]:
+    """
+    Reconstruit une série régulière (graphiques) à partir des lignes écrites
+    rows: (epoch, valeurs dans l'ordre de fields), triées, y compris la ligne précédant start
+    swinging_door: interpolation linéaire; change/deadband: dernière valeur connue
+    """
+    series: Dict[str, List[Any]] = {"timestamp": []}
+    for name in fields:
+        series[name] = []
+
+    if step <= 0 or end < start:
+        return series
+
+    index = 0
+    t = start
+    while t <= end:
+        while index + 1 < len(rows) and rows[index + 1][0] <= t:
+            index += 1
+
+        series["timestamp"].append(int(t * 1000))
+        before = rows[index] if rows and rows[index][0] <= t else None
+        after = rows[index + 1] if before is not None and index + 1 < len(rows) else None
+
+        for position, name in enumerate(fields):
+            if before is None:
+                series[name].append(None)
+                continue
+            value = before[1][position]
+            if (modes.get(name) == "swinging_door" and after is not None and value is not None
+                    and after[1][position] is not None and after[0] > before[0]):
+                ratio = (t - before[0]) / (after[0] - before[0])
+                value = value + (after[1][position] - value) * ratio
+                value = round(value, 2)
+            series[name].append(value)
+        t += step
+
+    return series
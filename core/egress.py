@@ -0,0 +1,241 @@
+"""
+Budget de données sortantes (liaison LTE facturée au volume)
+- compteurs par destination et par mois UTC (table egress_usage): octets envoyés / reçus,
+  requêtes, envois écartés; deltas en mémoire fusionnés toutes les FLUSH_INTERVAL secondes,
+  partagés par tous les processus (cycle, workers gunicorn)
+- octets estimés à la source: taille JSON du document / de la requête + surcoût protocolaire
+  forfaitaire (OVERHEAD), pas de mesure au niveau de l'interface réseau
+- niveau de service selon la consommation du mois, comparée à l'allocation au prorata du
+  temps écoulé (rythme) et au budget total:
+    normal   -> tout est envoyé
+    reduced  -> au-dessus du rythme: cadence de synchronisation et de sonde divisée par
+                REDUCED_CADENCE_FACTOR, plus de sonde HTTP
+    critical -> budget atteint: résumés journaliers seulement, sonde TCP minimale à cadence
+                réduite, chatbot hors ligne
+- mode liaison facturée désactivé (METERED_LINK=False): comptage seul, niveau toujours normal
+"""
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from core.startup import LazyInstance
+
+logger = logging.getLogger(__name__)
+
+EGRESS_TABLE = "egress_usage"
+
+EGRESS_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {EGRESS_TABLE} (
+        month TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        bytes_out INTEGER NOT NULL DEFAULT 0,
+        bytes_in INTEGER NOT NULL DEFAULT 0,
+        requests INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, destination)
+    ) WITHOUT ROWID
+"""
+
+MERGE_SQL = f"""
+    INSERT INTO {EGRESS_TABLE} (month, destination, bytes_out, bytes_in, requests, skipped)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (month, destination) DO UPDATE SET
+        bytes_out = bytes_out + excluded.bytes_out,
+        bytes_in = bytes_in + excluded.bytes_in,
+        requests = requests + excluded.requests,
+        skipped = skipped + excluded.skipped
+"""
+
+# Surcoût estimé par requête (TLS, en-têtes HTTP/2 ou gRPC, TCP), octets
+OVERHEAD = {
+    "firebase": 600,
+    "gemini": 1500,
+    "network_probe": 240,
+    "aggregator": 400,
+}
+
+NORMAL, REDUCED, CRITICAL = "normal", "reduced", "critical"
+
+# Trafic autorisé par niveau (priorité de l'envoi); "probe": sonde HTTP complète
+ALLOWED = {
+    NORMAL: {"summary", "telemetry", "probe", "interactive"},
+    REDUCED: {"summary", "telemetry", "interactive"},
+    CRITICAL: {"summary"},
+}
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute(EGRESS_DDL)
+
+
+def json_size(payload: Any) -> int:
+    """Taille estimée d'un document sérialisé (octets UTF-8)"""
+    return len(json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8"))
+
+
+def current_month(ts: Optional[float] = None) -> str:
+    return datetime.fromtimestamp(ts if ts is not None else time.time(), tz=timezone.utc).strftime("%Y-%m")
+
+
+def month_elapsed(ts: float) -> float:
+    """Fraction du mois UTC écoulée (0..1)"""
+    now = datetime.fromtimestamp(ts, tz=timezone.utc)
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return (now - start).total_seconds() / (end - start).total_seconds()
+
+
+class EgressBudget:
+    """Comptage par destination et niveau de service selon le budget mensuel"""
+
+    def __init__(self, monthly_bytes: int = 0, metered: bool = False, pace_margin: float = 1.1,
+                 reduced_factor: int = 4, flush_interval: float = 60.0):
+        self.monthly_bytes = monthly_bytes
+        self.metered = metered and monthly_bytes > 0
+        self.pace_margin = pace_margin
+        self.reduced_factor = max(1, reduced_factor)
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], list] = {}
+        self._totals: Dict[str, Dict[str, int]] = {}  # mois en cours, enregistré en base
+        self._totals_month = current_month()
+        self._last_flush = 0.0
+        self._last_level = NORMAL
+
+    # === COMPTAGE ===
+
+    def record(self, destination: str, bytes_out: int, bytes_in: int = 0, requests: int = 1):
+        """Compte un échange (surcoût protocolaire ajouté par requête)"""
+        overhead = OVERHEAD.get(destination, 0) * requests
+        with self._lock:
+            delta = self._delta(destination)
+            delta[0] += int(bytes_out) + overhead // 2
+            delta[1] += int(bytes_in) + overhead // 2
+            delta[2] += requests
+        self._maybe_flush()
+
+    def allow(self, destination: str, priority: str) -> bool:
+        """Envoi permis au niveau actuel; un refus est compté (skipped)"""
+        if priority in ALLOWED[self.level()]:
+            return True
+        with self._lock:
+            self._delta(destination)[3] += 1
+        self._maybe_flush()
+        return False
+
+    def _delta(self, destination: str) -> list:
+        key = (current_month(), destination)
+        delta = self._pending.get(key)
+        if delta is None:
+            delta = self._pending[key] = [0, 0, 0, 0]
+        return delta
+
+    # === NIVEAU DE SERVICE ===
+
+    def used_bytes(self) -> int:
+        """Octets (envoyés + reçus) du mois en cours, en attente compris"""
+        month = current_month()
+        with self._lock:
+            totals = self._totals if self._totals_month == month else {}
+            used = sum(t["bytes_out"] + t["bytes_in"] for t in totals.values())
+            used += sum(d[0] + d[1] for (m, _), d in self._pending.items() if m == month)
+        return used
+
+    def level(self) -> str:
+        if not self.metered:
+            return NORMAL
+        # Totaux relus périodiquement: consommation des autres processus prise en compte
+        self._maybe_flush()
+        now = time.time()
+        used = self.used_bytes()
+        if used >= self.monthly_bytes:
+            level = CRITICAL
+        elif used > self.monthly_bytes * month_elapsed(now) * self.pace_margin:
+            level = REDUCED
+        else:
+            level = NORMAL
+        if level != self._last_level:
+            logger.warning(f"📶 Budget données: niveau {self._last_level} -> {level} "
+                           f"({used / 1e6:.1f} / {self.monthly_bytes / 1e6:.0f} Mo)")
+            self._last_level = level
+        return level
+
+    def cadence_factor(self) -> int:
+        """Multiplicateur des intervalles de synchronisation et de sonde réseau"""
+        return 1 if self.level() == NORMAL else self.reduced_factor
+
+    # === PERSISTANCE ===
+
+    def _maybe_flush(self):
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Fusionne les compteurs en attente et relit les totaux du mois (tous processus)"""
+        from core.database_manager import db_manager
+
+        self._last_flush = time.time()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        month = current_month()
+        try:
+            with db_manager.pool.transaction() as conn:
+                if pending:
+                    conn.executemany(MERGE_SQL, [(m, dest, *delta) for (m, dest), delta in pending.items()])
+                rows = conn.execute(f"""
+                    SELECT destination, bytes_out, bytes_in, requests, skipped
+                    FROM {EGRESS_TABLE} WHERE month = ?
+                """, (month,)).fetchall()
+        except Exception as e:
+            with self._lock:
+                for key, delta in pending.items():
+                    current = self._pending.setdefault(key, [0, 0, 0, 0])
+                    for i, value in enumerate(delta):
+                        current[i] += value
+            logger.error(f"❌ Erreur enregistrement budget données: {e}")
+            return False
+
+        with self._lock:
+            self._totals_month = month
+            self._totals = {dest: {"bytes_out": out, "bytes_in": inp, "requests": req, "skipped": skip}
+                            for dest, out, inp, req, skip in rows}
+        return True
+
+    def get_usage(self) -> Dict[str, Any]:
+        """Compteurs du mois en cours par destination, budget et niveau (API)"""
+        self.flush()
+        used = self.used_bytes()
+        elapsed = month_elapsed(time.time())
+        with self._lock:
+            destinations = {dest: dict(totals) for dest, totals in self._totals.items()}
+        return {
+            "month": self._totals_month,
+            "metered": self.metered,
+            "level": self.level(),
+            "used_bytes": used,
+            "budget_bytes": self.monthly_bytes or None,
+            "budget_used": round(used / self.monthly_bytes, 4) if self.monthly_bytes else None,
+            "month_elapsed": round(elapsed, 4),
+            "projected_bytes": int(used / elapsed) if elapsed > 0 else None,
+            "cadence_factor": self.cadence_factor(),
+            "destinations": destinations,
+        }
+
+
+def _create_budget() -> EgressBudget:
+    from config.settings import config
+    settings = config.egress
+    return EgressBudget(monthly_bytes=int(settings.MONTHLY_BUDGET_MB * 1e6),
+                        metered=settings.METERED_LINK,
+                        pace_margin=settings.PACE_MARGIN,
+                        reduced_factor=settings.REDUCED_CADENCE_FACTOR,
+                        flush_interval=settings.FLUSH_INTERVAL)
+
+
+# Instance globale (une par processus, compteurs partagés par la base)
+egress_budget = LazyInstance(_create_budget, "egress_budget")
@@ -6,8 +6,10 @@ import time
 import threading
 import logging
 import sys
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence, Tuple
 from config.settings import config
+from core.led_driver import LEDDriver, BlinkPattern
+from core.startup import LazyInstance
 
 logger = logging.getLogger(__name__)
 
@@ -38,11 +40,18 @@ class GPIOCentralManager:
                 self._chip = None
             if not hasattr(self, '_pin_registry'):
                 self._pin_registry = {}
+            if not hasattr(self, '_pin_group'):
+                self._pin_group = {}
+                self._group_defs = {}
+            if not hasattr(self, '_led_driver'):
+                self._led_driver = LEDDriver(self._write_pins)
             return
         
         _GPIO_INITIALIZED = True
         
         self._chip = None
+        self._pin_group = {}
+        self._group_defs = {}
         
         # FORCEMENT HARDWARE RÉEL
         try:
@@ -67,9 +76,8 @@ class GPIOCentralManager:
             'white': False
         }
         
-        # Threads de clignotement
-        self._blink_threads = {}
-        self._blink_stop_events = {}
+        # Pilote LED unique (clignotements, séquences, codes d'erreur)
+        self._led_driver = LEDDriver(self._write_pins)
         
         # Initialiser le registre
         self._initialize_pin_registry()
@@ -95,15 +103,53 @@ class GPIOCentralManager:
         
         # Actionneurs (sorties)
         self._pin_registry[gpio.PUMP_RELAY_PIN] = {"type": "output", "users": ["water_pump"], "state": False}
+        for zone, pin in gpio.ZONE_VALVE_PINS.items():
+            self._pin_registry[pin] = {"type": "output", "users": [f"valve_{zone}"], "state": False}
+        
+        # Groupes lgpio: un seul appel système pour lire/écrire tout le groupe
+        # (la pompe et le DHT22 restent hors groupe)
+        self._group_defs = {
+            "leds": {"type": "output", "pins": [gpio.LED_RED_PIN, gpio.LED_GREEN_PIN,
+                                                gpio.LED_YELLOW_PIN, gpio.LED_WHITE_PIN]},
+            "inputs": {"type": "input", "pins": [gpio.SOIL_MOISTURE_PIN, gpio.RAINDROP_PIN,
+                                                 gpio.WATER_LEVEL_PIN]}
+        }
     
     def _setup_all_pins(self):
-        """Configure tous les pins GPIO une seule fois"""
+        """Configure tous les pins GPIO une seule fois (par groupe quand possible)"""
         print("\n🔧 CONFIGURATION CENTRALE GPIO RÉELLE:")
         print("=" * 40)
         
         import lgpio
         
+        # pin -> (pin leader du groupe, index du bit)
+        self._pin_group = {}
+        grouped = set()
+        
+        for group_name, group in self._group_defs.items():
+            pins = group["pins"]
+            try:
+                if group["type"] == "output":
+                    # Éteint par défaut
+                    lgpio.group_claim_output(self._chip, pins, [0] * len(pins))
+                else:
+                    lgpio.group_claim_input(self._chip, pins)
+            except Exception as e:
+                logger.warning(f"⚠️ Groupe {group_name} indisponible, pins individuels: {e}")
+                continue
+            
+            for index, pin in enumerate(pins):
+                self._pin_group[pin] = (pins[0], index)
+                grouped.add(pin)
+                info = self._pin_registry[pin]
+                if info["type"] == "output":
+                    info["state"] = False
+                direction = "SORTIE" if info["type"] == "output" else "ENTREE"
+                print(f"🔌 GPIO{pin:3} -> {direction:8} ({', '.join(info['users'])}) [groupe {group_name}]")
+        
         for pin, info in self._pin_registry.items():
+            if pin in grouped:
+                continue
             try:
                 if info["type"] == "output":
                     lgpio.gpio_claim_output(self._chip, pin)
@@ -123,20 +169,45 @@ class GPIOCentralManager:
     
     def write(self, pin: int, value: bool):
         """Écrit une valeur sur une sortie - HARDWARE RÉEL"""
+        self.write_many({pin: value})
+    
+    def write_many(self, values: Dict[int, bool]):
+        """
+        Écrit plusieurs sorties - un seul appel lgpio par groupe
+        Les pins d'un même groupe changent d'état au même instant
+        """
         if self._chip is None:
             logger.error("❌ Chip GPIO non initialisé")
             return
         
         import lgpio
-        try:
-            lgpio.gpio_write(self._chip, pin, 1 if value else 0)
-            
-            if pin in self._pin_registry:
-                self._pin_registry[pin]["state"] = value
+        
+        # leader -> [bits, masque]
+        group_writes = {}
+        for pin, value in values.items():
+            group = self._pin_group.get(pin)
+            if group is None:
+                try:
+                    lgpio.gpio_write(self._chip, pin, 1 if value else 0)
+                    self._set_registry_state(pin, value)
+                except Exception as e:
+                    logger.error(f"❌ Erreur écriture GPIO{pin}: {e}")
+                continue
             
-            logger.debug(f"GPIO {pin} → {'HIGH' if value else 'LOW'}")
-        except Exception as e:
-            logger.error(f"❌ Erreur écriture GPIO{pin}: {e}")
+            leader, index = group
+            bits_mask = group_writes.setdefault(leader, [0, 0])
+            if value:
+                bits_mask[0] |= 1 << index
+            bits_mask[1] |= 1 << index
+        
+        for leader, (bits, mask) in group_writes.items():
+            try:
+                lgpio.group_write(self._chip, leader, bits, mask)
+                for pin, (pin_leader, index) in self._pin_group.items():
+                    if pin_leader == leader and mask & (1 << index):
+                        self._set_registry_state(pin, bool(bits & (1 << index)))
+            except Exception as e:
+                logger.error(f"❌ Erreur écriture groupe GPIO{leader}: {e}")
     
     def read(self, pin: int) -> bool:
         """Lit une valeur d'entrée digitale - HARDWARE RÉEL"""
@@ -144,18 +215,102 @@ class GPIOCentralManager:
             logger.error("❌ Chip GPIO non initialisé")
             return False
         
+        group = self._pin_group.get(pin)
+        if group is not None:
+            return self._read_group(group[0]).get(pin, False)
+        
         import lgpio
         try:
             value = bool(lgpio.gpio_read(self._chip, pin))
-            
-            if pin in self._pin_registry:
-                self._pin_registry[pin]["state"] = value
-            
+            self._set_registry_state(pin, value)
             return value
         except Exception as e:
             logger.error(f"❌ Erreur lecture GPIO{pin}: {e}")
             return False
     
+    def read_inputs_snapshot(self) -> Dict[int, bool]:
+        """
+        Lit toutes les entrées digitales (sol, pluie, eau) au même instant
+        Returns: {pin: valeur} - un seul appel lgpio si le groupe est disponible
+        """
+        if self._chip is None or "inputs" not in self._group_defs:
+            logger.error("❌ Chip GPIO non initialisé")
+            return {}
+        pins = self._group_defs["inputs"]["pins"]
+        
+        leader = pins[0]
+        if self._pin_group.get(leader, (None,))[0] == leader:
+            return self._read_group(leader)
+        
+        # Repli: lectures individuelles
+        return {pin: self.read(pin) for pin in pins}
+    
+    def sample_burst(self, pin: int, samples: int = 200, window: float = 0.1) -> Dict[str, Any]:
+        """
+        Lit une entrée en rafale (boucle serrée) répartie sur `window` secondes
+        Returns: {samples, high, transitions, duration} - aucun échantillon n'est conservé
+        """
+        if self._chip is None:
+            logger.error("❌ Chip GPIO non initialisé")
+            return {"samples": 0, "high": 0, "transitions": 0, "duration": 0.0}
+
+        import lgpio
+        group = self._pin_group.get(pin)
+        if group is not None:
+            leader, bit = group[0], 1 << group[1]
+            read_once = lambda: bool(lgpio.group_read(self._chip, leader)[1] & bit)
+        else:
+            read_once = lambda: bool(lgpio.gpio_read(self._chip, pin))
+
+        interval = window / max(samples, 1)
+        high = transitions = count = 0
+        previous = None
+        start = time.perf_counter()
+        try:
+            for i in range(samples):
+                value = read_once()
+                count += 1
+                high += value
+                if previous is not None and value != previous:
+                    transitions += 1
+                previous = value
+
+                # Cadence régulière: sommeil si l'attente est significative, sinon on enchaîne
+                delay = start + (i + 1) * interval - time.perf_counter()
+                if delay > 0.0005:
+                    time.sleep(delay)
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture rafale GPIO{pin}: {e}")
+
+        if previous is not None:
+            self._set_registry_state(pin, previous)
+        return {
+            "samples": count,
+            "high": high,
+            "transitions": transitions,
+            "duration": time.perf_counter() - start
+        }
+
+    def _read_group(self, leader: int) -> Dict[int, bool]:
+        """Lit un groupe d'entrées en un seul appel"""
+        import lgpio
+        try:
+            _, levels = lgpio.group_read(self._chip, leader)
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture groupe GPIO{leader}: {e}")
+            return {}
+        
+        values = {}
+        for pin, (pin_leader, index) in self._pin_group.items():
+            if pin_leader == leader:
+                values[pin] = bool(levels & (1 << index))
+                self._set_registry_state(pin, values[pin])
+        return values
+    
+    def _set_registry_state(self, pin: int, value: bool):
+        if pin in self._pin_registry:
+            self._pin_registry[pin]["state"] = value
+    
     # Méthodes pour les LEDs
     
     def set_led_red(self, state: bool, blink: bool = False, blink_interval: float = 0.5):
@@ -166,13 +321,12 @@ class GPIOCentralManager:
         if blink:
             self._start_blink('red', pin, blink_interval)
         else:
-            self._stop_blink('red')
-            self.write(pin, state)
+            self._set_led_steady('red', pin, state)
     
     def set_led_green(self, state: bool):
         """Contrôle la LED verte"""
         self._led_states['green'] = state
-        self.write(config.gpio.LED_GREEN_PIN, state)
+        self._set_led_steady('green', config.gpio.LED_GREEN_PIN, state)
     
     def set_led_yellow(self, state: bool, blink: bool = False, blink_interval: float = 0.5):
         """Contrôle la LED jaune"""
@@ -182,53 +336,79 @@ class GPIOCentralManager:
         if blink:
             self._start_blink('yellow', pin, blink_interval)
         else:
-            self._stop_blink('yellow')
-            self.write(pin, state)
+            self._set_led_steady('yellow', pin, state)
     
     def set_led_white(self, state: bool):
         """Contrôle la LED blanche"""
         self._led_states['white'] = state
-        self.write(config.gpio.LED_WHITE_PIN, state)
+        self._set_led_steady('white', config.gpio.LED_WHITE_PIN, state)
     
     def _start_blink(self, led_name: str, pin: int, interval: float):
-        """Démarre le clignotement d'une LED"""
-        if led_name in self._blink_threads:
+        """Démarre le clignotement d'une LED (pilote unique, sans thread dédié)"""
+        self._led_driver.set_pattern(led_name, (pin,), BlinkPattern.square(interval))
+    
+    def _stop_blink(self, led_name: str):
+        """Arrête le clignotement d'une LED - O(1), sans join"""
+        self._led_driver.cancel(led_name)
+    
+    def _set_led_steady(self, led_name: str, pin: int, state: bool):
+        """État fixe: annule tout motif ou séquence sur la LED puis écrit"""
+        self._led_driver.set_pattern(led_name, (pin,), BlinkPattern.steady(state))
+    
+    def _write_pins(self, pins: Tuple[int, ...], values: Tuple[bool, ...]):
+        """Écrit plusieurs sorties (callback du pilote LED)"""
+        self.write_many(dict(zip(pins, values)))
+    
+    def _led_pins(self) -> Dict[str, int]:
+        gpio = config.gpio
+        return {
+            'red': gpio.LED_RED_PIN,
+            'green': gpio.LED_GREEN_PIN,
+            'yellow': gpio.LED_YELLOW_PIN,
+            'white': gpio.LED_WHITE_PIN
+        }
+    
+    def set_led_pattern(self, led_name: str, pattern: BlinkPattern):
+        """Applique un motif (rapport cyclique, code d'erreur...) sur une LED"""
+        pins = self._led_pins()
+        if led_name not in pins:
+            logger.warning(f"LED inconnue: {led_name}")
             return
         
-        stop_event = threading.Event()
-        self._blink_stop_events[led_name] = stop_event
-        
-        def blink_task():
-            while not stop_event.is_set():
-                try:
-                    self.write(pin, True)
-                    stop_event.wait(interval)
-                    if stop_event.is_set():
-                        break
-                    
-                    self.write(pin, False)
-                    stop_event.wait(interval)
-                except Exception as e:
-                    logger.error(f"Erreur clignotement LED {led_name}: {e}")
-                    break
-        
-        thread = threading.Thread(target=blink_task, daemon=True, name=f"blink_{led_name}")
-        self._blink_threads[led_name] = thread
-        thread.start()
+        self._led_states[led_name] = True
+        self._led_driver.set_pattern(led_name, (pins[led_name],), pattern)
     
-    def _stop_blink(self, led_name: str):
-        """Arrête le clignotement d'une LED"""
-        if led_name in self._blink_stop_events:
-            self._blink_stop_events[led_name].set()
+    def set_leds(self, states: Dict[str, bool]):
+        """Applique plusieurs LEDs fixes en une seule écriture de groupe"""
+        pins = self._led_pins()
+        leds = [led for led in states if led in pins]
+        for led in leds:
+            self._led_states[led] = states[led]
         
-        if led_name in self._blink_threads:
-            thread = self._blink_threads[led_name]
-            if thread.is_alive():
-                thread.join(timeout=1)
-            del self._blink_threads[led_name]
+        self._led_driver.set_pattern(
+            "+".join(leds),
+            tuple(pins[led] for led in leds),
+            BlinkPattern.sequence([(tuple(states[led] for led in leds), 0.0)])
+        )
+    
+    def show_error_code(self, code: int, led_name: str = 'red'):
+        """Affiche un code d'erreur (N impulsions puis pause) sur une LED"""
+        self.set_led_pattern(led_name, BlinkPattern.error_code(code))
+    
+    def play_led_sequence(self, name: str, leds: Sequence[str], 
+                          frames: Sequence[Tuple[Sequence[bool], float]], repeat: bool = False):
+        """
+        Joue une séquence multi-LEDs
+        frames: liste de (états des LEDs dans l'ordre de `leds`, durée en secondes)
+        """
+        pins = self._led_pins()
+        led_pins = tuple(pins[led] for led in leds if led in pins)
+        if len(led_pins) != len(leds):
+            logger.warning(f"Séquence {name}: LED inconnue dans {list(leds)}")
+            return
         
-        if led_name in self._blink_stop_events:
-            del self._blink_stop_events[led_name]
+        # Une séquence prend la main sur les motifs individuels de ses LEDs
+        self._led_driver.set_pattern(name, led_pins, BlinkPattern.sequence(frames, repeat=repeat))
     
     # Méthodes utilitaires
     
@@ -246,6 +426,7 @@ class GPIOCentralManager:
         """Retourne le statut de tous les GPIO"""
         status = {
             'leds': self._led_states.copy(),
+            'led_driver': self._led_driver.get_status(),
             'pins': {}
         }
         
@@ -262,17 +443,15 @@ class GPIOCentralManager:
         """Nettoie toutes les broches GPIO - HARDWARE RÉEL"""
         global _GPIO_INITIALIZED
         
-        # Arrêter tous les clignotements
-        for led_name in list(self._blink_threads.keys()):
-            self._stop_blink(led_name)
+        # Arrêter le pilote LED (tous les clignotements)
+        self._led_driver.stop()
         
         # Éteindre toutes les sorties
-        for pin, info in self._pin_registry.items():
-            if info["type"] == "output":
-                try:
-                    self.write(pin, False)
-                except:
-                    pass
+        try:
+            self.write_many({pin: False for pin, info in self._pin_registry.items()
+                             if info["type"] == "output"})
+        except:
+            pass
         
         # Fermer le chip
         if self._chip is not None:
@@ -286,6 +465,7 @@ class GPIOCentralManager:
                 self._chip = None
         
         self._pin_registry.clear()
+        self._pin_group.clear()
         _GPIO_INITIALIZED = False
     
     def test_leds(self):
@@ -313,5 +493,5 @@ class GPIOCentralManager:
         except Exception as e:
             logger.error(f"❌ Erreur test LEDs: {e}")
 
-# Instance globale unique
-gpio_central = GPIOCentralManager()
\ No newline at end of file
+# Instance globale unique (ouverture du chip au premier accès)
+gpio_central = LazyInstance(GPIOCentralManager, "gpio_central")
\ No newline at end of file
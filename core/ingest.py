@@ -0,0 +1,279 @@
+"""
+Ingestion des lectures de plusieurs appareils (agrégateur de serre)
+- validate_payload: contrôle des lots reçus par /api/ingest (lecture invalide = rejetée seule)
+- IngestWriter: file bornée + thread d'écriture unique, insertions groupées par transaction;
+  file pleine -> refus avec délai de nouvel essai (429 + Retry-After côté API)
+"""
+import re
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from core.startup import LazyInstance, resolve
+
+logger = logging.getLogger(__name__)
+
+# Lecture: (timestamp epoch, {colonne: valeur})
+Row = Tuple[float, Dict[str, Any]]
+Batches = Dict[str, List[Row]]
+
+DEVICE_NAME = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+
+# Plages physiques acceptées (DHT22: -40..80 °C)
+FIELD_RANGES: Dict[str, Tuple[float, float]] = {
+    "soil_moisture": (0.0, 100.0),
+    "water_level": (0.0, 100.0),
+    "temperature": (-40.0, 80.0),
+    "air_humidity": (0.0, 100.0),
+}
+FLAG_FIELDS: Tuple[str, ...] = ("soil_is_dry", "water_detected", "rain_detected")
+
+# Erreurs détaillées renvoyées au nœud (les suivantes sont seulement comptées)
+MAX_REPORTED_ERRORS = 10
+
+# Lectures antérieures à 2001: horloge du nœud non réglée
+MIN_TIMESTAMP = 1e9
+
+
+class IngestError(ValueError):
+    """Lot refusé en entier (format, taille)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _validate_reading(reading: Any, now: float, max_skew: float) -> Row:
+    if not isinstance(reading, dict):
+        raise ValueError("lecture non objet")
+
+    ts = reading.get("ts")
+    if isinstance(ts, bool) or not isinstance(ts, (int, float)) or not math.isfinite(ts):
+        raise ValueError("ts manquant ou non numérique (epoch secondes)")
+    if ts < MIN_TIMESTAMP or ts > now + max_skew:
+        raise ValueError(f"ts hors limites: {ts}")
+
+    values: Dict[str, Any] = {}
+    for name, (low, high) in FIELD_RANGES.items():
+        value = reading.get(name)
+        if value is None:
+            values[name] = None
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{name} non numérique")
+        if not low <= value <= high:
+            raise ValueError(f"{name} hors plage [{low}, {high}]: {value}")
+        values[name] = float(value)
+
+    for name in FLAG_FIELDS:
+        value = reading.get(name)
+        if value is not None and not isinstance(value, (bool, int)):
+            raise ValueError(f"{name} non booléen")
+        values[name] = bool(value)
+
+    return float(ts), values
+
+
+def validate_payload(payload: Any, max_readings: int = 5000,
+                     max_skew: float = 300.0) -> Tuple[Batches, int, List[str]]:
+    """
+    Lots acceptés: {"device": "nœud-1", "readings": [{"ts": ..., "temperature": ...}, ...]}
+    ou {"batches": [<lot>, ...]} (relais de plusieurs nœuds)
+    Returns: ({appareil: [lectures valides]}, nombre rejeté, premières erreurs)
+    Champs inconnus ignorés (nœuds plus récents que l'agrégateur)
+    """
+    if not isinstance(payload, dict):
+        raise IngestError("Corps JSON/MessagePack/CBOR objet attendu")
+
+    groups = payload.get("batches", [payload])
+    if not isinstance(groups, list):
+        raise IngestError("batches doit être une liste")
+
+    # Structure des lots vérifiée avant de compter les lectures (readings non liste: 400)
+    checked = []
+    for group in groups:
+        if not isinstance(group, dict):
+            raise IngestError("lot non objet")
+        device = group.get("device")
+        if not isinstance(device, str) or not DEVICE_NAME.match(device):
+            raise IngestError(f"device invalide: {device!r} (1-64 caractères [A-Za-z0-9_.:-])")
+        readings = group.get("readings")
+        if not isinstance(readings, list):
+            raise IngestError(f"{device}: readings doit être une liste")
+        checked.append((device, readings))
+
+    total = sum(len(readings) for _, readings in checked)
+    if total > max_readings:
+        raise IngestError(f"Trop de lectures ({total} > {max_readings}): découper le lot", status=413)
+
+    now = time.time()
+    batches: Batches = {}
+    rejected = 0
+    errors: List[str] = []
+
+    for device, readings in checked:
+        rows = batches.setdefault(device, [])
+        for index, reading in enumerate(readings):
+            try:
+                rows.append(_validate_reading(reading, now, max_skew))
+            except ValueError as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"{device}[{index}]: {e}")
+
+    return {device: rows for device, rows in batches.items() if rows}, rejected, errors
+
+
+class IngestWriter:
+    """
+    Écrivain unique de l'agrégateur
+    Les requêtes déposent des lots dans une file bornée (en lignes); un thread les regroupe
+    et les écrit en une transaction (insert_readings). File pleine: submit refuse et donne
+    un délai de nouvel essai estimé d'après le débit d'écriture mesuré.
+    """
+
+    def __init__(self, db, max_pending_rows: int = 50000, batch_rows: int = 5000):
+        self.db = db
+        self.max_pending_rows = max_pending_rows
+        self.batch_rows = batch_rows
+
+        self._queue: Deque[Tuple[Batches, int]] = deque()
+        self._pending_rows = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._writing = False
+
+        self._rate = 0.0   # lignes/s écrites (moyenne glissante)
+        self.stats = {"accepted": 0, "throttled": 0, "written": 0, "failed": 0,
+                      "transactions": 0, "devices": 0}
+        self._devices = set()
+
+    # === API PUBLIQUE ===
+
+    def submit(self, batches: Batches) -> Tuple[bool, float]:
+        """Dépose des lectures validées; (False, délai en s) si la file est pleine"""
+        count = sum(len(rows) for rows in batches.values())
+        if not count:
+            return True, 0.0
+
+        with self._cond:
+            if self._pending_rows and self._pending_rows + count > self.max_pending_rows:
+                self.stats["throttled"] += 1
+                return False, self._retry_after(count)
+
+            self._queue.append((batches, count))
+            self._pending_rows += count
+            self.stats["accepted"] += count
+            self._ensure_thread()
+            self._cond.notify()
+        return True, 0.0
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Attend l'écriture de tout ce qui a été accepté"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._queue or self._writing:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                "pending_rows": self._pending_rows,
+                "max_pending_rows": self.max_pending_rows,
+                "rows_per_second": round(self._rate, 1),
+            }
+
+    # === INTERNE ===
+
+    def _retry_after(self, count: int) -> float:
+        """Temps estimé pour libérer la place demandée (1 à 30 s)"""
+        excess = self._pending_rows + count - self.max_pending_rows
+        rate = self._rate or float(self.batch_rows)
+        return float(min(30, max(1, math.ceil(excess / rate))))
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True, name="IngestWriter")
+            self._thread.start()
+
+    def _take(self) -> Tuple[Batches, int]:
+        """Regroupe les lots en attente jusqu'à batch_rows lignes (appelé sous verrou)"""
+        merged: Batches = {}
+        taken = 0
+        while self._queue and (not taken or taken + self._queue[0][1] <= self.batch_rows):
+            batches, count = self._queue.popleft()
+            for device, rows in batches.items():
+                merged.setdefault(device, []).extend(rows)
+            taken += count
+        return merged, taken
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                merged, count = self._take()
+                self._writing = True
+
+            started = time.perf_counter()
+            written = self._write(merged)
+            elapsed = max(time.perf_counter() - started, 1e-6)
+
+            with self._cond:
+                self._pending_rows -= count
+                self._writing = False
+                if written:
+                    self.stats["written"] += written
+                    self.stats["transactions"] += 1
+                    self._devices.update(merged)
+                    self.stats["devices"] = len(self._devices)
+                    rate = written / elapsed
+                    self._rate = rate if not self._rate else 0.8 * self._rate + 0.2 * rate
+                else:
+                    self.stats["failed"] += count
+                self._cond.notify_all()
+
+    def _write(self, merged: Batches) -> int:
+        # Base verrouillée par un autre écrivain: quelques essais avant abandon du lot
+        for attempt in range(3):
+            try:
+                return self.db.insert_readings(merged)
+            except Exception as e:
+                logger.warning(f"⚠️ Écriture ingestion (essai {attempt + 1}): {e}")
+                time.sleep(0.5 * (attempt + 1))
+        logger.error(f"❌ {sum(len(rows) for rows in merged.values())} lectures ingérées perdues "
+                     f"(écriture impossible)")
+        return 0
+
+
+def _create_writer() -> IngestWriter:
+    from config.settings import config
+    from core.database_manager import db_manager
+    return IngestWriter(resolve(db_manager),
+                        max_pending_rows=config.ingest.MAX_PENDING_ROWS,
+                        batch_rows=config.ingest.WRITE_BATCH_ROWS)
+
+
+# Instance globale (processus propriétaire de la base: un seul écrivain)
+ingest_writer = LazyInstance(_create_writer, "ingest_writer")
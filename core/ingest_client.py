@@ -0,0 +1,238 @@
+"""
+Client d'ingestion côté nœud: transmet les lectures à l'agrégateur de la serre
+- tampon borné (hors ligne: les plus anciennes lectures sont perdues en premier)
+- envoi par lots compressés (gzip; MessagePack si installé, sinon JSON)
+- nouvel essai avec attente exponentielle + gigue; respecte Retry-After (429/503)
+- lot refusé pour format (400/413): abandonné, pas renvoyé en boucle
+"""
+import json
+import gzip
+import time
+import random
+import logging
+import threading
+import urllib.error
+import urllib.request
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from core.egress import egress_budget
+from core.startup import LazyInstance
+
+logger = logging.getLogger(__name__)
+
+# Attente entre essais après une erreur réseau / serveur (s)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 120.0
+
+Reading = Dict[str, Any]
+
+
+def _load_msgpack():
+    try:
+        import msgpack
+        return msgpack
+    except ImportError:
+        return None
+
+
+_msgpack = _load_msgpack()
+
+
+class IngestClient:
+    """Tampon + thread d'envoi vers POST {url}/api/ingest"""
+
+    def __init__(self, url: str, device: str, token: str = "", batch_size: int = 500,
+                 flush_interval: float = 10.0, max_buffer: int = 20000, timeout: float = 10.0):
+        self.endpoint = url.rstrip("/") + "/api/ingest"
+        self.device = device
+        self.token = token
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+
+        # (numéro de séquence, lecture): le lot envoyé est retiré par numéro, même si des
+        # lectures plus anciennes ont été perdues (tampon plein) pendant l'envoi
+        self._buffer: Deque[Tuple[int, Reading]] = deque(maxlen=max_buffer)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._failures = 0
+        self._next_attempt = 0.0
+
+        self.stats = {"queued": 0, "sent": 0, "rejected": 0, "dropped": 0,
+                      "requests": 0, "retries": 0, "throttled": 0}
+
+    # === API PUBLIQUE ===
+
+    def add(self, timestamp: float, values: Dict[str, Any]):
+        """Ajoute une lecture (colonnes sensor_readings) au tampon"""
+        reading = {"ts": round(timestamp, 3), **values}
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.stats["dropped"] += 1
+            self._seq += 1
+            self._buffer.append((self._seq, reading))
+            self.stats["queued"] += 1
+            self._ensure_thread()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def add_sensor_data(self, sensor_data: Dict[str, Any]):
+        """Ajoute une lecture de sensor_manager.read_all()"""
+        from core.compact_schema import reading_values
+        self.add(sensor_data.get("timestamp") or time.time(), reading_values(sensor_data))
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Envoie tout le tampon (arrêt); False si l'agrégateur reste injoignable"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._cond:
+                if not self._buffer:
+                    return True
+            if not self._send_batch(ignore_backoff=True):
+                time.sleep(min(1.0, max(0.0, deadline - time.time())))
+        return False
+
+    def stop(self, timeout: float = 30.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                "buffered": len(self._buffer),
+                "endpoint": self.endpoint,
+                "consecutive_failures": self._failures,
+                "next_attempt_in": round(max(0.0, self._next_attempt - time.time()), 1),
+            }
+
+    # === INTERNE ===
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True, name="IngestClient")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                # Attente: lot complet, intervalle écoulé ou fin de l'attente après erreur
+                wait = self.flush_interval
+                if self._next_attempt:
+                    wait = max(0.0, self._next_attempt - time.time())
+                elif len(self._buffer) >= self.batch_size:
+                    wait = 0.0
+                if wait:
+                    self._cond.wait(wait)
+                if not self._running:
+                    return
+                if not self._buffer or time.time() < self._next_attempt:
+                    continue
+
+            # Vider le tampon lot par lot tant que l'agrégateur accepte
+            while self._send_batch():
+                with self._cond:
+                    if len(self._buffer) < self.batch_size:
+                        break
+
+    def _encode(self, readings: List[Reading]) -> Tuple[bytes, str]:
+        payload = {"device": self.device, "readings": readings}
+        if _msgpack is not None:
+            return gzip.compress(_msgpack.packb(payload, use_bin_type=True), 6), "application/msgpack"
+        return gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), 6), "application/json"
+
+    def _send_batch(self, ignore_backoff: bool = False) -> bool:
+        """Envoie le plus ancien lot; True si accepté (ou abandonné car invalide)"""
+        with self._cond:
+            if not self._buffer:
+                return False
+            if not ignore_backoff and time.time() < self._next_attempt:
+                return False
+            batch = [self._buffer[i] for i in range(min(self.batch_size, len(self._buffer)))]
+        readings = [reading for _, reading in batch]
+        last_seq = batch[-1][0]
+
+        body, content_type = self._encode(readings)
+        headers = {"Content-Type": content_type, "Content-Encoding": "gzip", "Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        http_request = urllib.request.Request(self.endpoint, data=body, headers=headers, method="POST")
+
+        retry_after: Optional[float] = None
+        try:
+            with urllib.request.urlopen(http_request, timeout=self.timeout) as response:
+                raw = response.read()
+            egress_budget.record("aggregator", len(body), len(raw))
+            result = json.loads(raw.decode("utf-8") or "{}")
+            self._done(last_seq, len(readings), rejected=result.get("rejected", 0))
+            if result.get("errors"):
+                logger.warning(f"⚠️ Lectures refusées par l'agrégateur: {result['errors'][:3]}")
+            return True
+        except urllib.error.HTTPError as e:
+            if e.code in (429, 503):
+                retry_after = self._parse_retry_after(e.headers.get("Retry-After"))
+                with self._cond:
+                    self.stats["throttled"] += 1
+            elif 400 <= e.code < 500 and e.code not in (401, 403, 408):
+                # Lot invalide: le renvoyer ne changerait rien
+                logger.error(f"❌ Lot refusé par l'agrégateur ({e.code}), {len(readings)} lectures abandonnées")
+                self._done(last_seq, len(readings), rejected=len(readings))
+                return True
+            else:
+                logger.warning(f"⚠️ Agrégateur: HTTP {e.code}")
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            logger.debug(f"Agrégateur injoignable: {e}")
+
+        self._schedule_retry(retry_after)
+        return False
+
+    def _done(self, last_seq: int, count: int, rejected: int = 0):
+        with self._cond:
+            # Les lectures ajoutées pendant l'envoi restent derrière le lot envoyé
+            while self._buffer and self._buffer[0][0] <= last_seq:
+                self._buffer.popleft()
+            self.stats["sent"] += count - rejected
+            self.stats["rejected"] += rejected
+            self.stats["requests"] += 1
+            self._failures = 0
+            self._next_attempt = 0.0
+
+    def _schedule_retry(self, retry_after: Optional[float]):
+        with self._cond:
+            self._failures += 1
+            self.stats["retries"] += 1
+            if retry_after is None:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self._failures - 1))
+                retry_after = delay * random.uniform(0.5, 1.0)   # gigue: les nœuds ne repartent pas ensemble
+            self._next_attempt = time.time() + retry_after
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        try:
+            return max(0.0, float(value)) if value else None
+        except ValueError:
+            return None
+
+
+def _create_client() -> IngestClient:
+    from config.settings import config
+    settings = config.ingest
+    return IngestClient(settings.AGGREGATOR_URL, config.persistence.DEVICE_ID, token=settings.TOKEN,
+                        batch_size=settings.CLIENT_BATCH_SIZE,
+                        flush_interval=settings.CLIENT_FLUSH_INTERVAL,
+                        max_buffer=settings.CLIENT_MAX_BUFFER)
+
+
+# Instance globale (utilisée seulement si config.ingest.AGGREGATOR_URL est défini)
+ingest_client = LazyInstance(_create_client, "ingest_client")
@@ -0,0 +1,260 @@
+"""
+Pilote LED unique à roue temporelle (timer wheel)
+Un seul thread gère tous les clignotements, séquences et codes d'erreur.
+"""
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Étape d'un motif: (états des LEDs du canal, durée en secondes)
+Step = Tuple[Tuple[bool, ...], float]
+
+@dataclass(frozen=True)
+class BlinkPattern:
+    """Motif de clignotement pour une ou plusieurs LEDs"""
+    steps: Tuple[Step, ...]
+    repeat: bool = True
+
+    @classmethod
+    def steady(cls, state: bool) -> 'BlinkPattern':
+        """LED fixe (allumée ou éteinte)"""
+        return cls(steps=(((state,), 0.0),), repeat=False)
+
+    @classmethod
+    def duty_cycle(cls, period: float, duty: float = 0.5) -> 'BlinkPattern':
+        """Clignotement périodique avec rapport cyclique (0 < duty < 1)"""
+        duty = min(max(duty, 0.05), 0.95)
+        return cls(steps=(((True,), period * duty), ((False,), period * (1 - duty))))
+
+    @classmethod
+    def square(cls, interval: float) -> 'BlinkPattern':
+        """Clignotement symétrique (équivalent de l'ancien thread de blink)"""
+        return cls.duty_cycle(interval * 2, 0.5)
+
+    @classmethod
+    def error_code(cls, code: int, pulse: float = 0.2, pause: float = 1.5) -> 'BlinkPattern':
+        """Code d'erreur: N impulsions courtes puis une pause longue"""
+        steps: List[Step] = []
+        for _ in range(max(code, 1)):
+            steps.append(((True,), pulse))
+            steps.append(((False,), pulse))
+        # Prolonger la dernière extinction pour séparer les répétitions
+        steps[-1] = ((False,), pause)
+        return cls(steps=tuple(steps))
+
+    @classmethod
+    def sequence(cls, frames: Sequence[Tuple[Sequence[bool], float]],
+                 repeat: bool = False) -> 'BlinkPattern':
+        """Séquence multi-LEDs: chaque frame donne l'état de chaque LED du canal"""
+        return cls(steps=tuple((tuple(bool(s) for s in states), duration)
+                               for states, duration in frames), repeat=repeat)
+
+
+class _Channel:
+    """Canal actif du pilote (une LED ou un groupe de LEDs)"""
+    __slots__ = ("name", "pins", "pattern", "index", "generation")
+
+    def __init__(self, name: str, pins: Tuple[int, ...], pattern: BlinkPattern, generation: int):
+        self.name = name
+        self.pins = pins
+        self.pattern = pattern
+        self.index = 0
+        self.generation = generation
+
+
+class LEDDriver:
+    """
+    Pilote LED à roue temporelle
+    - set_pattern / cancel en O(1), sans création de thread ni join
+    - les entrées obsolètes de la roue sont ignorées grâce au numéro de génération
+    """
+
+    def __init__(self, write_pins: Callable[[Tuple[int, ...], Tuple[bool, ...]], None],
+                 tick: float = 0.05, wheel_size: int = 128):
+        self._write_pins = write_pins
+        self._tick = tick
+        self._size = wheel_size
+        self._wheel: List[List[Tuple[int, _Channel, int]]] = [[] for _ in range(wheel_size)]
+        self._pending = 0
+
+        self._channels: Dict[str, _Channel] = {}
+        self._pin_owner: Dict[int, str] = {}
+        self._generation = 0
+
+        self._origin = time.monotonic()
+        self._current_tick = 0
+
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    # === API PUBLIQUE ===
+
+    def set_pattern(self, name: str, pins: Sequence[int], pattern: BlinkPattern):
+        """Applique un motif sur un canal - effet immédiat"""
+        pins = tuple(pins)
+        with self._cond:
+            current = self._channels.get(name)
+            # Même motif déjà actif: on conserve la phase
+            if current is not None and current.pins == pins and current.pattern == pattern:
+                return
+
+            self._release(name)
+            for pin in pins:
+                owner = self._pin_owner.get(pin)
+                if owner is not None:
+                    self._release(owner)
+
+            self._generation += 1
+            channel = _Channel(name, pins, pattern, self._generation)
+
+            states, duration = pattern.steps[0]
+            self._apply(channel, states)
+
+            if len(pattern.steps) > 1 or (not pattern.repeat and duration > 0):
+                self._channels[name] = channel
+                for pin in pins:
+                    self._pin_owner[pin] = name
+                self._schedule(channel, duration)
+
+    def cancel(self, name: str):
+        """Arrête le motif d'un canal (l'état des pins n'est pas modifié)"""
+        with self._cond:
+            self._release(name)
+
+    def is_active(self, name: str) -> bool:
+        with self._cond:
+            return name in self._channels
+
+    def get_status(self) -> Dict[str, Any]:
+        """Retourne l'état du pilote"""
+        with self._cond:
+            return {
+                "running": self._running,
+                "channels": {name: {"pins": list(ch.pins), "step": ch.index,
+                                    "steps": len(ch.pattern.steps)}
+                             for name, ch in self._channels.items()},
+                "pending_timers": self._pending,
+                "tick": self._tick
+            }
+
+    def stop(self):
+        """Arrête le thread du pilote"""
+        with self._cond:
+            self._running = False
+            for name in list(self._channels.keys()):
+                self._release(name)
+            self._cond.notify()
+
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=1)
+        self._thread = None
+
+    # === INTERNE ===
+
+    def _ensure_thread(self):
+        """Démarre le thread unique à la première utilisation"""
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True, name="led_driver")
+            self._thread.start()
+
+    def _release(self, name: str):
+        channel = self._channels.pop(name, None)
+        if channel is None:
+            return
+        for pin in channel.pins:
+            if self._pin_owner.get(pin) == name:
+                del self._pin_owner[pin]
+
+    def _apply(self, channel: _Channel, states: Tuple[bool, ...]):
+        try:
+            self._write_pins(channel.pins, states)
+        except Exception as e:
+            logger.error(f"Erreur pilote LED {channel.name}: {e}")
+
+    def _now_tick(self) -> int:
+        return int((time.monotonic() - self._origin) / self._tick)
+
+    def _schedule(self, channel: _Channel, delay: float):
+        ticks = max(1, int(round(delay / self._tick)))
+        due = self._now_tick() + ticks
+        self._wheel[due % self._size].append((due, channel, channel.generation))
+        self._pending += 1
+        self._ensure_thread()
+        self._cond.notify()
+
+    def _fire(self, channel: _Channel):
+        """Passe à l'étape suivante d'un canal"""
+        steps = channel.pattern.steps
+        channel.index += 1
+
+        if channel.index >= len(steps):
+            if not channel.pattern.repeat:
+                # Fin de séquence: on éteint les LEDs du canal
+                self._apply(channel, tuple(False for _ in channel.pins))
+                self._release(channel.name)
+                return
+            channel.index = 0
+
+        states, duration = steps[channel.index]
+        self._apply(channel, states)
+        self._schedule(channel, duration)
+
+    def _advance(self, now: int):
+        """Traite les slots entre le dernier tick et maintenant"""
+        span = min(now - self._current_tick, self._size)
+        for offset in range(1, span + 1):
+            slot = self._wheel[(self._current_tick + offset) % self._size]
+            if not slot:
+                continue
+
+            keep = []
+            due_entries = []
+            for entry in slot:
+                due, channel, generation = entry
+                if due > now:
+                    keep.append(entry)
+                else:
+                    due_entries.append(entry)
+            slot[:] = keep
+
+            for due, channel, generation in due_entries:
+                self._pending -= 1
+                # Entrée obsolète (canal annulé ou remplacé)
+                if self._channels.get(channel.name) is not channel or channel.generation != generation:
+                    continue
+                self._fire(channel)
+
+        self._current_tick = now
+
+    def _next_wait(self) -> Optional[float]:
+        """Délai jusqu'au prochain slot non vide (None si rien à faire)"""
+        if self._pending == 0:
+            return None
+        for offset in range(1, self._size + 1):
+            if self._wheel[(self._current_tick + offset) % self._size]:
+                target = self._origin + (self._current_tick + offset) * self._tick
+                return max(0.0, target - time.monotonic())
+        return self._size * self._tick
+
+    def _run(self):
+        """Boucle unique du pilote LED"""
+        with self._cond:
+            while self._running:
+                self._advance(self._now_tick())
+                wait = self._next_wait()
+                if wait is None:
+                    self._cond.wait()
+                elif wait > 0:
+                    self._cond.wait(timeout=wait)
+
+            # Vider la roue
+            for slot in self._wheel:
+                slot.clear()
+            self._pending = 0
@@ -3,10 +3,10 @@ Gestion de la détection réseau (online/offline)
 """
 import time
 import socket
-import requests
 import logging
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List
 from config.settings import config
+from core.startup import LazyInstance
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +20,20 @@ class NetworkManager:
         self.consecutive_failures = 0
         self.max_failures = 3
         
-        # Initialiser avec une vérification
-        self.check_network_status()
+        # Appelés au changement d'état (True: retour du réseau), ex. SyncManager
+        self._listeners: List[Callable[[bool], None]] = []
+        
+        # Pas de sonde bloquante ici: la première vérification est faite
+        # par la phase de démarrage (core.startup) ou au premier appel
     
     def check_network_status(self, force: bool = False) -> bool:
         """Vérifie si le système est en ligne"""
         current_time = time.time()
         
-        # Vérifier le cache
-        if not force and current_time - self.last_check < self.check_interval:
+        # Vérifier le cache (intervalle allongé sur liaison facturée au-delà du rythme)
+        from core.egress import egress_budget
+        interval = self.check_interval * egress_budget.cadence_factor()
+        if not force and current_time - self.last_check < interval:
             return self.is_online
         
         self.last_check = current_time
@@ -38,15 +43,20 @@ class NetworkManager:
         
         # Méthode 1: Ping Google DNS
         try:
-            socket.create_connection(("8.8.8.8", 53), timeout=3)
+            socket.create_connection(("8.8.8.8", 53), timeout=3).close()
             online = True
         except OSError:
             pass
+        egress_budget.record("network_probe", 0)
         
-        # Méthode 2: Requête HTTP simple
-        if not online:
+        # Méthode 2: Requête HTTP simple (page complète: sautée sur liaison facturée limitée)
+        if not online and egress_budget.allow("network_probe", "probe"):
             try:
+                import requests
                 response = requests.get("http://www.google.com", timeout=5)
+                # Requête ~200 octets; réponse: corps + en-têtes
+                egress_budget.record("network_probe", 200, len(response.content) +
+                                     sum(len(k) + len(v) + 4 for k, v in response.headers.items()))
                 online = response.status_code < 400
             except:
                 pass
@@ -72,15 +82,31 @@ class NetworkManager:
             if self.is_online:
                 logger.info("📴 Système maintenant HORS LIGNE")
         
+        changed = online != self.is_online
         self.is_online = online
         config.offline_mode = not online
         
+        if changed:
+            self._notify(online)
+        
         # Mettre à jour la LED blanche
         from core.gpio_manager import gpio_central
         gpio_central.set_led_white(online)
         
         return online
     
+    def add_listener(self, callback: Callable[[bool], None]):
+        """Enregistre un écouteur des changements d'état en ligne / hors ligne"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+    
+    def _notify(self, online: bool):
+        for callback in list(self._listeners):
+            try:
+                callback(online)
+            except Exception as e:
+                logger.error(f"❌ Erreur écouteur réseau: {e}")
+    
     def get_network_info(self) -> Dict[str, Any]:
         """Retourne les informations réseau"""
         info = {
@@ -116,4 +142,4 @@ class NetworkManager:
         return False
 
 # Instance globale
-network_manager = NetworkManager()
\ No newline at end of file
+network_manager = LazyInstance(NetworkManager, "network_manager")
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Cache des résultats de lecture, invalidé par compteurs de génération
+- table_versions (dans la base): une version par table, incrémentée dans la transaction de
+  chaque écriture (bump_versions); valable entre processus (workers gunicorn, rétention)
+- clé d'un résultat: (requête, paramètres, versions des tables lues); après une écriture la
+  clé change, l'ancienne entrée n'est plus jamais servie et sort par LRU
+- PRAGMA data_version sur une connexion de contrôle: les versions ne sont relues que si une
+  autre connexion a modifié la base (lecture en cache = aucune requête SQL)
+"""
+import copy
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_TABLE = "table_versions"
+
+VERSIONS_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+"""
+
+BUMP_SQL = f"""
+    INSERT INTO {VERSIONS_TABLE} (name, version) VALUES (?, 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1
+"""
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute(VERSIONS_DDL)
+
+
+def bump_versions(cursor: sqlite3.Cursor, *tables: str):
+    """Nouvelle génération des tables écrites (dans la transaction de l'écriture)"""
+    cursor.executemany(BUMP_SQL, [(table,) for table in tables])
+
+
+class QueryCache:
+    """LRU borné des résultats de requêtes d'une base SQLite"""
+
+    def __init__(self, db_path, max_entries: int = 256):
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._data_version: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "version_reloads": 0}
+
+    # === API PUBLIQUE ===
+
+    def get(self, query: str, params: Tuple[Hashable, ...], tables: Sequence[str],
+            loader: Callable[[], Any], deep: bool = True) -> Any:
+        """
+        Résultat en cache ou loader() (hors verrou); une exception du loader n'est pas mise
+        en cache. Le résultat est copié: l'appelant peut le modifier sans toucher au cache
+        deep=False: liste de lignes immuables (NamedTuple), copie de la liste seulement
+        """
+        with self._lock:
+            key = (query, params, self._generation(tables))
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return _copy(self._entries[key], deep)
+            self.stats["misses"] += 1
+
+        value = loader()
+
+        with self._lock:
+            # Clé calculée avant la lecture: une écriture concurrente change la clé suivante
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return _copy(value, deep)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._data_version = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    # === INTERNE ===
+
+    def _generation(self, tables: Sequence[str]) -> Tuple[int, ...]:
+        """Versions courantes des tables (relues seulement si la base a changé; sous verrou)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._versions = dict(self._conn.execute(f"SELECT name, version FROM {VERSIONS_TABLE}"))
+            self._data_version = data_version
+            self.stats["version_reloads"] += 1
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+
+def _copy(value: Any, deep: bool) -> Any:
+    if deep:
+        return copy.deepcopy(value)
+    return list(value) if isinstance(value, list) else value
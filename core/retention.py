@@ -0,0 +1,425 @@
+"""
+Rétention par paliers, appliquée par un thread de fond en petites transactions
+- lectures brutes: HISTORY_DAYS jours, puis agrégats horaires (sensor_rollups) pendant
+  ROLLUP_DAYS jours et blocs compressés sans perte (sensor_chunks, core/chunk_store.py)
+  pendant COMPRESSED_DAYS jours; événements d'irrigation conservés (IRRIGATION_DAYS = 0)
+- suppression par blocs de CHUNK_ROWS lignes sur un intervalle de la clé primaire, une
+  transaction par bloc et une pause entre deux: le verrou d'écriture n'est jamais tenu
+  longtemps (cycle de mesure et API ne sont pas bloqués)
+- auto_vacuum=INCREMENTAL: les pages libérées sont rendues au système par incremental_vacuum,
+  par petits pas, le fichier de la base reste borné
+- base créée avant la rétention par paliers (auto_vacuum=NONE): conversion par un VACUUM
+  complet, jamais pendant une passe (verrou exclusif sur toute la réécriture); commande de
+  maintenance, service arrêté:
+    python -m core.retention --convert-auto-vacuum [--db irrigation.db]
+"""
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import chunk_store
+from core.chunk_store import CHUNK_TABLE
+from core.compact_schema import FLAG_BITS, SCALES, SENSOR_TABLE, to_ms
+from core.query_cache import bump_versions
+from core.startup import LazyInstance, resolve
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "sensor_rollups"
+HOUR_MS = 3600 * 1000
+
+# PRAGMA auto_vacuum: 0 = NONE, 1 = FULL, 2 = INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+ROLLUP_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        device INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        samples INTEGER NOT NULL,
+        {', '.join(f'{name}_min REAL, {name}_max REAL, {name}_sum REAL, {name}_count INTEGER NOT NULL'
+                   for name in SCALES)},
+        {', '.join(f'{name}_count INTEGER NOT NULL' for name in FLAG_BITS)},
+        PRIMARY KEY (device, hour)
+    ) WITHOUT ROWID
+"""
+
+# Agrégats d'un intervalle de lectures; une heure déjà agrégée (lectures arrivées en retard
+# par l'ingestion) est fusionnée, pas remplacée
+ROLLUP_SQL = f"""
+    INSERT INTO {ROLLUP_TABLE} (device, hour, samples,
+        {', '.join(f'{name}_min, {name}_max, {name}_sum, {name}_count' for name in SCALES)},
+        {', '.join(f'{name}_count' for name in FLAG_BITS)})
+    SELECT device, (ts / {HOUR_MS}) * {HOUR_MS}, COUNT(*),
+        {', '.join(f'MIN({name}) / {float(scale)}, MAX({name}) / {float(scale)}, '
+                   f'SUM({name}) / {float(scale)}, COUNT({name})' for name, scale in SCALES.items())},
+        {', '.join(f'SUM((flags >> {bit}) & 1)' for bit in FLAG_BITS.values())}
+    FROM {SENSOR_TABLE}
+    WHERE device = ? AND ts >= ? AND ts < ?
+    GROUP BY ts / {HOUR_MS}
+    ON CONFLICT (device, hour) DO UPDATE SET
+        samples = samples + excluded.samples,
+        {', '.join(f'{name}_min = MIN(COALESCE({name}_min, excluded.{name}_min), '
+                   f'COALESCE(excluded.{name}_min, {name}_min)), '
+                   f'{name}_max = MAX(COALESCE({name}_max, excluded.{name}_max), '
+                   f'COALESCE(excluded.{name}_max, {name}_max)), '
+                   f'{name}_sum = COALESCE({name}_sum, 0) + COALESCE(excluded.{name}_sum, 0), '
+                   f'{name}_count = {name}_count + excluded.{name}_count' for name in SCALES)},
+        {', '.join(f'{name}_count = {name}_count + excluded.{name}_count' for name in FLAG_BITS)}
+"""
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    cursor.execute(ROLLUP_DDL)
+
+
+def enable_incremental_vacuum(cursor: sqlite3.Cursor) -> bool:
+    """
+    Demande auto_vacuum=INCREMENTAL (effectif tout de suite sur une base vide,
+    sinon au prochain VACUUM); True si déjà actif
+    """
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        return True
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    return False
+
+
+def convert_auto_vacuum(db_path) -> Dict[str, Any]:
+    """
+    Passe une base existante en auto_vacuum=INCREMENTAL (VACUUM complet: verrou exclusif
+    pendant toute la réécriture, à lancer service arrêté)
+    """
+    started = time.time()
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return {"converted": False, "pages_freed": 0, "duration": 0.0}
+        pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        converted = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+    finally:
+        conn.close()
+    return {"converted": converted, "pages_freed": pages, "duration": round(time.time() - started, 3)}
+
+
+def rollup_columns() -> List[str]:
+    """Colonnes restituées par read_rollups (moyennes calculées)"""
+    columns = ["hour", "samples"]
+    for name in SCALES:
+        columns += [f"{name}_min", f"{name}_avg", f"{name}_max"]
+    return columns + [f"{name}_count" for name in FLAG_BITS]
+
+
+def read_rollups(cursor: sqlite3.Cursor, device: int, start_ms: int, end_ms: int) -> List[Tuple]:
+    """Agrégats horaires [start, end) d'un appareil (moyennes pondérées par le nombre de lectures)"""
+    averages = ", ".join(
+        f"{name}_min, CASE WHEN {name}_count > 0 THEN {name}_sum / {name}_count END, {name}_max"
+        for name in SCALES)
+    cursor.execute(f"""
+        SELECT hour, samples, {averages}, {', '.join(f'{name}_count' for name in FLAG_BITS)}
+        FROM {ROLLUP_TABLE}
+        WHERE device = ? AND hour >= ? AND hour < ?
+        ORDER BY hour
+    """, (device, start_ms, end_ms))
+    return cursor.fetchall()
+
+
+class RetentionWorker:
+    """Passes de rétention en arrière-plan (toutes les `interval` s ou sur demande)"""
+
+    def __init__(self, db, raw_days: int = 7, rollup_days: int = 365, compressed_days: int = 365,
+                 irrigation_days: int = 0, alert_days: int = 7, interval: float = 3600.0, chunk_rows: int = 2000,
+                 chunk_pause: float = 0.05, vacuum_pages: int = 256, min_free_pages: int = 1024):
+        self.db = db
+        self.raw_days = raw_days
+        self.rollup_days = rollup_days
+        # Sans NumPy: agrégats horaires seuls
+        self.compressed_days = compressed_days if chunk_store.available() else 0
+        self.irrigation_days = irrigation_days
+        self.alert_days = alert_days
+        self.interval = interval
+        self.chunk_rows = max(1, chunk_rows)
+        self.chunk_pause = chunk_pause
+        self.vacuum_pages = max(1, vacuum_pages)
+        self.min_free_pages = min_free_pages
+        self._auto_vacuum_logged = False
+
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._pass_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.stats = {"passes": 0, "raw_deleted": 0, "hours_rolled_up": 0, "hours_compressed": 0,
+                      "rollups_deleted": 0, "compressed_deleted": 0, "events_deleted": 0, "alerts_resolved": 0, "chunks": 0, "pages_freed": 0,
+                      "errors": 0}
+
+    # === API PUBLIQUE ===
+
+    def start(self) -> 'RetentionWorker':
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="RetentionWorker")
+            self._thread.start()
+        return self
+
+    def trigger(self):
+        """Demande une passe rapidement (sans attendre son exécution)"""
+        self._wake.set()
+        self.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Arrêt: la passe en cours s'interrompt au bloc suivant"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def run_once(self, raw_days: Optional[int] = None) -> Dict[str, Any]:
+        """Une passe complète (bloquante pour l'appelant, jamais pour les autres écrivains)"""
+        with self._pass_lock:
+            return self._pass(self.raw_days if raw_days is None else raw_days)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "last_run": self.last_run,
+            "policy": {"raw_days": self.raw_days, "rollup_days": self.rollup_days,
+                       "compressed_days": self.compressed_days,
+                       "irrigation_days": self.irrigation_days, "alert_days": self.alert_days},
+        }
+
+    # === INTERNE ===
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"❌ Erreur rétention: {e}")
+            self._wake.wait(self.interval)
+
+    def _pass(self, raw_days: int) -> Dict[str, Any]:
+        started = time.time()
+        result = {"raw_deleted": 0, "hours_rolled_up": 0, "hours_compressed": 0, "rollups_deleted": 0,
+                  "compressed_deleted": 0, "events_deleted": 0, "alerts_resolved": 0, "chunks": 0, "pages_freed": 0}
+
+        # Compteurs d'alertes en attente écrits avant les transactions de nettoyage
+        alerts = getattr(self.db, "alerts", None)
+        if alerts is not None:
+            alerts.flush()
+
+        conn = sqlite3.connect(self.db.db_path, timeout=30)
+        try:
+            devices = [row[0] for row in conn.execute("SELECT id FROM devices")]
+            now_ms = to_ms(time.time())
+
+            if raw_days > 0:
+                # Heures complètes uniquement: une heure n'est jamais agrégée en deux fois
+                cutoff = (now_ms - raw_days * 86400 * 1000) // HOUR_MS * HOUR_MS
+                for device in devices:
+                    self._purge_raw(conn, device, cutoff, result)
+
+            if self.rollup_days > 0:
+                cutoff = now_ms - self.rollup_days * 86400 * 1000
+                for device in devices:
+                    result["rollups_deleted"] += self._purge_range(
+                        conn, ROLLUP_TABLE, "hour", device, cutoff, result)
+
+            if self.compressed_days > 0:
+                cutoff = now_ms - self.compressed_days * 86400 * 1000
+                for device in devices:
+                    result["compressed_deleted"] += self._purge_range(
+                        conn, CHUNK_TABLE, "hour", device, cutoff, result)
+
+            if self.irrigation_days > 0:
+                result["events_deleted"] += self._purge_events(conn, self.irrigation_days, result)
+
+            if self.alert_days > 0:
+                # Alertes ouvertes inactives fermées (last_seen: une alerte encore active reste ouverte)
+                with conn:
+                    cursor = conn.execute("""
+                        UPDATE system_alerts
+                        SET resolved = 1
+                        WHERE resolved = 0 AND COALESCE(last_seen, timestamp) < datetime('now', ?)
+                    """, (f'-{self.alert_days} days',))
+                    result["alerts_resolved"] = cursor.rowcount
+
+            result["pages_freed"] = self._vacuum(conn)
+        finally:
+            conn.close()
+
+        for key, value in result.items():
+            self.stats[key] += value
+        self.stats["passes"] += 1
+        result["duration"] = round(time.time() - started, 3)
+        result["finished_at"] = time.time()
+        self.last_run = result
+
+        if result["raw_deleted"] or result["events_deleted"] or result["pages_freed"]:
+            logger.info(f"🧹 Rétention: {result['raw_deleted']} lectures -> {result['hours_rolled_up']} h "
+                        f"agrégées, {result['hours_compressed']} h compressées, {result['events_deleted']} événements, "
+                        f"{result['pages_freed']} pages rendues ({result['duration']}s)")
+        return result
+
+    def _pause(self) -> bool:
+        """Pause entre deux blocs; False si l'arrêt est demandé"""
+        if self.chunk_pause:
+            time.sleep(self.chunk_pause)
+        return not self._stopping.is_set()
+
+    def _chunk_end(self, conn: sqlite3.Connection, table: str, key: str, device: int,
+                   start: int, cutoff: int) -> int:
+        """Borne (exclue) du bloc: CHUNK_ROWS lignes à partir de start, au plus cutoff"""
+        row = conn.execute(f"""
+            SELECT {key} FROM {table}
+            WHERE device = ? AND {key} >= ? AND {key} < ?
+            ORDER BY {key} LIMIT 1 OFFSET ?
+        """, (device, start, cutoff, self.chunk_rows)).fetchone()
+        return cutoff if row is None else row[0]
+
+    def _purge_raw(self, conn: sqlite3.Connection, device: int, cutoff: int, result: Dict[str, int]):
+        """Lectures brutes avant cutoff: agrégées et compressées par heure puis supprimées, bloc par bloc"""
+        while True:
+            start = conn.execute(f"SELECT MIN(ts) FROM {SENSOR_TABLE} WHERE device = ?",
+                                 (device,)).fetchone()[0]
+            if start is None or start >= cutoff:
+                return
+            end = self._chunk_end(conn, SENSOR_TABLE, "ts", device, start, cutoff)
+            # Bloc ramené à une limite d'heure (au moins l'heure de départ entière)
+            end = min(cutoff, max(end // HOUR_MS * HOUR_MS, start // HOUR_MS * HOUR_MS + HOUR_MS))
+
+            with conn:
+                rolled = conn.execute(ROLLUP_SQL, (device, start, end)).rowcount
+                compressed = (chunk_store.compress_range(conn.cursor(), device, start, end)
+                              if self.compressed_days > 0 else 0)
+                deleted = conn.execute(f"DELETE FROM {SENSOR_TABLE} WHERE device = ? AND ts >= ? AND ts < ?",
+                                       (device, start, end)).rowcount
+                bump_versions(conn.cursor(), SENSOR_TABLE, ROLLUP_TABLE, CHUNK_TABLE)
+            result["hours_rolled_up"] += max(0, rolled)
+            result["hours_compressed"] += compressed
+            result["raw_deleted"] += deleted
+            result["chunks"] += 1
+            if not self._pause():
+                return
+
+    def _purge_range(self, conn: sqlite3.Connection, table: str, key: str, device: int,
+                     cutoff: int, result: Dict[str, int]) -> int:
+        deleted = 0
+        while True:
+            start = conn.execute(f"SELECT MIN({key}) FROM {table} WHERE device = ?", (device,)).fetchone()[0]
+            if start is None or start >= cutoff:
+                return deleted
+            end = max(self._chunk_end(conn, table, key, device, start, cutoff), start + 1)
+            with conn:
+                deleted += conn.execute(f"DELETE FROM {table} WHERE device = ? AND {key} >= ? AND {key} < ?",
+                                        (device, start, end)).rowcount
+                bump_versions(conn.cursor(), table)
+            result["chunks"] += 1
+            if not self._pause():
+                return deleted
+
+    def _purge_events(self, conn: sqlite3.Connection, days: int, result: Dict[str, int]) -> int:
+        """Événements d'irrigation plus vieux que `days`, par intervalles d'id"""
+        deleted = 0
+        while True:
+            row = conn.execute("""
+                SELECT MAX(id) FROM (
+                    SELECT id FROM irrigation_events
+                    WHERE timestamp < datetime('now', ?)
+                    ORDER BY id LIMIT ?
+                )
+            """, (f'-{days} days', self.chunk_rows)).fetchone()
+            if row[0] is None:
+                return deleted
+            with conn:
+                deleted += conn.execute("""
+                    DELETE FROM irrigation_events
+                    WHERE id <= ? AND timestamp < datetime('now', ?)
+                """, (row[0], f'-{days} days')).rowcount
+                bump_versions(conn.cursor(), "irrigation_events")
+            result["chunks"] += 1
+            if not self._pause():
+                return deleted
+
+    def _vacuum(self, conn: sqlite3.Connection) -> int:
+        """Rend les pages libres au système, VACUUM_PAGES à la fois"""
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != AUTO_VACUUM_INCREMENTAL:
+            # Base créée avant la rétention par paliers: pas de VACUUM complet en cours de service
+            if not self._auto_vacuum_logged:
+                logger.info("ℹ️ auto_vacuum reste NONE: pages libérées réutilisées, fichier non réduit "
+                            "(service arrêté: python -m core.retention --convert-auto-vacuum)")
+                self._auto_vacuum_logged = True
+            return 0
+
+        freed = 0
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free < self.min_free_pages:
+            return 0
+        while free > 0:
+            # executescript: exécuté jusqu'au bout (execute + fetchall ne libère qu'une page)
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            freed += free - remaining
+            if remaining >= free or not self._pause():
+                break
+            free = remaining
+        return freed
+
+
+def create_worker(db) -> RetentionWorker:
+    """Politique de config.retention pour une base (DatabaseManager)"""
+    from config.settings import config
+    settings = config.retention
+    return RetentionWorker(db,
+                           raw_days=config.irrigation.HISTORY_DAYS,
+                           rollup_days=settings.ROLLUP_DAYS,
+                           compressed_days=settings.COMPRESSED_DAYS,
+                           irrigation_days=settings.IRRIGATION_DAYS,
+                           alert_days=config.irrigation.HISTORY_DAYS,
+                           interval=config.irrigation.DATABASE_CLEANUP_INTERVAL,
+                           chunk_rows=settings.CHUNK_ROWS,
+                           chunk_pause=settings.CHUNK_PAUSE,
+                           vacuum_pages=settings.VACUUM_PAGES,
+                           min_free_pages=settings.MIN_FREE_PAGES)
+
+
+def _create_worker() -> RetentionWorker:
+    from core.database_manager import db_manager
+    return resolve(db_manager).retention
+
+
+# Instance globale (processus propriétaire de la base)
+retention_worker = LazyInstance(_create_worker, "retention_worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance de la base (rétention par paliers)")
+    parser.add_argument("--convert-auto-vacuum", action="store_true",
+                        help="VACUUM unique vers auto_vacuum=INCREMENTAL (service arrêté)")
+    parser.add_argument("--db", default=None, help="base SQLite (config.db_path par défaut)")
+    args = parser.parse_args()
+    if not args.convert_auto_vacuum:
+        parser.print_help()
+        return
+
+    from config.settings import config
+    db_path = args.db or config.db_path
+    print(f"🔄 Passage de {db_path} en auto_vacuum=INCREMENTAL (VACUUM complet)...")
+    result = convert_auto_vacuum(db_path)
+    if result["converted"]:
+        print(f"✅ Base convertie en {result['duration']}s ({result['pages_freed']} pages libres rendues)")
+    else:
+        print("✅ auto_vacuum déjà INCREMENTAL: rien à faire")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Fichier circulaire mappé en mémoire pour les échantillons bruts à haute fréquence (diagnostic)
+- taille fixe: en-tête de 64 octets + CAPACITY enregistrements de 32 octets (RECORD)
+- écrivain unique (SensorManager, thread de capture): struct.pack_into dans le mmap, aucune
+  requête SQL; l'occupation disque ne change jamais
+- en-tête: `count` = nombre total d'enregistrements écrits (curseur = count % capacity)
+- sûr en cas de crash: chaque enregistrement porte son numéro (seq); il est écrit avant
+  l'avancement de `count`, et seuls les enregistrements dont seq correspond sont valides
+  (l'emplacement en cours d'écrasement est exclu); à l'ouverture, l'écrivain recale `count`
+  sur les enregistrements réellement présents
+- lecteurs dans d'autres processus (API, outils d'export): np.memmap en lecture seule,
+  vues sans copie (RingReader.views) ou copie chronologique validée (RingReader.read)
+
+    python -m core.ring_file raw_samples.ring --tail 20
+"""
+import os
+import mmap
+import time
+import struct
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.compact_schema import FLAG_BITS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"IRRING01"
+VERSION = 1
+
+# magic, version, taille d'enregistrement, capacité, count, création
+HEADER = struct.Struct("<8sIIQQd")
+HEADER_SIZE = 64
+COUNT_OFFSET = 24
+
+# ts (epoch s), seq, flags, sol %, température °C, humidité air %, niveau d'eau %
+RECORD = struct.Struct("<dIIffff")
+RECORD_FIELDS = (("ts", "<f8"), ("seq", "<u4"), ("flags", "<u4"), ("soil_moisture", "<f4"),
+                 ("temperature", "<f4"), ("air_humidity", "<f4"), ("water_level", "<f4"))
+
+# Emplacements les plus anciens ignorés par les lecteurs (écrasés pendant la lecture)
+READ_GUARD = 1
+
+
+def record_dtype():
+    import numpy as np
+    return np.dtype(list(RECORD_FIELDS))
+
+
+def _file_size(capacity: int) -> int:
+    return HEADER_SIZE + capacity * RECORD.size
+
+
+class RingWriter:
+    """Écrivain du fichier circulaire (un seul par fichier)"""
+
+    def __init__(self, path, capacity: int = 86400, flush_interval: float = 10.0):
+        self.path = Path(path)
+        self.capacity = max(READ_GUARD + 1, capacity)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+        self.recovered = 0
+
+        self._open()
+        logger.info(f"✅ Fichier circulaire {self.path}: {self.capacity} enregistrements, "
+                    f"{_file_size(self.capacity) / 1e6:.1f} Mo, {self.count} déjà écrits")
+
+    # === API PUBLIQUE ===
+
+    def append(self, ts: float, values: Dict[str, Any]):
+        """Ajoute un échantillon (clés de compact_schema.reading_values)"""
+        flags = 0
+        for name, bit in FLAG_BITS.items():
+            if values.get(name):
+                flags |= 1 << bit
+        with self._lock:
+            seq = self.count
+            offset = HEADER_SIZE + (seq % self.capacity) * RECORD.size
+            RECORD.pack_into(self._mm, offset, ts, seq & 0xFFFFFFFF, flags,
+                             *(_float(values.get(name)) for name in
+                               ("soil_moisture", "temperature", "air_humidity", "water_level")))
+            # Enregistrement complet avant l'avancement du curseur
+            self.count = seq + 1
+            struct.pack_into("<Q", self._mm, COUNT_OFFSET, self.count)
+            if time.time() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._mm is not None:
+                self._flush()
+                self._mm.close()
+                self._mm = None
+                os.close(self._fd)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "capacity": self.capacity,
+            "count": self.count,
+            "stored": min(self.count, self.capacity - READ_GUARD),
+            "bytes": _file_size(self.capacity),
+            "recovered": self.recovered,
+        }
+
+    # === INTERNE ===
+
+    def _open(self):
+        size = _file_size(self.capacity)
+        if self.path.exists() and not self._compatible():
+            moved = self.path.with_name(f"{self.path.name}.old-{int(time.time())}")
+            os.replace(self.path, moved)
+            logger.warning(f"⚠️ Fichier circulaire incompatible, mis de côté: {moved}")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        created = not self.path.exists()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if created:
+            # Réservé d'un bloc: occupation disque constante
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(self._fd, 0, size)
+            else:
+                os.ftruncate(self._fd, size)
+        self._mm = mmap.mmap(self._fd, size)
+
+        if created:
+            HEADER.pack_into(self._mm, 0, MAGIC, VERSION, RECORD.size, self.capacity, 0, time.time())
+            self._mm.flush()
+            self.count = 0
+        else:
+            self.count = self._recover(struct.unpack_from("<Q", self._mm, COUNT_OFFSET)[0])
+            struct.pack_into("<Q", self._mm, COUNT_OFFSET, self.count)
+
+    def _compatible(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, record_size, capacity, _, _ = HEADER.unpack(f.read(HEADER.size))
+            return (magic == MAGIC and version == VERSION and record_size == RECORD.size
+                    and capacity == self.capacity
+                    and self.path.stat().st_size == _file_size(self.capacity))
+        except (OSError, struct.error):
+            return False
+
+    def _valid(self, index: int) -> bool:
+        """Emplacement de l'enregistrement n° index contenant bien cet enregistrement"""
+        ts, seq = RECORD.unpack_from(self._mm, HEADER_SIZE + (index % self.capacity) * RECORD.size)[:2]
+        return seq == index & 0xFFFFFFFF and ts > 0
+
+    def _recover(self, count: int) -> int:
+        """Curseur recalé sur les enregistrements présents (crash entre écriture et en-tête)"""
+        start = count
+        # En-tête en retard: enregistrements suivants déjà écrits
+        while count - start < self.capacity and self._valid(count):
+            count += 1
+        # En-tête en avance (pages non écrites avant la coupure): recul jusqu'au dernier valide
+        while count > 0 and not self._valid(count - 1):
+            count -= 1
+        self.recovered = count - start
+        if self.recovered:
+            logger.warning(f"⚠️ Fichier circulaire: curseur recalé de {self.recovered} enregistrements")
+        return count
+
+    def _flush(self):
+        self._mm.flush()
+        self._last_flush = time.time()
+
+
+class RingReader:
+    """Lecteur sans copie (np.memmap, lecture seule), utilisable par tout processus"""
+
+    def __init__(self, path):
+        import numpy as np
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            magic, version, record_size, capacity, _, self.created = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{self.path}: fichier circulaire invalide")
+        self.capacity = capacity
+        self._count = np.memmap(self.path, dtype="<u8", mode="r", offset=COUNT_OFFSET, shape=(1,))
+        self.records = np.memmap(self.path, dtype=record_dtype(), mode="r", offset=HEADER_SIZE,
+                                 shape=(capacity,))
+
+    @property
+    def count(self) -> int:
+        return int(self._count[0])
+
+    def views(self, last: Optional[int] = None) -> Tuple[int, List[Any]]:
+        """
+        (premier numéro, vues sans copie dans l'ordre chronologique): au plus deux tranches
+        du memmap. Les vues restent vivantes: l'écrivain peut écraser les plus anciennes
+        """
+        count = self.count
+        available = min(count, self.capacity - READ_GUARD)
+        last = available if last is None else max(0, min(last, available))
+        first = count - last
+        start, end = first % self.capacity, count % self.capacity
+        if last == 0:
+            return first, []
+        if start < end:
+            return first, [self.records[start:end]]
+        return first, [self.records[start:], self.records[:end]]
+
+    def read(self, last: Optional[int] = None, since: Optional[float] = None):
+        """Copie chronologique validée (seq) des derniers enregistrements"""
+        import numpy as np
+        first, parts = self.views(last)
+        data = np.concatenate(parts) if parts else np.empty(0, dtype=record_dtype())
+        expected = (np.arange(first, first + len(data), dtype=np.uint64) & np.uint64(0xFFFFFFFF))
+        # Enregistrements écrasés pendant la copie: numéro inattendu
+        data = data[data["seq"] == expected.astype(np.uint32)]
+        if since is not None:
+            data = data[data["ts"] >= since]
+        return data
+
+    def read_columns(self, last: Optional[int] = None, since: Optional[float] = None) -> Dict[str, Any]:
+        """Copie en colonnes: drapeaux décodés en booléens"""
+        data = self.read(last, since)
+        columns = {name: data[name] for name, _ in RECORD_FIELDS if name not in ("seq", "flags")}
+        for name, bit in FLAG_BITS.items():
+            columns[name] = (data["flags"] >> bit) & 1 == 1
+        return columns
+
+    def close(self):
+        for array in (self.records, self._count):
+            mm = getattr(array, "_mmap", None)
+            if mm is not None:
+                mm.close()
+
+
+def _float(value: Any) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lecture du fichier circulaire des échantillons bruts")
+    parser.add_argument("path")
+    parser.add_argument("--tail", type=int, default=20, help="derniers enregistrements affichés")
+    args = parser.parse_args()
+
+    reader = RingReader(args.path)
+    data = reader.read(args.tail)
+    print(f"📼 {reader.path}: {reader.count} écrits, capacité {reader.capacity}")
+    for row in data:
+        flags = ",".join(name for name, bit in FLAG_BITS.items() if row["flags"] >> bit & 1)
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row['ts']))} "
+              f"sol={row['soil_moisture']:.1f} t={row['temperature']:.1f} "
+              f"h={row['air_humidity']:.1f} eau={row['water_level']:.1f} [{flags}]")
+
+
+if __name__ == "__main__":
+    main()
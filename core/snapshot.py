@@ -0,0 +1,202 @@
+"""
+Mode « RAM d'abord »: la base vivante est sur tmpfs, la carte SD ne reçoit que des instantanés
+- toutes les connexions (cycle, API, workers gunicorn, rétention) ouvrent le fichier tmpfs:
+  les commits par lecture / alerte / événement ne touchent plus la carte SD
+- instantané: API de sauvegarde en ligne de SQLite, par pas de SNAPSHOT_PAGES pages (les
+  écrivains ne sont pas bloqués), dans un fichier temporaire puis os.replace atomique;
+  aucun instantané si la base n'a pas changé (PRAGMA data_version)
+- perte maximale: SNAPSHOT_INTERVAL secondes (coupure de courant); arrêt propre = instantané final
+- reprise: tmpfs vide (redémarrage) ou base vivante illisible -> restauration du dernier instantané
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def live_path(durable_path: Path, ram_dir: str) -> Path:
+    """Fichier de la base vivante (tmpfs) correspondant au fichier durable"""
+    return Path(ram_dir) / Path(durable_path).name
+
+
+def _fsync(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _copy(source: Path, target: Path, pages: int = -1, pause: float = 0.0) -> int:
+    """
+    Copie cohérente source -> target par l'API de sauvegarde (fichier temporaire, fsync,
+    os.replace): target est soit l'ancienne version complète, soit la nouvelle
+    """
+    tmp = target.with_name(target.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    src = sqlite3.connect(source, timeout=30)
+    dst = sqlite3.connect(tmp)
+    try:
+        # Atomicité assurée par le renommage: pas de journal sur la copie
+        dst.execute("PRAGMA journal_mode = OFF")
+        src.backup(dst, pages=pages, sleep=pause)
+    finally:
+        dst.close()
+        src.close()
+    _fsync(tmp)
+    os.replace(tmp, target)
+    _fsync(target.parent)
+    return target.stat().st_size
+
+
+def _readable(path: Path) -> bool:
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return conn.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+
+def restore(durable: Path, live: Path) -> str:
+    """
+    Prépare la base vivante au démarrage; retourne l'origine retenue:
+    'live' (processus relancé, tmpfs conservé, plus récent que l'instantané),
+    'snapshot' (restauration du dernier instantané) ou 'empty' (aucun des deux)
+    """
+    live.parent.mkdir(parents=True, exist_ok=True)
+    if live.exists():
+        if _readable(live):
+            return "live"
+        damaged = live.with_name(f"{live.name}.damaged-{int(time.time())}")
+        os.replace(live, damaged)
+        logger.warning(f"⚠️ Base en RAM illisible, mise de côté: {damaged}")
+
+    if durable.exists():
+        _copy(durable, live)
+        logger.info(f"♻️ Base restaurée depuis l'instantané {durable} -> {live}")
+        return "snapshot"
+    return "empty"
+
+
+class SnapshotWorker:
+    """Instantanés périodiques de la base vivante vers le fichier durable"""
+
+    def __init__(self, live: Path, durable: Path, interval: float = 300.0, pages: int = 256,
+                 step_pause: float = 0.01, enabled: bool = True):
+        self.live = Path(live)
+        self.durable = Path(durable)
+        self.interval = interval
+        self.pages = max(1, pages)
+        self.step_pause = step_pause
+        self.enabled = enabled
+
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._snapshot_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._probe: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self.restored_from: Optional[str] = None
+        self.last_snapshot: Optional[float] = None
+        self.stats = {"snapshots": 0, "skipped": 0, "bytes_written": 0, "last_duration": 0.0,
+                      "errors": 0}
+
+    # === API PUBLIQUE ===
+
+    def start(self) -> 'SnapshotWorker':
+        """Démarre le thread (processus propriétaire de la base uniquement)"""
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="SnapshotWorker")
+            self._thread.start()
+            logger.info(f"💾 Instantanés toutes les {self.interval:.0f}s -> {self.durable}")
+        return self
+
+    def stop(self, timeout: float = 60.0):
+        """Arrêt: instantané final si le thread tournait (arrêt propre = aucune perte)"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        self.snapshot()
+        if self._probe is not None:
+            self._probe.close()
+            self._probe = None
+
+    def snapshot(self, force: bool = False) -> bool:
+        """Copie la base vivante sur le fichier durable si elle a changé; True si copiée"""
+        if not self.enabled:
+            return False
+        with self._snapshot_lock:
+            try:
+                data_version = self._current_version()
+                if not force and data_version == self._data_version and self.durable.exists():
+                    self.stats["skipped"] += 1
+                    return False
+
+                started = time.time()
+                size = _copy(self.live, self.durable, self.pages, self.step_pause)
+                self._data_version = data_version
+                self.last_snapshot = time.time()
+                self.stats["snapshots"] += 1
+                self.stats["bytes_written"] += size
+                self.stats["last_duration"] = round(self.last_snapshot - started, 3)
+                logger.debug(f"💾 Instantané: {size / 1024:.0f} ko en {self.stats['last_duration']}s")
+                return True
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"❌ Erreur instantané base: {e}")
+                return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        age = time.time() - self.last_snapshot if self.last_snapshot else None
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "live": str(self.live),
+            "durable": str(self.durable),
+            "restored_from": self.restored_from,
+            "max_data_loss": self.interval,
+            "snapshot_age": round(age, 1) if age is not None else None,
+        }
+
+    # === INTERNE ===
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stopping.is_set():
+                self.snapshot()
+
+    def _current_version(self) -> int:
+        """
+        data_version d'une connexion de contrôle: change à chaque commit d'une autre connexion
+        (la lecture de la sauvegarde ne le modifie pas)
+        """
+        if self._probe is None:
+            self._probe = sqlite3.connect(self.live, check_same_thread=False)
+        return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+
+def create_worker(durable: Path, live: Path, enabled: bool) -> SnapshotWorker:
+    """Politique de config.storage pour une base (DatabaseManager)"""
+    from config.settings import config
+    settings = config.storage
+    return SnapshotWorker(live, durable,
+                          interval=settings.SNAPSHOT_INTERVAL,
+                          pages=settings.SNAPSHOT_PAGES,
+                          step_pause=settings.SNAPSHOT_STEP_PAUSE,
+                          enabled=enabled)
@@ -0,0 +1,287 @@
+"""
+Démarrage paresseux et parallèle des composants
+- LazyInstance: singleton construit au premier accès (plus rien au moment de l'import)
+- StartupManager: initialisation ordonnée par dépendances, en parallèle, avec mesure des temps
+"""
+import time
+import threading
+import logging
+import importlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class LazyInstance:
+    """
+    Proxy vers un singleton construit au premier accès
+    Remplace les `instance = Classe()` de fin de module: les imports existants
+    (`from core.database_manager import db_manager`) restent valides.
+    """
+    __slots__ = ("_lazy_factory", "_lazy_name", "_lazy_instance", "_lazy_lock")
+
+    def __init__(self, factory: Callable[[], Any], name: str):
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_instance", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _lazy_resolve(self) -> Any:
+        instance = self._lazy_instance
+        if instance is None:
+            with self._lazy_lock:
+                instance = self._lazy_instance
+                if instance is None:
+                    instance = self._lazy_factory()
+                    object.__setattr__(self, "_lazy_instance", instance)
+        return instance
+
+    def _lazy_ready(self) -> bool:
+        return self._lazy_instance is not None
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._lazy_resolve(), item)
+
+    def __setattr__(self, key: str, value: Any):
+        setattr(self._lazy_resolve(), key, value)
+
+    def __repr__(self) -> str:
+        state = "prêt" if self._lazy_ready() else "non initialisé"
+        return f"<LazyInstance {self._lazy_name} ({state})>"
+
+
+def resolve(component: Any) -> Any:
+    """Force la construction d'un singleton paresseux (no-op sinon)"""
+    if isinstance(component, LazyInstance):
+        return component._lazy_resolve()
+    return component
+
+
+@dataclass(frozen=True)
+class ComponentSpec:
+    """Description d'un composant à initialiser"""
+    name: str
+    module: str
+    attribute: str
+    depends_on: Tuple[str, ...] = ()
+    warmup: Optional[str] = None  # méthode appelée après construction (ex: sonde réseau)
+
+
+@dataclass
+class ComponentTiming:
+    """Mesures de démarrage d'un composant"""
+    name: str
+    status: str = "pending"
+    start_offset: float = 0.0
+    import_time: float = 0.0
+    init_time: float = 0.0
+    warmup_time: float = 0.0
+    thread: str = ""
+    error: Optional[str] = None
+
+    @property
+    def total_time(self) -> float:
+        return self.import_time + self.init_time + self.warmup_time
+
+
+# Graphe de dépendances des composants du système
+DEFAULT_COMPONENTS: Tuple[ComponentSpec, ...] = (
+    ComponentSpec("gpio", "core.gpio_manager", "gpio_central"),
+    ComponentSpec("db_manager", "core.database_manager", "db_manager"),
+    ComponentSpec("user_manager", "mobile_backend.user_manager", "user_manager"),
+    ComponentSpec("firebase", "firebase.firebase_config", "firebase_manager"),
+    ComponentSpec("weather_api", "core.weather_api", "weather_api"),
+    ComponentSpec("network_manager", "core.network_manager", "network_manager",
+                  depends_on=("gpio",), warmup="check_network_status"),
+    ComponentSpec("sensor_manager", "sensors.sensor_manager", "sensor_manager",
+                  depends_on=("gpio",)),
+    ComponentSpec("water_pump", "actuators.water_pump", "water_pump", depends_on=("gpio",)),
+    ComponentSpec("status_led", "actuators.status_led", "status_led", depends_on=("gpio",)),
+    ComponentSpec("sync_manager", "core.sync_manager", "sync_manager",
+                  depends_on=("db_manager", "firebase")),
+    ComponentSpec("irrigation_logic", "decision_engine.irrigation_logic", "irrigation_logic",
+                  depends_on=("db_manager", "weather_api", "sensor_manager",
+                              "water_pump", "status_led")),
+)
+
+
+class StartupManager:
+    """Initialise les composants en parallèle dans l'ordre des dépendances"""
+
+    def __init__(self, specs: Tuple[ComponentSpec, ...] = DEFAULT_COMPONENTS, max_workers: int = 4):
+        self.specs: Dict[str, ComponentSpec] = {spec.name: spec for spec in specs}
+        self.max_workers = max_workers
+        self.components: Dict[str, Any] = {}
+        self.timings: Dict[str, ComponentTiming] = {name: ComponentTiming(name) for name in self.specs}
+
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._callbacks: List[Callable[['StartupManager'], None]] = []
+        self._started_at = 0.0
+        self._finished_at = 0.0
+
+    # === API PUBLIQUE ===
+
+    def start(self, on_complete: Optional[Callable[['StartupManager'], None]] = None) -> 'StartupManager':
+        """
+        Lance l'initialisation en arrière-plan (non bloquant)
+        Peut être appelé plusieurs fois (main.py puis l'API): chaque callback est appelé une fois
+        """
+        call_now = False
+        with self._lock:
+            if on_complete:
+                if self._done.is_set():
+                    call_now = True
+                else:
+                    self._callbacks.append(on_complete)
+
+            if self._thread is None:
+                def runner():
+                    self.run()
+                    self._notify()
+
+                self._thread = threading.Thread(target=runner, daemon=True, name="StartupThread")
+                self._thread.start()
+
+        if call_now:
+            self._call(on_complete)
+        return self
+
+    def run(self) -> Dict[str, Any]:
+        """Initialise tous les composants (bloquant)"""
+        self._started_at = time.perf_counter()
+        remaining = dict(self.specs)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="startup") as pool:
+            while remaining or running:
+                # Soumettre les composants dont les dépendances sont prêtes
+                changed = True
+                while changed:
+                    changed = False
+                    for name, spec in list(remaining.items()):
+                        statuses = [self.timings[dep].status if dep in self.timings else "missing"
+                                    for dep in spec.depends_on]
+                        if any(s in ("failed", "skipped", "missing") for s in statuses):
+                            self.timings[name].status = "skipped"
+                            self.timings[name].error = "dépendance indisponible"
+                        elif all(s == "ok" for s in statuses):
+                            self.timings[name].status = "running"
+                            running[pool.submit(self._init_component, spec)] = name
+                        else:
+                            continue
+                        del remaining[name]
+                        changed = True
+
+                if not running:
+                    # Cycle de dépendances: rien ne peut plus progresser
+                    for name in remaining:
+                        self.timings[name].status = "skipped"
+                        self.timings[name].error = "cycle de dépendances"
+                    break
+
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    running.pop(future)
+
+        self._finished_at = time.perf_counter()
+        self._done.set()
+        logger.info("⏱️ Démarrage terminé\n" + self.format_report())
+        return self.components
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin de l'initialisation"""
+        return self._done.wait(timeout)
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def is_ready(self, name: str) -> bool:
+        timing = self.timings.get(name)
+        return timing is not None and timing.status == "ok"
+
+    def get(self, name: str) -> Any:
+        return self.components.get(name)
+
+    def get_report(self) -> Dict[str, Any]:
+        """Rapport de démarrage (pour l'API / diagnostic)"""
+        total = (self._finished_at or time.perf_counter()) - self._started_at if self._started_at else 0.0
+        return {
+            "done": self.is_done(),
+            "total_time": round(total, 4),
+            "components": {
+                name: {
+                    "status": t.status,
+                    "start_offset": round(t.start_offset, 4),
+                    "import_time": round(t.import_time, 4),
+                    "init_time": round(t.init_time, 4),
+                    "warmup_time": round(t.warmup_time, 4),
+                    "thread": t.thread,
+                    "error": t.error
+                }
+                for name, t in self.timings.items()
+            }
+        }
+
+    def format_report(self) -> str:
+        """Rapport texte, dans l'esprit de `python -X importtime` (microsecondes)"""
+        lines = ["startup: offset [us] | import [us] | init [us] | warmup [us] | total [us] | component"]
+        ordered: List[ComponentTiming] = sorted(self.timings.values(), key=lambda t: t.start_offset)
+        for t in ordered:
+            name = t.name if t.status == "ok" else f"{t.name} ({t.status}: {t.error})"
+            lines.append(
+                f"startup: {t.start_offset * 1e6:>11.0f} | {t.import_time * 1e6:>11.0f} | "
+                f"{t.init_time * 1e6:>9.0f} | {t.warmup_time * 1e6:>11.0f} | "
+                f"{t.total_time * 1e6:>10.0f} | {name}"
+            )
+        if self._finished_at:
+            lines.append(f"startup: total {(self._finished_at - self._started_at) * 1e6:.0f} us")
+        return "\n".join(lines)
+
+    # === INTERNE ===
+
+    def _notify(self):
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._call(callback)
+
+    def _call(self, callback: Callable[['StartupManager'], None]):
+        try:
+            callback(self)
+        except Exception as e:
+            logger.error(f"❌ Erreur callback démarrage: {e}")
+
+    def _init_component(self, spec: ComponentSpec):
+        timing = self.timings[spec.name]
+        timing.thread = threading.current_thread().name
+        timing.start_offset = time.perf_counter() - self._started_at
+
+        try:
+            t0 = time.perf_counter()
+            module = importlib.import_module(spec.module)
+            component = getattr(module, spec.attribute)
+            t1 = time.perf_counter()
+            instance = resolve(component)
+            t2 = time.perf_counter()
+            if spec.warmup:
+                getattr(instance, spec.warmup)()
+            t3 = time.perf_counter()
+
+            timing.import_time = t1 - t0
+            timing.init_time = t2 - t1
+            timing.warmup_time = t3 - t2
+            self.components[spec.name] = component
+            timing.status = "ok"
+            logger.debug(f"✅ {spec.name} prêt en {timing.total_time * 1000:.1f} ms")
+
+        except Exception as e:
+            timing.status = "failed"
+            timing.error = str(e)
+            logger.error(f"❌ Échec initialisation {spec.name}: {e}")
+
+
+# Instance globale
+startup_manager = StartupManager()
@@ -1,12 +1,24 @@
 """
 Gestionnaire de synchronisation Firebase - Version complète
+- planificateur en arrière-plan (start): réveillé tout de suite au retour du réseau
+  (NetworkManager) ou par request_sync, sinon toutes les SYNC_INTERVAL secondes
+- curseurs d'envoi persistants (table sync_cursors): rien n'est perdu pendant une coupure,
+  l'arriéré est vidé par passes de SYNC_BATCH_SIZE séparées de SYNC_BATCH_PAUSE secondes
+- erreurs: attente exponentielle avec gigue (SYNC_BACKOFF_BASE x 2^n, plafonnée à
+  SYNC_BACKOFF_MAX), remise à zéro à la première passe sans erreur
+- seul écrivain des lectures dans Firestore (le cycle n'envoie rien): une lecture, un document
+- budget de données (core/egress.py): au-delà du rythme mensuel, intervalles multipliés;
+  budget atteint, résumés journaliers seulement
 """
 import time
+import random
 import logging
 import threading
-import sqlite3  # AJOUT IMPORT
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from config.settings import config
 from core.database_manager import db_manager
+from core.egress import CRITICAL, egress_budget
+from firebase import sensor_chunks
 from firebase.firebase_config import firebase_manager
 
 logger = logging.getLogger(__name__)
@@ -15,19 +27,111 @@ class SyncManager:
     """Gère la synchronisation entre base locale et Firebase"""
     
     def __init__(self):
-        self.sync_interval = 300  # 5 minutes
+        settings = config.firebase
+        self.sync_interval = settings.SYNC_INTERVAL
+        self.batch_size = max(1, settings.SYNC_BATCH_SIZE)
+        self.batch_pause = settings.SYNC_BATCH_PAUSE
+        self.backoff_base = settings.SYNC_BACKOFF_BASE
+        self.backoff_max = settings.SYNC_BACKOFF_MAX
         self.last_sync_time = 0
         self.sync_in_progress = False
         self.sync_lock = threading.Lock()
         
-        logger.info("✅ SyncManager initialisé")
+        # Envoi groupé: documents horaires réécrits tant que leur heure est ouverte
+        self.packed = settings.PACKED_UPLOAD
+        self._chunk_counts: Dict[Tuple[str, int], int] = {}  # lectures envoyées par (appareil, heure)
+        
+        # Planificateur
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.next_sync_time = 0.0
+        self.consecutive_failures = 0
+        self.backlog: Dict[str, int] = {}
+        self.drain_rate = 0.0  # éléments envoyés par seconde pendant le rattrapage (moyenne glissante)
+        
+        logger.info(f"✅ SyncManager initialisé ({'documents horaires' if self.packed else 'un document par lecture'})")
+    
+    # === PLANIFICATEUR ===
+    
+    def start(self) -> 'SyncManager':
+        """Démarre le planificateur (processus propriétaire de la base uniquement)"""
+        if self._thread is None or not self._thread.is_alive():
+            from core.network_manager import network_manager
+            network_manager.add_listener(self.on_network_change)
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="FirebaseSyncThread")
+            self._thread.start()
+            logger.info(f"🔄 Planificateur de synchronisation démarré (toutes les {self.sync_interval}s)")
+        return self
+    
+    def stop(self, timeout: float = 30.0):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+    
+    def on_network_change(self, online: bool):
+        """Écouteur NetworkManager: retour du réseau -> envoi immédiat, attente remise à zéro"""
+        if online:
+            self.consecutive_failures = 0
+            self.request_sync()
+    
+    def request_sync(self) -> Tuple[bool, str]:
+        """Envoi dès que possible (planificateur réveillé, ou thread ponctuel s'il ne tourne pas)"""
+        if self._thread is not None and self._thread.is_alive():
+            self.next_sync_time = 0.0
+            self._wake.set()
+            return True, "Synchronisation demandée au planificateur"
+        
+        threading.Thread(target=self.sync_all_data, daemon=True, name="ManualSyncThread").start()
+        return True, "Synchronisation démarrée en arrière-plan"
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(max(0.0, self.next_sync_time - time.time()))
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            if time.time() < self.next_sync_time:
+                continue
+            
+            if not self.should_sync():
+                # Hors ligne: réveil par on_network_change, ou nouvel essai à l'intervalle
+                self.next_sync_time = time.time() + self.sync_interval
+                continue
+            
+            result = self.sync_all_data()
+            self.next_sync_time = time.time() + self._next_delay(result)
+    
+    def _next_delay(self, result: Dict[str, Any]) -> float:
+        """Attente avant la passe suivante: gigue exponentielle, rattrapage ou intervalle"""
+        if result.get("in_progress"):
+            # Passe manuelle en cours: pas une erreur
+            return self.batch_pause
+        failed = not result.get("success") or result.get("stats", {}).get("errors", 0) > 0
+        if failed:
+            self.consecutive_failures += 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_failures - 1))
+            delay = random.uniform(delay / 2, delay)
+            logger.warning(f"⚠️ Synchronisation en erreur ({self.consecutive_failures}), "
+                           f"nouvel essai dans {delay:.0f}s")
+            return delay
+        
+        self.consecutive_failures = 0
+        # Liaison facturée au-delà du rythme: cadence réduite; budget atteint: pas de rattrapage
+        factor = egress_budget.cadence_factor()
+        if self.backlog_size() > 0 and egress_budget.level() != CRITICAL:
+            return self.batch_pause * factor
+        return self.sync_interval * factor
     
     def should_sync(self) -> bool:
-        """Détermine si une synchronisation est nécessaire"""
-        current_time = time.time()
+        """Détermine si une synchronisation est possible maintenant"""
+        from core.network_manager import network_manager
         
-        # Vérifier l'intervalle
-        if current_time - self.last_sync_time < self.sync_interval:
+        if time.time() < self.next_sync_time:
             return False
         
         # Vérifier si Firebase est connecté
@@ -35,119 +139,222 @@ class SyncManager:
             logger.debug("Firebase non connecté, pas de synchronisation")
             return False
         
-        return True
+        return network_manager.check_network_status()
+    
+    # === PASSE D'ENVOI ===
     
     def sync_all_data(self) -> Dict[str, Any]:
-        """Synchronise toutes les données avec Firebase"""
+        """Une passe: au plus SYNC_BATCH_SIZE éléments par flux, à partir des curseurs"""
         with self.sync_lock:
             if self.sync_in_progress:
                 logger.debug("Synchronisation déjà en cours")
-                return {"success": False, "message": "Sync déjà en cours"}
+                return {"success": False, "message": "Sync déjà en cours", "in_progress": True}
             
             self.sync_in_progress = True
+        
+        try:
+            logger.info("🔄 Démarrage synchronisation Firebase...")
+            started = time.time()
             
-            try:
-                logger.info("🔄 Démarrage synchronisation Firebase...")
-                
-                stats = {
-                    "sensor_data_synced": 0,
-                    "irrigation_events_synced": 0,
-                    "alerts_synced": 0,
-                    "errors": 0
-                }
-                
-                # 1. Synchroniser les données des capteurs
+            stats = {
+                "sensor_data_synced": 0,
+                "sensor_chunks_synced": 0,
+                "irrigation_events_synced": 0,
+                "summaries_synced": 0,
+                "alerts_synced": 0,
+                "errors": 0
+            }
+            
+            # Budget de données atteint: résumés seulement (lectures et événements en attente)
+            telemetry = egress_budget.allow("firebase", "telemetry")
+            if not telemetry:
+                logger.info("📶 Budget de données atteint: envoi des résumés seulement")
+            
+            # 1. Synchroniser les données des capteurs
+            if telemetry:
                 logger.info("📊 Synchronisation des données capteurs...")
-                sensor_data = db_manager.get_recent_sensor_data(limit=50)
-                
-                for data in sensor_data:
-                    try:
-                        # Convertir le format SQLite vers format Firebase
-                        firebase_data = {
-                            "timestamp": data.get("timestamp"),
-                            "soil_moisture": data.get("soil_moisture"),
-                            "soil_is_dry": data.get("soil_is_dry"),
-                            "water_level": data.get("water_level"),
-                            "water_detected": data.get("water_detected"),
-                            "rain_detected": data.get("rain_detected"),
-                            "temperature": data.get("temperature"),
-                            "air_humidity": data.get("air_humidity"),
-                            "device_id": "raspberry_pi_irrigation",
-                            "sync_time": time.time()
-                        }
-                        
-                        if firebase_manager.save_sensor_data(firebase_data):
-                            stats["sensor_data_synced"] += 1
-                    except Exception as e:
-                        stats["errors"] += 1
-                        logger.error(f"❌ Erreur sync données capteur: {e}")
-                
-                # 2. Synchroniser les événements d'irrigation
+                if self.packed:
+                    self._sync_sensor_chunks(stats)
+                else:
+                    self._sync_sensor_rows(stats)
+            
+            # 2. Synchroniser les événements d'irrigation
+            if telemetry:
                 logger.info("🚰 Synchronisation des événements d'irrigation...")
-                # Récupérer les événements non synchronisés
                 try:
-                    # CORRECTION: Accès direct à la base SQLite
-                    conn = sqlite3.connect(db_manager.db_path)
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        SELECT * FROM irrigation_events 
-                        WHERE timestamp > datetime('now', '-1 day')
-                        ORDER BY timestamp DESC
-                    """)
-                    
-                    irrigation_events = cursor.fetchall()
-                    conn.close()
-                    
-                    for event in irrigation_events:
-                        try:
-                            if firebase_manager.save_irrigation_event(
-                                duration=event[2],  # duration
-                                reason=event[3],    # reason
-                                triggered_by=event[4]  # triggered_by
-                            ):
-                                stats["irrigation_events_synced"] += 1
-                        except Exception as e:
-                            stats["errors"] += 1
-                            logger.error(f"❌ Erreur sync irrigation: {e}")
-                            
+                    self._sync_irrigation_events(stats)
                 except Exception as e:
+                    stats["errors"] += 1
                     logger.error(f"❌ Erreur récupération événements: {e}")
-                
-                # Mettre à jour le temps de dernière synchronisation
-                self.last_sync_time = time.time()
-                
-                # Nettoyer les anciennes données locales
-                if stats["sensor_data_synced"] > 0:
-                    deleted = db_manager.cleanup_old_data(3)  # Garder 3 jours seulement
-                    logger.info(f"🧹 Données locales nettoyées: {deleted} lignes supprimées")
-                
-                logger.info(f"✅ Synchronisation terminée: {stats}")
-                return {"success": True, "stats": stats}
-                
+            
+            # 3. Résumés jour / semaine modifiés depuis leur dernier envoi
+            try:
+                self._sync_summaries(stats)
             except Exception as e:
-                logger.error(f"❌ Erreur synchronisation: {e}")
-                return {"success": False, "error": str(e)}
-            finally:
-                self.sync_in_progress = False
-    
-    def sync_single_sensor_data(self, sensor_data: Dict[str, Any]) -> bool:
-        """Synchronise une seule lecture de capteur"""
-        if not firebase_manager.connected:
-            return False
-        
-        try:
-            firebase_data = {
-                "timestamp": time.time(),
-                "sensor_data": sensor_data,
-                "device_id": "raspberry_pi_irrigation",
-                "sync_time": time.time()
-            }
+                stats["errors"] += 1
+                logger.error(f"❌ Erreur sync résumés: {e}")
+            
+            # Mettre à jour le temps de dernière synchronisation
+            self.last_sync_time = time.time()
+            self._update_backlog(stats, self.last_sync_time - started)
             
-            return firebase_manager.save_sensor_data(firebase_data)
+            # Nettoyer les anciennes données locales (en arrière-plan, par petits blocs)
+            if stats["sensor_data_synced"] > 0:
+                from core.retention import retention_worker
+                retention_worker.trigger()
             
+            logger.info(f"✅ Synchronisation terminée: {stats}, arriéré {self.backlog_size()}")
+            return {"success": True, "stats": stats, "backlog": dict(self.backlog)}
+        
         except Exception as e:
-            logger.error(f"❌ Erreur sync donnée unique: {e}")
-            return False
+            logger.error(f"❌ Erreur synchronisation: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            self.sync_in_progress = False
+    
+    def _backfill_start_ms(self) -> int:
+        """Premier envoi (aucun curseur): historique des SYNC_BACKFILL_HOURS dernières heures"""
+        return int((time.time() - config.firebase.SYNC_BACKFILL_HOURS * 3600) * 1000)
+    
+    def _sync_sensor_rows(self, stats: Dict[str, Any]):
+        """Un document par lecture (id = horodatage: un renvoi écrase au lieu de dupliquer)"""
+        after = db_manager.get_sync_cursor("sensor_readings")
+        if after is None:
+            after = self._backfill_start_ms()
+        
+        for data in db_manager.get_sensor_rows_after(after, limit=self.batch_size):
+            try:
+                # Convertir le format SQLite vers format Firebase
+                firebase_data = {
+                    "timestamp": data.timestamp,
+                    "soil_moisture": data.soil_moisture,
+                    "soil_is_dry": data.soil_is_dry,
+                    "water_level": data.water_level,
+                    "water_detected": data.water_detected,
+                    "rain_detected": data.rain_detected,
+                    "temperature": data.temperature,
+                    "air_humidity": data.air_humidity,
+                    "device_id": "raspberry_pi_irrigation",
+                    "sync_time": time.time()
+                }
+                
+                if not firebase_manager.save_sensor_data(firebase_data, doc_id=f"sensor_{data.id}"):
+                    stats["errors"] += 1
+                    break
+                stats["sensor_data_synced"] += 1
+                after = data.id
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"❌ Erreur sync données capteur: {e}")
+                break
+        
+        # Curseur avancé jusqu'à la dernière lecture envoyée (ordre conservé)
+        db_manager.set_sync_cursor("sensor_readings", after)
+    
+    def _sync_sensor_chunks(self, stats: Dict[str, Any]):
+        """
+        Réécrit les documents horaires modifiés depuis le curseur (heures complètes lues dans
+        la base locale), au plus SYNC_BATCH_SIZE heures par passe; une heure dont l'envoi
+        échoue reste à réécrire
+        """
+        now_ms = int(time.time() * 1000)
+        start_ms = db_manager.get_sync_cursor("sensor_chunks")
+        if start_ms is None:
+            start_ms = sensor_chunks.hour_of(self._backfill_start_ms())
+        end_ms = min(now_ms + 1000, start_ms + self.batch_size * sensor_chunks.HOUR_MS)
+        rows = db_manager.get_sensor_rows(start_ms / 1000, end_ms / 1000)
+        
+        failed = []
+        for hour_ms, hour_rows in sensor_chunks.group_by_hour(rows).items():
+            key = (hour_rows[0].device_id, hour_ms)
+            if self._chunk_counts.get(key) == len(hour_rows):
+                continue
+            if firebase_manager.save_sensor_chunk(*key, hour_rows):
+                self._chunk_counts[key] = len(hour_rows)
+                stats["sensor_chunks_synced"] += 1
+                stats["sensor_data_synced"] += len(hour_rows)
+            else:
+                stats["errors"] += 1
+                failed.append(hour_ms)
+        
+        # Heure en cours toujours réécrite à la passe suivante
+        watermark = min(failed, default=sensor_chunks.hour_of(min(end_ms, now_ms)))
+        db_manager.set_sync_cursor("sensor_chunks", watermark)
+        # Heures closes et envoyées: compteurs inutiles
+        self._chunk_counts = {key: count for key, count in self._chunk_counts.items()
+                              if key[1] >= watermark}
+    
+    def _sync_irrigation_events(self, stats: Dict[str, Any]):
+        """Événements postérieurs au curseur (id), document nommé par l'id local"""
+        after = db_manager.get_sync_cursor("irrigation_events")
+        if after is None:
+            recent = db_manager.get_recent_irrigation_events(hours=config.firebase.SYNC_BACKFILL_HOURS)
+            if not recent:
+                return
+            after = recent[-1].id - 1
+        
+        for event in db_manager.get_irrigation_events_after(after, limit=self.batch_size):
+            try:
+                if not firebase_manager.save_irrigation_event(
+                    duration=event.duration,
+                    reason=event.reason,
+                    triggered_by=event.triggered_by,
+                    doc_id=f"irrigation_{event.id}"
+                ):
+                    stats["errors"] += 1
+                    break
+                stats["irrigation_events_synced"] += 1
+                after = event.id
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"❌ Erreur sync irrigation: {e}")
+                break
+        
+        db_manager.set_sync_cursor("irrigation_events", after)
+    
+    def _sync_summaries(self, stats: Dict[str, Any]):
+        """Pousse les résumés modifiés; un jour envoyé est marqué (pushed_at = updated_at)"""
+        pushed = []
+        for doc_id, summary, rows in db_manager.get_unpushed_summaries():
+            if firebase_manager.save_daily_summary(doc_id, summary):
+                stats["summaries_synced"] += 1
+                pushed.extend(rows)
+            else:
+                stats["errors"] += 1
+        if pushed:
+            db_manager.mark_summaries_pushed(pushed)
+    
+    # === ARRIÉRÉ ===
+    
+    def _update_backlog(self, stats: Dict[str, Any], duration: float):
+        """Arriéré par flux après une passe, et débit de rattrapage mesuré"""
+        event_cursor = db_manager.get_sync_cursor("irrigation_events")
+        if self.packed:
+            # Lectures depuis le début de l'heure du curseur, moins celles déjà dans un document
+            watermark = db_manager.get_sync_cursor("sensor_chunks")
+            self.backlog = db_manager.count_sync_backlog(None if watermark is None else watermark - 1,
+                                                         event_cursor)
+            self.backlog["sensor_readings"] = max(0, self.backlog["sensor_readings"]
+                                                  - sum(self._chunk_counts.values()))
+        else:
+            self.backlog = db_manager.count_sync_backlog(db_manager.get_sync_cursor("sensor_readings"),
+                                                         event_cursor)
+        sent = stats["sensor_data_synced"] + stats["irrigation_events_synced"] + stats["summaries_synced"]
+        if sent and self.backlog_size() > 0:
+            rate = sent / (duration + self.batch_pause)
+            self.drain_rate = rate if not self.drain_rate else 0.7 * self.drain_rate + 0.3 * rate
+    
+    def backlog_size(self) -> int:
+        return sum(self.backlog.values())
+    
+    def drain_eta(self) -> Optional[float]:
+        """Secondes estimées pour vider l'arriéré (0 à jour, None sans mesure de débit)"""
+        size = self.backlog_size()
+        if size == 0:
+            return 0.0
+        if not self.drain_rate:
+            return None
+        return round(size / self.drain_rate, 1)
     
     def get_sync_status(self) -> Dict[str, Any]:
         """Retourne le statut de synchronisation"""
@@ -155,12 +362,20 @@ class SyncManager:
         
         return {
             "last_sync_time": self.last_sync_time,
+            "next_sync_time": self.next_sync_time,
             "sync_in_progress": self.sync_in_progress,
             "sync_interval": self.sync_interval,
+            "scheduler_running": self._thread is not None and self._thread.is_alive(),
+            "consecutive_failures": self.consecutive_failures,
+            "backlog": dict(self.backlog),
+            "backlog_size": self.backlog_size(),
+            "drain_rate": round(self.drain_rate, 2),
+            "drain_eta": self.drain_eta(),
+            "egress_level": egress_budget.level(),
             "firebase_connected": firebase_status["connected"],
-            "firebase_sync_count": firebase_status["sync_count"],
-            "firebase_error_count": firebase_status["error_count"]
+            "firebase_sync_count": firebase_status["stats"]["sync_count"],
+            "firebase_error_count": firebase_status["stats"]["error_count"]
         }
 
 # Instance globale
-sync_manager = SyncManager()
\ No newline at end of file
+sync_manager = SyncManager()
@@ -3,13 +3,14 @@ Logique de décision pour l'irrigation - VERSION FINALE
 """
 import time
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from config.settings import config
 from core.database_manager import db_manager
 from core.weather_api import weather_api
 from sensors.sensor_manager import sensor_manager
 from actuators.water_pump import water_pump
 from actuators.status_led import status_led
+from decision_engine.zones import zone_orchestrator
 
 logger = logging.getLogger(__name__)
 
@@ -24,29 +25,40 @@ class IrrigationLogic:
         
         logger.info("✅ Logique d'irrigation initialisée")
     
-    def check_system_health(self) -> Tuple[bool, str]:
+    def check_system_health(self, allow_busy: bool = False) -> Tuple[bool, str]:
         """
         Vérifie la santé globale du système
+        allow_busy: pompe / zones en cours tolérées (mise en file de zones supplémentaires)
         Returns: (système_sain, raison)
         """
         try:
             # Vérifier les capteurs
             health_report = sensor_manager.get_system_health_report()
             
+            # Une alerte par capteur: ouverte tant qu'il est en défaut, résolue ensuite
+            for name, status in health_report['sensors'].items():
+                if status['healthy']:
+                    db_manager.resolve_alert("SENSOR_ERROR", name)
+                else:
+                    db_manager.save_alert("SENSOR_ERROR", f"Capteur défaillant: {name} "
+                                          f"({status['error_count']} erreurs)", name)
+            
             if not health_report['all_healthy']:
                 failed_sensors = [name for name, status in health_report['sensors'].items() 
                                 if not status['healthy']]
                 error_msg = f"Capteurs défaillants: {', '.join(failed_sensors)}"
                 
-                # Enregistrer l'alerte
-                db_manager.save_alert("SENSOR_ERROR", error_msg)
-                
                 return False, error_msg
             
+            if allow_busy:
+                return True, "Système sain"
+            
             # Vérifier la pompe
             pump_status = water_pump.get_status()
             if pump_status.get('is_running', False):
                 return False, "Pompe déjà en fonctionnement"
+            if zone_orchestrator.is_busy():
+                return False, "Arrosage des zones en cours"
             
             return True, "Système sain"
             
@@ -107,6 +119,7 @@ class IrrigationLogic:
                     db_manager.save_alert("WATER_LOW", error_msg, "water")
                 else:
                     analysis["reasons"].append(f"Niveau d'eau OK ({water_percent}%)")
+                    db_manager.resolve_alert("WATER_LOW", "water")
             
             # 3. Pluie
             rain_data = sensors.get("rain", {})
@@ -314,6 +327,37 @@ class IrrigationLogic:
             status_led.set_system_state("ERROR")
             return False, f"Erreur: {str(e)}"
     
+    def water_garden(self, zones: Optional[List[str]] = None, only_dry: bool = False,
+                     duration: Optional[float] = None) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Arrosage des zones (toutes ou la liste donnée) par l'orchestrateur
+        Mêmes contrôles que l'irrigation manuelle; l'arrosage se poursuit en arrière-plan
+        """
+        try:
+            logger.info("🚰 Arrosage des zones demandé")
+            
+            # Zones déjà en cours: les nouvelles sont mises en file (capteurs toujours vérifiés)
+            system_healthy, health_reason = self.check_system_health(allow_busy=True)
+            if not system_healthy:
+                status_led.set_system_state("ERROR")
+                return False, f"Système défaillant: {health_reason}", {}
+            
+            water_data = sensor_manager.read_sensor("water")
+            if water_data and not water_data.get("water_detected", False):
+                status_led.set_system_state("NO_WATER")
+                return False, "Niveau d'eau insuffisant", {}
+            
+            plan = zone_orchestrator.water_garden(zones, only_dry=only_dry, duration=duration)
+            if not plan["queued"]:
+                return False, "Aucune zone à arroser", plan
+            
+            self.last_irrigation_time = time.time()
+            return True, f"{len(plan['queued'])} zone(s) en file", plan
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur arrosage des zones: {e}")
+            return False, f"Erreur: {str(e)}", {}
+    
     def get_system_status(self) -> Dict[str, Any]:
         """Retourne le statut complet du système"""
         sensor_status = sensor_manager.get_sensor_status()
@@ -337,6 +381,7 @@ class IrrigationLogic:
             },
             "sensors": sensor_status,
             "pump": pump_status,
+            "zones": zone_orchestrator.get_status(),
             "leds": led_status
         }
 
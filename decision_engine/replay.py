@@ -0,0 +1,399 @@
+"""
+Rejeu du moteur de décision sur l'historique enregistré ou sur un jardin simulé
+- lectures de sensor_samples (base SQLite ouverte en lecture seule), rééchantillonnées au pas
+  du cycle (CHECK_INTERVAL): l'enregistrement sur changement ne garde que les variations
+- ou générateur synthétique en boucle fermée: l'arrosage décidé humidifie le sol simulé
+- IrrigationLogic.make_decision / execute_decision réels; pompe, base, LEDs, capteurs, zones et
+  météo remplacés par des doublures, horloge virtuelle: aucune attente, vitesse maximale
+- rapport: décisions/s, eau utilisée, temps sous min_moisture, latence par étape
+
+Usage:
+    python -m decision_engine.replay --db data/irrigation.db --device raspberry_pi
+    python -m decision_engine.replay --synthetic --days 30 --flow 2.0
+"""
+import math
+import random
+import sqlite3
+import logging
+import argparse
+import time as _time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.settings import config
+from core.compact_schema import SENSOR_TABLE, select_columns, to_ms
+
+logger = logging.getLogger(__name__)
+
+FIELDS: Tuple[str, ...] = ("soil_moisture", "soil_is_dry", "water_level", "water_detected",
+                           "rain_detected", "temperature", "air_humidity")
+
+STAGES: Tuple[str, ...] = ("health", "analyze", "decide", "execute")
+
+Reading = Tuple[float, Dict[str, Any]]
+
+
+# === SOURCES ===
+
+def recorded_readings(db_path: str, device: Optional[str] = None, start: Any = None,
+                      end: Any = None) -> Iterator[Reading]:
+    """Lectures enregistrées d'un appareil, par ordre chronologique"""
+    device = device or config.persistence.DEVICE_ID
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(f"""
+            SELECT ts, {select_columns(FIELDS)}
+            FROM {SENSOR_TABLE}
+            WHERE device = (SELECT id FROM devices WHERE name = ?) AND ts >= ? AND ts < ?
+            ORDER BY ts
+        """, (device, to_ms(start) if start is not None else 0,
+              to_ms(end) if end is not None else 2 ** 62))
+        for row in cursor:
+            yield row[0] / 1000.0, dict(zip(FIELDS, row[1:]))
+    finally:
+        conn.close()
+
+
+def resample(readings: Iterable[Reading], step: float) -> Iterator[Reading]:
+    """Une lecture par pas (dernière valeur connue), comme les cycles de main.py"""
+    iterator = iter(readings)
+    try:
+        current_ts, current = next(iterator)
+    except StopIteration:
+        return
+    t = current_ts
+    for ts, values in iterator:
+        while t < ts:
+            yield t, current
+            t += step
+        current = values
+    yield t, current
+
+
+class SyntheticGarden:
+    """
+    Jardin simulé: séchage proportionnel à la température (évapotranspiration),
+    averses aléatoires, gain d'humidité par seconde d'arrosage, réservoir qui se vide
+    """
+
+    def __init__(self, days: float = 30.0, step: float = 300.0, moisture: float = 60.0,
+                 dry_rate: float = 0.35, gain_per_second: float = 0.25, tank_seconds: float = 3600.0,
+                 rain_per_day: float = 0.3, seed: int = 42, start: Optional[float] = None):
+        self.samples = int(days * 86400 / step)
+        self.step = step
+        self.moisture = moisture
+        self.dry_rate = dry_rate                # %/h à 20 °C
+        self.gain_per_second = gain_per_second  # %/s d'arrosage
+        self.tank_seconds = tank_seconds        # autonomie du réservoir (s de pompe)
+        self.pumped = 0.0
+        self.rain_per_day = rain_per_day
+        self.start = start if start is not None else float(int(_time.time() - days * 86400))
+        self._random = random.Random(seed)
+        self._rain_until = 0.0
+
+    def irrigate(self, seconds: float):
+        self.moisture = min(100.0, self.moisture + seconds * self.gain_per_second)
+        self.pumped += seconds
+
+    def __iter__(self) -> Iterator[Reading]:
+        for index in range(self.samples):
+            ts = self.start + index * self.step
+            hour = (ts % 86400) / 3600.0
+            temperature = 20.0 + 8.0 * math.sin((hour - 9.0) / 24.0 * 2 * math.pi) \
+                + self._random.gauss(0.0, 0.5)
+            air_humidity = max(20.0, min(100.0, 90.0 - 2.0 * (temperature - 12.0)))
+
+            if ts >= self._rain_until and \
+                    self._random.random() < self.rain_per_day * self.step / 86400:
+                self._rain_until = ts + self._random.uniform(1800, 4 * 3600)
+            raining = ts < self._rain_until
+
+            hours = self.step / 3600.0
+            if raining:
+                self.moisture = min(100.0, self.moisture + 3.0 * hours)
+            else:
+                self.moisture = max(0.0, self.moisture
+                                    - self.dry_rate * hours * max(0.2, temperature / 20.0))
+
+            water_level = max(0.0, 100.0 * (1.0 - self.pumped / self.tank_seconds))
+            yield ts, {
+                "soil_moisture": round(self.moisture, 2),
+                "soil_is_dry": self.moisture < config.plant.min_moisture,
+                "water_level": round(water_level, 1),
+                "water_detected": water_level > 0,
+                "rain_detected": raining,
+                "temperature": round(temperature, 2),
+                "air_humidity": round(air_humidity, 2),
+            }
+
+
+# === DOUBLURES ===
+
+class ReplayClock:
+    """Remplace le module time dans irrigation_logic (horloge virtuelle)"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+
+class ReplayPump:
+    def __init__(self, clock: ReplayClock, on_irrigate=None):
+        self.clock = clock
+        self.on_irrigate = on_irrigate
+        self.is_running = False
+        self.runs: List[Tuple[float, float]] = []
+
+    def start(self, duration: Optional[int] = None) -> bool:
+        duration = float(duration if duration is not None else config.irrigation.IRRIGATION_DURATION)
+        self.runs.append((self.clock.now, duration))
+        if self.on_irrigate is not None:
+            self.on_irrigate(duration)
+        return True
+
+    def stop(self) -> bool:
+        return True
+
+    def get_status(self) -> dict:
+        return {"is_running": False, "total_run_time": sum(d for _, d in self.runs)}
+
+
+class ReplayDB:
+    """Événements en mémoire; cumul quotidien sur l'horloge virtuelle"""
+
+    def __init__(self, clock: ReplayClock):
+        self.clock = clock
+        self.events: List[Dict[str, Any]] = []
+        self.alerts = 0
+
+    def save_irrigation_event(self, duration: float, reason: str, triggered_by: str = "auto",
+                              success: bool = True) -> bool:
+        self.events.append({"ts": self.clock.now, "duration": duration, "success": success})
+        return True
+
+    def get_today_irrigation_time(self) -> float:
+        day = int(self.clock.now // 86400)
+        return sum(e["duration"] for e in self.events
+                   if e["success"] and int(e["ts"] // 86400) == day)
+
+    def save_alert(self, *args, **kwargs) -> bool:
+        self.alerts += 1
+        return True
+
+    def resolve_alert(self, *args, **kwargs) -> bool:
+        return True
+
+
+class ReplaySensors:
+    def __init__(self):
+        self.last: Dict[str, Any] = {}
+
+    def get_system_health_report(self) -> Dict[str, Any]:
+        return {"all_healthy": True, "sensors": {}}
+
+    def read_sensor(self, name: str) -> Dict[str, Any]:
+        return self.last.get("sensors", {}).get(name, {})
+
+
+class _Idle:
+    """LEDs et zones: appels sans effet"""
+
+    def is_busy(self) -> bool:
+        return False
+
+    def __getattr__(self, item):
+        return lambda *args, **kwargs: None
+
+
+def sensor_data(ts: float, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Ligne enregistrée -> format de sensor_manager.read_all()"""
+    return {
+        "success": True,
+        "timestamp": ts,
+        "sensors": {
+            "soil": {"moisture_percent": values.get("soil_moisture") or 0.0,
+                     "is_dry": bool(values.get("soil_is_dry"))},
+            "water": {"water_percent": values.get("water_level") or 0.0,
+                      "water_detected": bool(values.get("water_detected"))},
+            "rain": {"rain_detected": bool(values.get("rain_detected"))},
+            "dht22": {"temperature": values.get("temperature"),
+                      "humidity": values.get("air_humidity")},
+        },
+    }
+
+
+@contextmanager
+def _patched(module, **replacements):
+    saved = {name: getattr(module, name) for name in replacements}
+    try:
+        for name, value in replacements.items():
+            setattr(module, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def _timed(latencies: List[float], function):
+    def wrapper(*args, **kwargs):
+        started = _time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            latencies.append(_time.perf_counter() - started)
+    return wrapper
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# === REJEU ===
+
+def run_replay(readings: Iterable[Reading], garden: Optional[SyntheticGarden] = None,
+               flow_lpm: float = 0.0, min_moisture: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Rejoue les lectures dans une IrrigationLogic neuve
+    garden: boucle fermée (l'arrosage modifie les lectures suivantes)
+    """
+    from decision_engine import irrigation_logic as logic_module
+
+    min_moisture = config.plant.min_moisture if min_moisture is None else min_moisture
+    clock = ReplayClock()
+    pump = ReplayPump(clock, garden.irrigate if garden is not None else None)
+    db = ReplayDB(clock)
+    sensors = ReplaySensors()
+    idle = _Idle()
+
+    latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    decisions: Dict[str, int] = {}
+    below_seconds = 0.0
+    longest_dry = 0.0
+    dry_since: Optional[float] = None
+    response_delays: List[float] = []
+    previous: Optional[Reading] = None
+    first_ts = last_ts = None
+    count = 0
+
+    logic_logger = logging.getLogger(logic_module.__name__)
+    saved_level = logic_logger.level
+    logic_logger.setLevel(logging.WARNING)
+
+    with _patched(logic_module, time=clock, db_manager=db, water_pump=pump, sensor_manager=sensors,
+                  status_led=idle, zone_orchestrator=idle, weather_api=None):
+        logic = logic_module.IrrigationLogic()
+        logic.check_system_health = _timed(latencies["health"], logic.check_system_health)
+        logic.analyze_sensor_data = _timed(latencies["analyze"], logic.analyze_sensor_data)
+        make_decision = _timed(latencies["decide"], logic.make_decision)
+        execute_decision = _timed(latencies["execute"], logic.execute_decision)
+
+        started = _time.perf_counter()
+        try:
+            for ts, values in readings:
+                clock.now = ts
+                first_ts = ts if first_ts is None else first_ts
+                last_ts = ts
+                count += 1
+
+                # Temps sous le minimum (valeur tenue jusqu'à la lecture suivante)
+                if previous is not None and (previous[1].get("soil_moisture") or 0.0) < min_moisture:
+                    below_seconds += ts - previous[0]
+                moisture = values.get("soil_moisture") or 0.0
+                if moisture < min_moisture:
+                    dry_since = ts if dry_since is None else dry_since
+                    longest_dry = max(longest_dry, ts - dry_since)
+                else:
+                    dry_since = None
+
+                data = sensor_data(ts, values)
+                sensors.last = data
+                should_irrigate, reason, analysis = make_decision(data)
+                decision = analysis.get("final_decision", "HEALTH") if analysis else "HEALTH"
+                decisions[decision] = decisions.get(decision, 0) + 1
+                if execute_decision(should_irrigate, reason, analysis) and dry_since is not None:
+                    response_delays.append(ts - dry_since)
+                previous = (ts, values)
+        finally:
+            elapsed = _time.perf_counter() - started
+            logic_logger.setLevel(saved_level)
+
+    engine_seconds = sum(latencies["decide"]) + sum(latencies["execute"])
+    water_seconds = sum(duration for _, duration in pump.runs)
+    span = (last_ts - first_ts) if count > 1 else 0.0
+    return {
+        "readings": count,
+        "span_hours": round(span / 3600.0, 1),
+        "elapsed": round(elapsed, 3),
+        "decisions_per_second": round(count / engine_seconds, 1) if engine_seconds else 0.0,
+        "wall_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+        "decisions": decisions,
+        "irrigations": len(pump.runs),
+        "water_seconds": round(water_seconds, 1),
+        "water_liters": round(water_seconds / 60.0 * flow_lpm, 2) if flow_lpm else None,
+        "min_moisture": min_moisture,
+        "below_min_hours": round(below_seconds / 3600.0, 2),
+        "below_min_ratio": round(below_seconds / span, 4) if span else 0.0,
+        "longest_dry_hours": round(longest_dry / 3600.0, 2),
+        "mean_response_minutes": round(sum(response_delays) / len(response_delays) / 60.0, 1)
+        if response_delays else None,
+        "alerts": db.alerts,
+        "latency_us": {
+            stage: {"p50": round(_percentile(values, 50) * 1e6, 1),
+                    "p99": round(_percentile(values, 99) * 1e6, 1),
+                    "max": round(max(values) * 1e6, 1) if values else 0.0}
+            for stage, values in latencies.items()
+        },
+    }
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    water = f"{results['water_seconds']}s"
+    if results["water_liters"] is not None:
+        water += f" ({results['water_liters']} L)"
+    lines = [
+        f"🔁 {results['readings']} décisions sur {results['span_hours']} h en {results['elapsed']}s "
+        f"| ⚡ {results['decisions_per_second']} décisions/s (moteur), {results['wall_per_second']}/s (total)",
+        f"🚰 {results['irrigations']} arrosages, eau {water} | décisions {results['decisions']}",
+        f"🌵 sous {results['min_moisture']}%: {results['below_min_hours']} h "
+        f"({results['below_min_ratio'] * 100:.1f}%), plus longue période {results['longest_dry_hours']} h, "
+        f"réaction moyenne {results['mean_response_minutes']} min",
+        f"{'étape':<10}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>10}",
+    ]
+    for stage, stats in results["latency_us"].items():
+        lines.append(f"{stage:<10}{stats['p50']:>10}{stats['p99']:>10}{stats['max']:>10}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu et banc de mesure du moteur de décision")
+    parser.add_argument("--db", default=None, help="base SQLite enregistrée (lecture seule)")
+    parser.add_argument("--device", default=None, help="appareil rejoué (appareil local par défaut)")
+    parser.add_argument("--start", default=None, help="début (epoch ou 'YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--step", type=float, default=float(config.irrigation.CHECK_INTERVAL),
+                        help="pas des décisions en s (0: une décision par ligne enregistrée)")
+    parser.add_argument("--synthetic", action="store_true", help="jardin simulé en boucle fermée")
+    parser.add_argument("--days", type=float, default=30.0, help="durée simulée (--synthetic)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--flow", type=float, default=0.0, help="débit de la pompe en L/min")
+    args = parser.parse_args()
+
+    if args.synthetic or not args.db:
+        garden = SyntheticGarden(days=args.days, step=args.step or 300.0, seed=args.seed)
+        results = run_replay(garden, garden=garden, flow_lpm=args.flow)
+    else:
+        readings = recorded_readings(args.db, args.device, args.start, args.end)
+        if args.step > 0:
+            readings = resample(readings, args.step)
+        results = run_replay(readings, flow_lpm=args.flow)
+    print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
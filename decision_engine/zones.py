@@ -0,0 +1,485 @@
+"""
+Arrosage multi-zones: registre des zones et orchestrateur pompe / électrovannes
+- ZoneRegistry: zones de config.zones liées à un profil de plante, une vanne et un appareil de mesure
+- ZoneOrchestrator: file des demandes, au plus MAX_OPEN_VALVES vannes ouvertes (pression et
+  alimentation de la pompe), la zone la plus sèche d'abord, l'attente augmente la priorité
+- Mises sous tension (vannes, pompe) espacées de SWITCH_ON_INTERVAL: pas d'appels de courant
+  simultanés (chute de tension); la pompe démarre après la première vanne et s'arrête avant la
+  dernière (jamais de pompe sur circuit fermé)
+- Arrosage par tranches de MAX_RUN_SLICE: une longue demande rend sa vanne et repasse dans la
+  file; les vannes libres sont réattribuées aussitôt, le jardin entier se termine au plus tôt
+"""
+import time
+import heapq
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.plant_profiles import PLANT_PROFILES, PlantProfile, get_plant_profile
+from core.startup import LazyInstance
+
+logger = logging.getLogger(__name__)
+
+# Tranche d'arrosage minimale (s); la dernière tranche d'une demande peut être plus courte
+MIN_SLICE = 1.0
+
+# Attente quand la pompe est utilisée hors orchestrateur (irrigation simple zone)
+FOREIGN_PUMP_RETRY = 1.0
+
+
+@dataclass
+class Zone:
+    name: str
+    pin: int
+    profile_key: str
+    profile: PlantProfile
+    device: str
+    duration: int
+
+
+class ZoneRegistry:
+    """Zones configurées (config.zones + config.gpio.ZONE_VALVE_PINS)"""
+
+    def __init__(self, zones: Dict[str, Tuple[str, str, int]], valve_pins: Dict[str, int],
+                 default_device: str, default_duration: int):
+        self._zones: Dict[str, Zone] = {}
+        for name, (profile_key, device, duration) in zones.items():
+            pin = valve_pins.get(name)
+            if pin is None:
+                logger.warning(f"⚠️ Zone {name} sans électrovanne (ZONE_VALVE_PINS), ignorée")
+                continue
+            if profile_key.lower() not in PLANT_PROFILES:
+                logger.warning(f"⚠️ Zone {name}: profil inconnu '{profile_key}', profil par défaut")
+            self._zones[name] = Zone(
+                name=name,
+                pin=pin,
+                profile_key=profile_key.lower(),
+                profile=get_plant_profile(profile_key),
+                device=device or default_device,
+                duration=int(duration or default_duration),
+            )
+
+    def get(self, name: str) -> Optional[Zone]:
+        return self._zones.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._zones)
+
+    def all(self) -> List[Zone]:
+        return list(self._zones.values())
+
+    def latest_moisture(self, zone: Zone) -> Optional[float]:
+        """Dernière humidité enregistrée pour l'appareil de la zone"""
+        from core.database_manager import db_manager
+        rows = db_manager.get_recent_sensor_data(limit=1, device=zone.device)
+        if not rows or rows[0].soil_moisture is None:
+            return None
+        return float(rows[0].soil_moisture)
+
+    @staticmethod
+    def deficit(zone: Zone, moisture: Optional[float]) -> float:
+        """Points d'humidité sous l'optimum du profil (0 si inconnu ou assez humide)"""
+        if moisture is None:
+            return 0.0
+        return max(0.0, zone.profile.optimal_moisture - moisture)
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": zone.name,
+                "pin": zone.pin,
+                "plant": zone.profile_key,
+                "plant_name": zone.profile.name,
+                "min_moisture": zone.profile.min_moisture,
+                "optimal_moisture": zone.profile.optimal_moisture,
+                "device": zone.device,
+                "duration": zone.duration,
+            }
+            for zone in self._zones.values()
+        ]
+
+
+@dataclass
+class ZoneRequest:
+    zone: str
+    duration: float           # durée demandée (s)
+    remaining: float          # reste à arroser (s)
+    deficit: float
+    reason: str
+    triggered_by: str
+    queued_at: float          # dernière mise en file (équité)
+    watered: float = 0.0      # arrosé jusqu'ici (s)
+
+
+@dataclass
+class _Run:
+    request: ZoneRequest
+    slice: float
+    opened_at: float
+    started_at: Optional[float] = None    # eau effective: pompe en marche
+
+
+def estimate_wall_time(durations: Iterable[float], max_open: int, switch_interval: float) -> float:
+    """Durée totale estimée: vannes réattribuées dès qu'elles se libèrent, mises sous tension espacées"""
+    slots = [0.0] * max(1, max_open)
+    last_switch = -switch_interval
+    end = 0.0
+    for duration in sorted(durations, reverse=True):
+        free = heapq.heappop(slots)
+        start = max(free, last_switch + switch_interval)
+        last_switch = start
+        heapq.heappush(slots, start + duration)
+        end = max(end, start + duration)
+    return end
+
+
+class ZoneOrchestrator:
+    """File d'arrosage des zones, exécutée par un thread unique (aucun sleep bloquant)"""
+
+    def __init__(self, registry: ZoneRegistry, valves, pump, db, max_open: int = 2,
+                 switch_interval: float = 2.0, max_slice: float = 60.0,
+                 aging_per_minute: float = 1.0, max_duration: float = 300.0):
+        self.registry = registry
+        self.valves = valves
+        self.pump = pump
+        self.db = db
+        self.max_open = max(1, max_open)
+        self.switch_interval = switch_interval
+        self.max_slice = max(MIN_SLICE, max_slice)
+        self.aging_per_minute = aging_per_minute
+        self.max_duration = max_duration
+
+        self._queue: Dict[str, ZoneRequest] = {}
+        self._running: Dict[str, _Run] = {}
+        self._pump_on = False
+        self._next_switch_on = 0.0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._active = False
+
+        self.stats = {"requests": 0, "completed": 0, "cancelled": 0, "slices": 0,
+                      "handovers": 0, "pump_starts": 0, "errors": 0}
+
+    # === API PUBLIQUE ===
+
+    def request(self, zone_name: str, duration: Optional[float] = None,
+                moisture: Optional[float] = None, reason: str = "",
+                triggered_by: str = "auto") -> Tuple[bool, str]:
+        """Met une zone en file; humidité lue en base si non fournie"""
+        zone = self.registry.get(zone_name)
+        if zone is None:
+            return False, f"Zone inconnue: {zone_name}"
+        duration = float(duration if duration is not None else zone.duration)
+        if not 0 < duration <= self.max_duration:
+            return False, f"Durée invalide ({duration}s, max {self.max_duration}s)"
+        if moisture is None:
+            moisture = self.registry.latest_moisture(zone)
+        deficit = self.registry.deficit(zone, moisture)
+
+        with self._cond:
+            if zone_name in self._queue or zone_name in self._running:
+                return False, f"Zone {zone_name} déjà en file ou en cours"
+            self._queue[zone_name] = ZoneRequest(
+                zone=zone_name, duration=duration, remaining=duration, deficit=deficit,
+                reason=reason or "Demande", triggered_by=triggered_by, queued_at=time.time())
+            self.stats["requests"] += 1
+            self._active = True
+            self._ensure_thread()
+            self._cond.notify()
+
+        logger.info(f"🗂️ Zone {zone_name} en file: {duration:.0f}s (déficit {deficit:.1f} pts)")
+        return True, f"Zone {zone_name} en file"
+
+    def water_garden(self, zones: Optional[Iterable[str]] = None, only_dry: bool = False,
+                     duration: Optional[float] = None,
+                     triggered_by: str = "manual") -> Dict[str, Any]:
+        """Toutes les zones (ou la liste donnée); only_dry: seulement sous le minimum du profil"""
+        queued, skipped = [], {}
+        for name in (list(zones) if zones is not None else self.registry.names()):
+            zone = self.registry.get(name)
+            moisture = self.registry.latest_moisture(zone) if zone is not None else None
+            if zone is not None and only_dry and moisture is not None \
+                    and moisture >= zone.profile.min_moisture:
+                skipped[name] = f"Humidité OK ({moisture:.0f}% >= {zone.profile.min_moisture:.0f}%)"
+                continue
+            reason = "Arrosage du jardin" if moisture is None else f"Arrosage du jardin ({moisture:.0f}%)"
+            ok, message = self.request(name, duration=duration, moisture=moisture,
+                                       reason=reason, triggered_by=triggered_by)
+            if ok:
+                queued.append(name)
+            else:
+                skipped[name] = message
+
+        with self._cond:
+            remaining = self._remaining_work()
+        return {
+            "queued": queued,
+            "skipped": skipped,
+            "estimated_seconds": round(estimate_wall_time(
+                remaining, self.max_open, self.switch_interval), 1),
+        }
+
+    def cancel(self, zone_name: Optional[str] = None) -> int:
+        """Annule une zone (ou toutes): retirée de la file, vanne fermée si ouverte"""
+        events = []
+        with self._cond:
+            names = [zone_name] if zone_name else list(self._queue) + list(self._running)
+            for name in names:
+                request = self._queue.pop(name, None)
+                if request is not None:
+                    events.append((request, False))
+                elif name in self._running:
+                    run = self._running[name]
+                    self._close(name, time.time())
+                    events.append((run.request, False))
+            self.stats["cancelled"] += len(events)
+            self._cond.notify()
+        self._record(events)
+        return len(events)
+
+    def stop(self, timeout: float = 5.0):
+        """Arrêt: file vidée, vannes fermées, pompe arrêtée"""
+        self.cancel()
+        with self._cond:
+            self._active = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._pump_on:
+            self.pump.stop()
+            self._pump_on = False
+        self.valves.close_all()
+
+    def is_busy(self) -> bool:
+        with self._cond:
+            return bool(self._queue or self._running)
+
+    def get_status(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._cond:
+            running = {
+                name: {
+                    "watered": round(run.request.watered + self._elapsed(run, now), 1),
+                    "remaining": round(run.request.remaining - self._elapsed(run, now), 1),
+                    "slice_left": round(run.slice - self._elapsed(run, now), 1),
+                    "water_flowing": run.started_at is not None,
+                }
+                for name, run in self._running.items()
+            }
+            queue = [
+                {"zone": request.zone, "remaining": round(request.remaining, 1),
+                 "deficit": round(request.deficit, 1),
+                 "priority": round(self._priority(request, now), 1),
+                 "waiting": round(now - request.queued_at, 1)}
+                for request in sorted(self._queue.values(),
+                                      key=lambda r: self._priority(r, now), reverse=True)
+            ]
+            remaining = self._remaining_work(now)
+            return {
+                "zones": self.registry.to_dict(),
+                "running": running,
+                "queue": queue,
+                "pump_on": self._pump_on,
+                "max_open_valves": self.max_open,
+                "estimated_seconds": round(estimate_wall_time(
+                    remaining, self.max_open, self.switch_interval), 1),
+                "valves": self.valves.get_status(),
+                "stats": dict(self.stats),
+            }
+
+    # === INTERNE ===
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="ZoneOrchestrator")
+            self._thread.start()
+
+    def _priority(self, request: ZoneRequest, now: float) -> float:
+        """Zone la plus sèche d'abord; l'attente fait monter les autres (pas de famine)"""
+        return request.deficit + self.aging_per_minute * (now - request.queued_at) / 60.0
+
+    @staticmethod
+    def _elapsed(run: _Run, now: float) -> float:
+        return max(0.0, now - run.started_at) if run.started_at is not None else 0.0
+
+    def _remaining_work(self, now: Optional[float] = None) -> List[float]:
+        now = now or time.time()
+        work = [request.remaining for request in self._queue.values()]
+        work += [run.request.remaining - self._elapsed(run, now) for run in self._running.values()]
+        return [seconds for seconds in work if seconds > 0]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._active:
+                    return
+                wait, events = self._step(time.time())
+                if events:
+                    # Écriture en base hors verrou
+                    self._cond.release()
+                    try:
+                        self._record(events)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                if wait is None:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(max(0.0, wait))
+
+    def _step(self, now: float) -> Tuple[Optional[float], List[Tuple[ZoneRequest, bool]]]:
+        """Une passe: fins de tranche, démarrage pompe, ouvertures; (attente, événements)"""
+        events: List[Tuple[ZoneRequest, bool]] = []
+
+        # 1. Fins de tranche (la dernière vanne passe directement à la zone suivante si possible)
+        for name, run in list(self._running.items()):
+            if run.started_at is None or now < run.started_at + run.slice:
+                continue
+            request = run.request
+            request.remaining -= run.slice
+            self.stats["slices"] += 1
+            # Dernière tranche = reste exact (min(max_slice, remaining)): terminé à 0, rien d'ignoré
+            done = request.remaining <= 0
+            if done:
+                events.append((request, True))
+                self.stats["completed"] += 1
+            else:
+                request.queued_at = now
+                self._queue[name] = request
+                if self._best(now) == name:
+                    # Toujours prioritaire: la vanne reste ouverte pour la tranche suivante
+                    del self._queue[name]
+                    request.watered += run.slice
+                    run.slice = min(self.max_slice, request.remaining)
+                    run.started_at = now
+                    continue
+            if not self._handover(name, now):
+                self._close(name, now)
+
+        # 2. Pompe: après l'ouverture d'une vanne, à distance de la mise sous tension précédente
+        if self._running and not self._pump_on and now >= self._next_switch_on:
+            if self.pump.is_running:
+                return FOREIGN_PUMP_RETRY, events
+            if self.pump.start(0):
+                self._pump_on = True
+                self.stats["pump_starts"] += 1
+                self._next_switch_on = now + self.switch_interval
+                for run in self._running.values():
+                    if run.started_at is None:
+                        run.started_at = now
+            else:
+                self.stats["errors"] += 1
+                self._abort(now, events)
+                return None, events
+
+        # 3. Ouverture d'une vanne libre pour la zone prioritaire
+        if self._queue and len(self._running) < self.max_open and now >= self._next_switch_on:
+            if self.pump.is_running and not self._pump_on:
+                return FOREIGN_PUMP_RETRY, events
+            self._open(self._pop_best(now), now, events)
+
+        # Prochain réveil: fin de tranche ou prochaine mise sous tension possible
+        deadlines = [run.started_at + run.slice for run in self._running.values()
+                     if run.started_at is not None]
+        pending_switch = (self._running and not self._pump_on) or \
+                         (self._queue and len(self._running) < self.max_open)
+        if pending_switch:
+            deadlines.append(self._next_switch_on)
+        if not deadlines:
+            return None, events
+        return min(deadlines) - now, events
+
+    def _best(self, now: float) -> str:
+        return max(self._queue, key=lambda zone: self._priority(self._queue[zone], now))
+
+    def _pop_best(self, now: float) -> ZoneRequest:
+        return self._queue.pop(self._best(now))
+
+    def _open(self, request: ZoneRequest, now: float, events: List[Tuple[ZoneRequest, bool]]):
+        if not self.valves.open(request.zone):
+            self.stats["errors"] += 1
+            events.append((request, False))
+            return
+        self._start_run(request, now)
+        self._next_switch_on = now + self.switch_interval
+        logger.info(f"🚿 Zone {request.zone}: vanne ouverte ({len(self._running)}/{self.max_open})")
+
+    def _start_run(self, request: ZoneRequest, now: float):
+        self._running[request.zone] = _Run(
+            request=request, slice=min(self.max_slice, request.remaining), opened_at=now,
+            started_at=now if self._pump_on else None)
+
+    def _handover(self, name: str, now: float) -> bool:
+        """Dernière vanne ouverte: bascule sur la zone suivante sans arrêter la pompe"""
+        if len(self._running) != 1 or not self._queue or not self._pump_on \
+                or now < self._next_switch_on:
+            return False
+        request = self._pop_best(now)
+        if not self.valves.switch(open_zones=[request.zone], close_zones=[name]):
+            self._queue[request.zone] = request
+            return False
+        self._account(name, now)
+        self._start_run(request, now)
+        self._next_switch_on = now + self.switch_interval
+        self.stats["handovers"] += 1
+        logger.info(f"🔀 Vanne {name} -> {request.zone} (pompe maintenue)")
+        return True
+
+    def _close(self, name: str, now: float):
+        """Ferme une vanne; la pompe s'arrête d'abord si c'était la dernière ouverte"""
+        if len(self._running) == 1 and self._pump_on:
+            self.pump.stop()
+            self._pump_on = False
+        self.valves.close(name)
+        self._account(name, now)
+        logger.info(f"✅ Zone {name}: vanne fermée")
+
+    def _account(self, name: str, now: float):
+        run = self._running.pop(name)
+        run.request.watered += min(run.slice, self._elapsed(run, now))
+
+    def _abort(self, now: float, events: List[Tuple[ZoneRequest, bool]]):
+        """Pompe indisponible: vannes refermées, demandes en cours abandonnées"""
+        logger.error("❌ Démarrage pompe impossible, arrosage des zones interrompu")
+        for name in list(self._running):
+            events.append((self._running[name].request, False))
+            self._close(name, now)
+
+    def _record(self, events: List[Tuple[ZoneRequest, bool]]):
+        for request, success in events:
+            watered = round(request.watered, 1)
+            if not watered and not success:
+                continue
+            try:
+                self.db.save_irrigation_event(
+                    duration=watered,
+                    reason=f"Zone {request.zone}: {request.reason}",
+                    triggered_by=request.triggered_by,
+                    success=success
+                )
+            except Exception as e:
+                logger.error(f"❌ Erreur sauvegarde arrosage zone {request.zone}: {e}")
+
+
+def _create_orchestrator() -> ZoneOrchestrator:
+    from config.settings import config
+    from core.database_manager import db_manager
+    from actuators.water_pump import water_pump
+    from actuators.zone_valves import zone_valves
+
+    settings = config.zones
+    registry = ZoneRegistry(settings.zones, config.gpio.ZONE_VALVE_PINS,
+                            default_device=config.persistence.DEVICE_ID,
+                            default_duration=config.irrigation.IRRIGATION_DURATION)
+    return ZoneOrchestrator(registry, zone_valves, water_pump, db_manager,
+                            max_open=settings.MAX_OPEN_VALVES,
+                            switch_interval=settings.SWITCH_ON_INTERVAL,
+                            max_slice=settings.MAX_RUN_SLICE,
+                            aging_per_minute=settings.AGING_PER_MINUTE,
+                            max_duration=config.irrigation.MAX_IRRIGATION_PER_DAY)
+
+
+# Instance globale
+zone_orchestrator = LazyInstance(_create_orchestrator, "zone_orchestrator")
@@ -5,8 +5,12 @@ import os
 import json
 import time
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from core.startup import LazyInstance
+from config.settings import config
+from core.egress import egress_budget, json_size
+from firebase import sensor_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -120,6 +124,7 @@ class FirebaseManager:
             
             # Lire
             doc = test_ref.get()
+            egress_budget.record("firebase", json_size(test_data), json_size(test_data), requests=2)
             
             if doc.exists:
                 logger.info("✅ Connexion Firebase testée avec succès")
@@ -135,8 +140,8 @@ class FirebaseManager:
             self.stats["last_error"] = str(e)
             return False
     
-    def save_sensor_data(self, sensor_data: Dict[str, Any]) -> bool:
-        """Sauvegarde les données des capteurs dans Firebase"""
+    def save_sensor_data(self, sensor_data: Dict[str, Any], doc_id: Optional[str] = None) -> bool:
+        """Sauvegarde les données des capteurs dans Firebase (doc_id stable: renvoi sans doublon)"""
         if not self.connected or not self.db:
             return False
         
@@ -153,9 +158,10 @@ class FirebaseManager:
             }
             
             # Ajouter à Firestore avec ID unique basé sur le timestamp
-            doc_id = f"sensor_{int(time.time() * 1000)}"
+            doc_id = doc_id or f"sensor_{int(time.time() * 1000)}"
             doc_ref = self.db.collection("sensor_readings").document(doc_id)
             doc_ref.set(data_to_save)
+            egress_budget.record("firebase", json_size(data_to_save))
             
             self.stats["sync_count"] += 1
             self.stats["last_success"] = time.time()
@@ -169,8 +175,80 @@ class FirebaseManager:
             self.stats["last_error"] = str(e)
             return False
     
+    def save_sensor_chunk(self, device: str, hour_ms: int, rows: List[Any]) -> bool:
+        """Réécrit le document d'une heure (tableaux parallèles, firebase/sensor_chunks.py)"""
+        if not self.connected or not self.db:
+            return False
+        
+        try:
+            doc = sensor_chunks.pack_hour(device, hour_ms, rows, {
+                "location": "home_garden",
+                "project": self.project_id,
+                "sync_timestamp": time.time()
+            })
+            doc_id = sensor_chunks.doc_id(device, hour_ms)
+            self.db.collection(config.firebase.COLLECTION_SENSOR_CHUNKS).document(doc_id).set(doc)
+            egress_budget.record("firebase", json_size(doc))
+        
+            self.stats["sync_count"] += 1
+            self.stats["last_success"] = time.time()
+        
+            logger.debug(f"📡 Bloc horaire synchronisé: {doc_id} ({len(rows)} lectures)")
+            return True
+        
+        except Exception as e:
+            logger.error(f"❌ Erreur synchronisation bloc horaire: {e}")
+            self.stats["error_count"] += 1
+            self.stats["last_error"] = str(e)
+            return False
+    
+    def save_daily_summary(self, doc_id: str, summary: Dict[str, Any]) -> bool:
+        """Écrit un résumé journalier / hebdomadaire calculé sur l'appareil (core/daily_summary.py)"""
+        if not self.connected or not self.db:
+            return False
+        
+        try:
+            data_to_save = {**summary, "project": self.project_id, "sync_timestamp": time.time()}
+            self.db.collection(config.firebase.COLLECTION_DAILY_SUMMARIES).document(doc_id).set(data_to_save)
+            egress_budget.record("firebase", json_size(data_to_save))
+            
+            self.stats["sync_count"] += 1
+            self.stats["last_success"] = time.time()
+            
+            logger.debug(f"📡 Résumé synchronisé: {doc_id}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur synchronisation résumé: {e}")
+            self.stats["error_count"] += 1
+            self.stats["last_error"] = str(e)
+            return False
+    
+    def read_sensor_chunks(self, device: str, start: float, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Lectures [start, end] (epoch s) depuis les documents horaires: une lecture Firestore
+        par heure (identifiants connus, pas de requête indexée)
+        """
+        if not self.connected or not self.db:
+            return []
+        
+        start_ms = int(start * 1000)
+        end_ms = int((end if end is not None else time.time()) * 1000)
+        collection = self.db.collection(config.firebase.COLLECTION_SENSOR_CHUNKS)
+        refs = [collection.document(sensor_chunks.doc_id(device, hour))
+                for hour in sensor_chunks.hours_between(start_ms, end_ms)]
+        
+        readings = []
+        for snapshot in self.db.get_all(refs):
+            if snapshot.exists:
+                egress_budget.record("firebase", 0, json_size(snapshot.to_dict()))
+                readings.extend(r for r in sensor_chunks.unpack_chunk(snapshot.to_dict())
+                                if start_ms <= r["timestamp"] <= end_ms)
+        readings.sort(key=lambda r: r["timestamp"])
+        return readings
+    
     def save_irrigation_event(self, duration: float, reason: str, 
-                            triggered_by: str = "auto") -> bool:
+                            triggered_by: str = "auto", doc_id: Optional[str] = None) -> bool:
         """Sauvegarde un événement d'irrigation"""
         if not self.connected or not self.db:
             return False
@@ -187,8 +265,9 @@ class FirebaseManager:
                 "sync_time": datetime.now().isoformat()
             }
             
-            doc_id = f"irrigation_{int(time.time() * 1000)}"
+            doc_id = doc_id or f"irrigation_{int(time.time() * 1000)}"
             self.db.collection("irrigation_events").document(doc_id).set(event_data)
+            egress_budget.record("firebase", json_size(event_data))
             
             self.stats["sync_count"] += 1
             logger.info(f"🚰 Événement irrigation synchronisé: {duration}s - {reason}")
@@ -217,5 +296,5 @@ class FirebaseManager:
             "last_error": self.stats["last_error"]
         }
 
-# Instance globale
-firebase_manager = FirebaseManager()
\ No newline at end of file
+# Instance globale (identifiants lus au premier accès)
+firebase_manager = LazyInstance(FirebaseManager, "firebase_manager")
\ No newline at end of file
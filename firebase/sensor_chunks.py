@@ -0,0 +1,79 @@
+"""
+Documents Firestore en colonnes: un document par appareil et par heure (collection sensor_chunks)
+- identifiant déterministe `{appareil}_{AAAAMMJJHH}` (UTC): réécrit en entier à chaque flush
+  depuis la base locale (source de vérité), aucune requête ni index nécessaire à la lecture
+- tableaux parallèles: `t` (décalage ms depuis le début de l'heure) + un tableau par champ;
+  métadonnées (appareil, lieu, projet) une seule fois par document
+- pas d'ArrayUnion: il supprime les valeurs en double et désalignerait les tableaux parallèles
+- taille: 3600 lectures x 8 tableaux ≈ 300 ko, sous la limite de 1 Mio par document;
+  exempter les champs tableaux de l'indexation (console Firestore) évite une entrée d'index
+  par valeur distincte
+
+Format lu par l'application mobile (unpack_chunk / FirebaseManager.read_sensor_chunks):
+    {"device_id", "hour_start" (epoch s), "count", "t": [ms...], "soil_moisture": [...], ...}
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Sequence
+
+FORMAT_VERSION = 1
+HOUR_MS = 3600 * 1000
+
+# Champs publiés (colonnes de SensorRow), dans l'ordre des tableaux
+VALUE_FIELDS = ("soil_moisture", "temperature", "air_humidity", "water_level")
+FLAG_FIELDS = ("soil_is_dry", "water_detected", "rain_detected")
+
+
+def hour_of(ts_ms: int) -> int:
+    """Début de l'heure (epoch ms) contenant ts_ms"""
+    return ts_ms - ts_ms % HOUR_MS
+
+
+def doc_id(device: str, hour_ms: int) -> str:
+    stamp = datetime.fromtimestamp(hour_ms / 1000, tz=timezone.utc).strftime("%Y%m%d%H")
+    return f"{device}_{stamp}"
+
+
+def group_by_hour(rows: Iterable[Any]) -> Dict[int, List[Any]]:
+    """Lignes (SensorRow, id = ts en ms) regroupées par heure, ordre chronologique conservé"""
+    hours: Dict[int, List[Any]] = {}
+    for row in rows:
+        hours.setdefault(hour_of(row.id), []).append(row)
+    return hours
+
+
+def pack_hour(device: str, hour_ms: int, rows: Sequence[Any], metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Document d'une heure: tableaux parallèles triés par horodatage"""
+    rows = sorted(rows, key=lambda row: row.id)
+    doc = {
+        "format": FORMAT_VERSION,
+        "device_id": device,
+        "hour": datetime.fromtimestamp(hour_ms / 1000, tz=timezone.utc).isoformat(),
+        "hour_start": hour_ms // 1000,
+        "count": len(rows),
+        "t": [row.id - hour_ms for row in rows],
+        **(metadata or {}),
+    }
+    for name in VALUE_FIELDS:
+        doc[name] = [getattr(row, name) for row in rows]
+    for name in FLAG_FIELDS:
+        doc[name] = [bool(getattr(row, name)) for row in rows]
+    return doc
+
+
+def unpack_chunk(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Document d'une heure -> lectures {timestamp (epoch ms), device_id, champs...}"""
+    start = doc["hour_start"] * 1000
+    fields = [name for name in VALUE_FIELDS + FLAG_FIELDS if name in doc]
+    columns = [doc[name] for name in fields]
+    readings = []
+    for i, offset in enumerate(doc.get("t", [])):
+        reading = {"timestamp": start + offset, "device_id": doc.get("device_id")}
+        for name, values in zip(fields, columns):
+            reading[name] = values[i]
+        readings.append(reading)
+    return readings
+
+
+def hours_between(start_ms: int, end_ms: int) -> List[int]:
+    """Heures (epoch ms) couvrant [start_ms, end_ms]"""
+    return list(range(hour_of(start_ms), hour_of(end_ms) + 1, HOUR_MS))
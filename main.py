@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 SYSTÈME D'IRRIGATION INTELLIGENT UNIFIÉ - Point d'entrée principal
-Inclut : Automatisation + API Flask dans un seul processus
+Inclut : Automatisation + API Flask (ce processus garde le GPIO; workers de production optionnels via IPC)
 """
 import time
 import logging
@@ -9,8 +9,6 @@ import sys
 import threading
 import os
 from datetime import datetime
-from flask import Flask, jsonify, request
-from flask_cors import CORS
 
 # Configuration logging
 logging.basicConfig(
@@ -74,144 +72,48 @@ class UnifiedIrrigationSystem:
             from config.settings import config
             self.config = config
             
-            logger.info("✅ Hardware initialisé")
+            # Les singletons ci-dessus sont paresseux: l'initialisation réelle
+            # (GPIO, capteurs, BD, réseau) se fait en parallèle en arrière-plan
+            from core.startup import startup_manager
+            self.startup = startup_manager.start()
+            
+            logger.info("✅ Hardware en cours d'initialisation (arrière-plan)")
             
         except Exception as e:
             logger.error(f"❌ Erreur initialisation hardware: {e}")
             raise
     
     def initialize_api(self):
-        """Initialise l'API Flask dans le même processus"""
+        """Prépare l'API: routes de web_server/api.py (fabrique unique), servies par run_api"""
         try:
-            self.app = Flask(__name__)
-            CORS(self.app)
-            
             # Données partagées (thread-safe)
             self.shared_data = {
                 'sensor_data': None,
-                'last_update': 0,
-                'system_status': {}
+                'last_update': 0
             }
             self.data_lock = threading.Lock()
             
-            # Définir les routes API
-            self.setup_api_routes()
-            
             logger.info("✅ API Flask initialisée")
             
         except Exception as e:
             logger.error(f"❌ Erreur initialisation API: {e}")
             raise
     
-    def setup_api_routes(self):
-        """Configure les routes de l'API"""
-        
-        @self.app.route('/api/test', methods=['GET'])
-        def test_api():
-            return jsonify({
-                "success": True,
-                "message": "Système d'irrigation unifié",
-                "timestamp": time.time(),
-                "mode": "unified"
-            })
-        
-        @self.app.route('/api/status', methods=['GET'])
-        def get_status():
-            with self.data_lock:
-                return jsonify({
-                    "success": True,
-                    "data": self.shared_data['system_status'],
-                    "timestamp": time.time()
-                })
-        
-        @self.app.route('/api/sensors', methods=['GET'])
-        def get_sensors():
-            with self.data_lock:
-                if self.shared_data['sensor_data']:
-                    return jsonify({
-                        "success": True,
-                        "sensors": self.shared_data['sensor_data'].get("sensors", {}),
-                        "timestamp": time.time()
-                    })
-                else:
-                    return jsonify({"success": False, "error": "Données non disponibles"}), 503
-        
-        @self.app.route('/api/control/pump', methods=['POST'])
-        def control_pump():
-            try:
-                data = request.get_json()
-                action = data.get('action', '').lower()
-                
-                if action == 'start':
-                    duration = data.get('duration', 30)
-                    success, message = self.irrigation_logic.manual_irrigation()
-                    
-                    if success:
-                        return jsonify({
-                            "success": True,
-                            "message": f"Pompe démarrée pour {duration}s"
-                        })
-                    else:
-                        return jsonify({"success": False, "error": message}), 400
-                        
-                elif action == 'stop':
-                    self.water_pump.stop()
-                    return jsonify({"success": True, "message": "Pompe arrêtée"})
-                    
-                else:
-                    return jsonify({"success": False, "error": "Action invalide"}), 400
-                    
-            except Exception as e:
-                logger.error(f"❌ Erreur contrôle pompe: {e}")
-                return jsonify({"success": False, "error": str(e)}), 500
-        
-        # Route pour les plantes
-        @self.app.route('/api/plants', methods=['GET'])
-        def get_plants():
-            try:
-                from config.plant_profiles import PLANT_PROFILES
-                plants = []
-                for key, profile in PLANT_PROFILES.items():
-                    plants.append({
-                        "id": key,
-                        "name": profile.name,
-                        "min_moisture": profile.min_moisture,
-                        "optimal_moisture": profile.optimal_moisture,
-                        "max_moisture": profile.max_moisture,
-                        "water_needs": profile.water_needs,
-                        "description": profile.description
-                    })
-                return jsonify({"success": True, "plants": plants})
-            except Exception as e:
-                return jsonify({"success": False, "error": str(e)}), 500
-        
-        # Route pour le diagnostic
-        @self.app.route('/api/diagnostic', methods=['GET'])
-        def diagnostic():
-            diagnostic_data = {
-                "timestamp": time.time(),
-                "endpoints": [
-                    {"path": "/api/test", "method": "GET", "description": "Test API"},
-                    {"path": "/api/status", "method": "GET", "description": "Statut système"},
-                    {"path": "/api/sensors", "method": "GET", "description": "Données capteurs"},
-                    {"path": "/api/control/pump", "method": "POST", "description": "Contrôle pompe"},
-                    {"path": "/api/plants", "method": "GET", "description": "Liste plantes"}
-                ]
-            }
-            return jsonify({"success": True, "diagnostic": diagnostic_data})
+    def _api_snapshot(self):
+        """Dernière lecture capteurs du cycle: l'API ne relit pas le GPIO à chaque requête"""
+        with self.data_lock:
+            return self.shared_data['sensor_data']
     
-    def run_api(self, host='0.0.0.0', port=5000):
-        """Exécute l'API Flask"""
+    def run_api(self, host=None, port=None):
+        """Exécute l'API (mode dev, waitress ou gunicorn selon config.api.SERVER_MODE)"""
+        from web_server.serve import serve
+        
+        host = host or self.config.api.SERVER_HOST
+        port = port or self.config.api.SERVER_PORT
         logger.info(f"🌐 Démarrage API sur {host}:{port}")
         
-        # Désactiver le reloader pour éviter les problèmes de threads
-        self.app.run(
-            host=host, 
-            port=port, 
-            debug=False, 
-            threaded=True, 
-            use_reloader=False
-        )
+        # Ce processus reste propriétaire du GPIO dans tous les modes
+        serve(host=host, port=port, snapshot_provider=self._api_snapshot)
     
     def run_cycle(self):
         """Exécute un cycle complet de surveillance"""
@@ -233,48 +135,17 @@ class UnifiedIrrigationSystem:
             # Sauvegarde des données locales
             self.db_manager.save_sensor_data(sensor_data)
             
+            # Nœud de serre: lectures transmises par lots à l'agrégateur
+            if self.config.ingest.AGGREGATOR_URL:
+                from core.ingest_client import ingest_client
+                ingest_client.add_sensor_data(sensor_data)
+            
             # Mettre à jour les données partagées pour l'API
             with self.data_lock:
                 self.shared_data['sensor_data'] = sensor_data
                 self.shared_data['last_update'] = time.time()
-                
-                # Mettre à jour le statut système
-                self.shared_data['system_status'] = {
-                    "timestamp": time.time(),
-                    "online": is_online,
-                    "sensors": sensor_data.get("sensors", {}),
-                    "system": {
-                        "running": True,
-                        "today_irrigation": self.db_manager.get_today_irrigation_time(),
-                        "plant": {
-                            "name": self.config.plant.name,
-                            "min_moisture": self.config.plant.min_moisture,
-                            "optimal_moisture": self.config.plant.optimal_moisture,
-                            "max_moisture": self.config.plant.max_moisture
-                        },
-                        "offline_mode": self.config.offline_mode
-                    }
-                }
             
-            # Synchronisation avec Firebase si en ligne
-            if is_online:
-                try:
-                    from core.sync_manager import sync_manager
-                    from firebase.firebase_config import firebase_manager
-                    
-                    if firebase_manager.connected:
-                        if sync_manager.should_sync():
-                            sync_thread = threading.Thread(
-                                target=sync_manager.sync_all_data,
-                                daemon=True,
-                                name="FirebaseSyncThread"
-                            )
-                            sync_thread.start()
-                            logger.info("🔄 Synchronisation Firebase démarrée")
-                        
-                        sync_manager.sync_single_sensor_data(sensor_data)
-                except Exception as e:
-                    logger.warning(f"⚠️ Erreur synchronisation Firebase: {e}")
+            # Envois Firebase: planificateur seul (démarré par _startup_check), depuis la base
             
             # Analyse et décision
             should_irrigate, reason, analysis = self.irrigation_logic.make_decision(sensor_data)
@@ -296,11 +167,10 @@ class UnifiedIrrigationSystem:
                 if success:
                     logger.info(f"✅ Irrigation terminée (cycle {self.cycle_count})")
             
-            # Nettoyage périodique
+            # Rétention: passe par petits blocs dans le thread dédié (le cycle n'attend pas)
             if self.cycle_count % 10 == 0:
-                deleted = self.db_manager.cleanup_old_data(3)
-                if deleted > 0:
-                    logger.info(f"🧹 Données locales nettoyées: {deleted} lignes supprimées")
+                from core.retention import retention_worker
+                retention_worker.trigger()
                 self.cleanup_count += 1
                 
         except Exception as e:
@@ -308,8 +178,32 @@ class UnifiedIrrigationSystem:
             import traceback
             traceback.print_exc()
     
+    def _startup_check(self):
+        """Test rapide une fois le hardware initialisé"""
+        self.startup.wait()
+        
+        # Mode RAM d'abord: instantanés périodiques de la base (sans effet sinon)
+        self.db_manager.snapshots.start()
+        
+        # Capture brute haute fréquence (config.capture, sans effet si désactivée)
+        self.sensor_manager.start_capture()
+        
+        is_online = self.network_manager.check_network_status()
+        logger.info(f"🌐 Réseau: {'EN LIGNE' if is_online else 'HORS LIGNE'}")
+        
+        # Synchronisation Firebase: réveillée au retour du réseau, rattrapage par lots
+        from core.sync_manager import sync_manager
+        sync_manager.start()
+        
+        sensor_data = self.sensor_manager.read_all()
+        if sensor_data['success']:
+            logger.info(f"✅ {sensor_data['healthy_sensors']}/{sensor_data['total_sensors']} capteurs OK")
+    
     def _run_cycle_loop(self):
         """Boucle principale des cycles"""
+        # L'API est déjà servie; les cycles attendent la fin de l'initialisation
+        self._startup_check()
+        
         logger.info("\n🚀 DÉMARRAGE SURVEILLANCE AUTOMATIQUE\n")
         
         while self.running:
@@ -331,14 +225,6 @@ class UnifiedIrrigationSystem:
         print("🚀 SYSTÈME D'IRRIGATION INTELLIGENT UNIFIÉ")
         print("=" * 60)
         
-        # Test rapide
-        is_online = self.network_manager.check_network_status()
-        print(f"🌐 Réseau: {'EN LIGNE' if is_online else 'HORS LIGNE'}")
-        
-        sensor_data = self.sensor_manager.read_all()
-        if sensor_data['success']:
-            print(f"✅ {sensor_data['healthy_sensors']}/{sensor_data['total_sensors']} capteurs OK")
-        
         print(f"🌱 Plante: {self.config.plant.name}")
         print(f"📡 API: http://0.0.0.0:5000")
         
@@ -381,6 +267,13 @@ class UnifiedIrrigationSystem:
         
         self.running = False
         
+        # Vider la file des zones et fermer les vannes
+        try:
+            from decision_engine.zones import zone_orchestrator
+            zone_orchestrator.stop()
+        except Exception as e:
+            logger.error(f"❌ Erreur arrêt des zones: {e}")
+        
         # Arrêter la pompe si en marche
         if self.water_pump.is_running:
             logger.info("🛑 Arrêt de la pompe...")
@@ -401,11 +294,34 @@ class UnifiedIrrigationSystem:
         logger.info("🔌 Nettoyage GPIO...")
         self.gpio.cleanup()
         
+        # Données en attente: envoi agrégateur, file d'ingestion, lecture retenue
+        logger.info("💾 Écriture des données en attente...")
+        irrigation_today = None
+        try:
+            if self.config.ingest.AGGREGATOR_URL:
+                from core.ingest_client import ingest_client
+                ingest_client.stop(timeout=10)
+            from core.ingest import ingest_writer
+            ingest_writer.stop()
+            from core.retention import retention_worker
+            retention_worker.stop()
+            from core.sync_manager import sync_manager
+            sync_manager.stop()
+            from core.egress import egress_budget
+            egress_budget.flush()
+            # Lue avant la fermeture (aucune connexion rouverte après l'instantané final)
+            irrigation_today = self.db_manager.get_today_irrigation_time()
+            # Instantané final inclus (mode RAM d'abord)
+            self.db_manager.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Données en attente non écrites: {e}")
+        
         # Statistiques finales
         logger.info(f"\n📊 STATISTIQUES FINALES:")
         logger.info(f"🔁 Cycles exécutés: {self.cycle_count}")
         logger.info(f"🧹 Nettoyages effectués: {self.cleanup_count}")
-        logger.info(f"🚰 Irrigation aujourd'hui: {self.db_manager.get_today_irrigation_time():.1f}s")
+        if irrigation_today is not None:
+            logger.info(f"🚰 Irrigation aujourd'hui: {irrigation_today:.1f}s")
         
         logger.info("✅ Système unifié arrêté proprement")
 
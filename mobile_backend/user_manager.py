@@ -6,18 +6,35 @@ import hashlib
 import secrets
 import json
 import logging
+from collections import namedtuple
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
+from core.startup import LazyInstance
+from core import query_cache
+from core.query_cache import QueryCache, bump_versions
+from core.db_access import ConnectionPool, fetch_all, fetch_one
+from config.settings import config
 
 logger = logging.getLogger(__name__)
 
+# Lignes typées (core/db_access.py); dict seulement à la frontière JSON (_asdict)
+UserCredentials = namedtuple("UserCredentials", "id username email password_hash salt profile_data")
+UserRow = namedtuple("UserRow", "id username email profile_data created_at last_login")
+UserSummary = namedtuple("UserSummary", "id username email created_at last_login")
+SessionUser = namedtuple("SessionUser", "user_id username email")
+PlantRow = namedtuple("PlantRow", "id plant_type custom_name added_date notes")
+LastIrrigation = namedtuple("LastIrrigation", "timestamp duration reason")
+
 class UserManager:
     """Gestion complète des utilisateurs hors ligne"""
     
     def __init__(self, db_path: str = "users.db"):
         self.db_path = Path(db_path)
         self.initialize_database()
+        # Connexions réutilisées par thread (cache d'instructions préparées conservé)
+        self.pool = ConnectionPool(self.db_path)
+        self.cache = QueryCache(self.db_path, max_entries=config.persistence.QUERY_CACHE_SIZE)
         logger.info(f"✅ UserManager initialisé: {self.db_path}")
     
     def initialize_database(self):
@@ -78,6 +95,8 @@ class UserManager:
                 )
             """)
             
+            query_cache.create_tables(cursor)
+            
             conn.commit()
             conn.close()
             
@@ -121,17 +140,13 @@ class UserManager:
             profile_json = json.dumps(profile_data or {})
             
             # Insérer dans BD
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO users (username, email, password_hash, salt, profile_data)
-                VALUES (?, ?, ?, ?, ?)
-            """, (username, email, password_hash, salt, profile_json))
+            with self.pool.transaction() as conn:
+                cursor = conn.execute("""
+                    INSERT INTO users (username, email, password_hash, salt, profile_data)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (username, email, password_hash, salt, profile_json))
             
             user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
             
             logger.info(f"✅ Utilisateur inscrit: {username} (ID: {user_id})")
             return True, "Inscription réussie", user_id
@@ -145,41 +160,33 @@ class UserManager:
     def authenticate_user(self, username: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
         """Authentifie un utilisateur"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            user = fetch_one(self.pool.connection(), """
                 SELECT id, username, email, password_hash, salt, profile_data 
                 FROM users 
                 WHERE username = ? AND is_active = 1
-            """, (username.strip(),))
+            """, (username.strip(),), UserCredentials)
             
-            row = cursor.fetchone()
-            conn.close()
-            
-            if not row:
+            if not user:
                 return False, "Utilisateur non trouvé", None
             
-            user_id, db_username, email, db_hash, salt, profile_json = row
-            
             # Vérifier mot de passe
-            test_hash, _ = self._hash_password(password, salt)
+            test_hash, _ = self._hash_password(password, user.salt)
             
-            if test_hash == db_hash:
+            if test_hash == user.password_hash:
                 # Mettre à jour dernière connexion
-                self._update_last_login(user_id)
+                self._update_last_login(user.id)
                 
                 # Créer session
-                token = self._create_session(user_id)
+                token = self._create_session(user.id)
                 
                 # Données utilisateur
                 user_data = {
-                    "id": user_id,
-                    "username": db_username,
-                    "email": email,
-                    "profile": json.loads(profile_json) if profile_json else {},
+                    "id": user.id,
+                    "username": user.username,
+                    "email": user.email,
+                    "profile": json.loads(user.profile_data) if user.profile_data else {},
                     "token": token,
-                    "plants": self.get_user_plants(user_id)
+                    "plants": [plant._asdict() for plant in self.get_user_plants(user.id)]
                 }
                 
                 logger.info(f"✅ Connexion réussie: {username}")
@@ -194,11 +201,8 @@ class UserManager:
     def _update_last_login(self, user_id: int):
         """Met à jour la dernière connexion"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (user_id,))
-            conn.commit()
-            conn.close()
+            with self.pool.transaction() as conn:
+                conn.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (user_id,))
         except Exception as e:
             logger.error(f"❌ Erreur update last_login: {e}")
     
@@ -207,14 +211,11 @@ class UserManager:
         token = secrets.token_urlsafe(32)
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO sessions (user_id, token, expires_at)
-                VALUES (?, ?, datetime('now', ?))
-            """, (user_id, token, f'+{duration_hours} hours'))
-            conn.commit()
-            conn.close()
+            with self.pool.transaction() as conn:
+                conn.execute("""
+                    INSERT INTO sessions (user_id, token, expires_at)
+                    VALUES (?, ?, datetime('now', ?))
+                """, (user_id, token, f'+{duration_hours} hours'))
         except Exception as e:
             logger.error(f"❌ Erreur création session: {e}")
         
@@ -223,28 +224,16 @@ class UserManager:
     def validate_session(self, token: str) -> Optional[Dict]:
         """Valide une session"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            session = fetch_one(self.pool.connection(), """
                 SELECT u.id, u.username, u.email
                 FROM sessions s
                 JOIN users u ON s.user_id = u.id
                 WHERE s.token = ? 
                 AND s.expires_at > CURRENT_TIMESTAMP
                 AND u.is_active = 1
-            """, (token,))
+            """, (token,), SessionUser)
             
-            row = cursor.fetchone()
-            conn.close()
-            
-            if row:
-                return {
-                    "user_id": row[0],
-                    "username": row[1],
-                    "email": row[2]
-                }
-            return None
+            return session._asdict() if session else None
             
         except Exception as e:
             logger.error(f"❌ Erreur validation session: {e}")
@@ -253,12 +242,8 @@ class UserManager:
     def user_exists(self, username: str) -> bool:
         """Vérifie si un utilisateur existe"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-            exists = cursor.fetchone() is not None
-            conn.close()
-            return exists
+            return fetch_one(self.pool.connection(), "SELECT id FROM users WHERE username = ?",
+                             (username,)) is not None
         except Exception as e:
             logger.error(f"❌ Erreur vérification utilisateur: {e}")
             return False
@@ -266,26 +251,20 @@ class UserManager:
     def get_user(self, user_id: int) -> Optional[Dict]:
         """Récupère un utilisateur"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            user = fetch_one(self.pool.connection(), """
                 SELECT id, username, email, profile_data, created_at, last_login
                 FROM users WHERE id = ?
-            """, (user_id,))
+            """, (user_id,), UserRow)
             
-            row = cursor.fetchone()
-            conn.close()
-            
-            if row:
+            if user:
                 return {
-                    "id": row[0],
-                    "username": row[1],
-                    "email": row[2],
-                    "profile": json.loads(row[3]) if row[3] else {},
-                    "created_at": row[4],
-                    "last_login": row[5],
-                    "plants": self.get_user_plants(user_id)
+                    "id": user.id,
+                    "username": user.username,
+                    "email": user.email,
+                    "profile": json.loads(user.profile_data) if user.profile_data else {},
+                    "created_at": user.created_at,
+                    "last_login": user.last_login,
+                    "plants": [plant._asdict() for plant in self.get_user_plants(user_id)]
                 }
             return None
             
@@ -296,27 +275,12 @@ class UserManager:
     def get_all_users(self) -> list:
         """Liste tous les utilisateurs"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            users = fetch_all(self.pool.connection(), """
                 SELECT id, username, email, created_at, last_login
                 FROM users 
                 ORDER BY created_at DESC
-            """)
-            
-            users = []
-            for row in cursor.fetchall():
-                users.append({
-                    "id": row[0],
-                    "username": row[1],
-                    "email": row[2],
-                    "created_at": row[3],
-                    "last_login": row[4]
-                })
-            
-            conn.close()
-            return users
+            """, (), UserSummary)
+            return [user._asdict() for user in users]
             
         except Exception as e:
             logger.error(f"❌ Erreur liste utilisateurs: {e}")
@@ -325,111 +289,86 @@ class UserManager:
     def add_user_plant(self, user_id: int, plant_type: str, custom_name: str = None, notes: str = None) -> bool:
         """Ajoute une plante à un utilisateur"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO user_plants (user_id, plant_type, custom_name, notes)
-                VALUES (?, ?, ?, ?)
-            """, (user_id, plant_type, custom_name, notes))
-            
-            conn.commit()
-            conn.close()
+            with self.pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO user_plants (user_id, plant_type, custom_name, notes)
+                    VALUES (?, ?, ?, ?)
+                """, (user_id, plant_type, custom_name, notes))
+                bump_versions(cursor, "user_plants")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erreur ajout plante: {e}")
             return False
     
-    def get_user_plants(self, user_id: int) -> list:
-        """Récupère les plantes d'un utilisateur"""
+    def get_user_plants(self, user_id: int) -> List[PlantRow]:
+        """Récupère les plantes d'un utilisateur (en cache jusqu'au prochain ajout)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, plant_type, custom_name, added_date, notes
-                FROM user_plants 
-                WHERE user_id = ?
-                ORDER BY added_date DESC
-            """, (user_id,))
-            
-            plants = []
-            for row in cursor.fetchall():
-                plants.append({
-                    "id": row[0],
-                    "plant_type": row[1],
-                    "custom_name": row[2],
-                    "added_date": row[3],
-                    "notes": row[4]
-                })
-            
-            conn.close()
-            return plants
-            
+            return self.cache.get("user_plants", (user_id,), ("user_plants",),
+                                  lambda: self._query_user_plants(user_id), deep=False)
         except Exception as e:
             logger.error(f"❌ Erreur récupération plantes: {e}")
             return []
     
+    def _query_user_plants(self, user_id: int) -> List[PlantRow]:
+        return fetch_all(self.pool.connection(), """
+            SELECT id, plant_type, custom_name, added_date, notes
+            FROM user_plants 
+            WHERE user_id = ?
+            ORDER BY added_date DESC
+        """, (user_id,), PlantRow)
+    
     def log_irrigation(self, user_id: int, duration: float, reason: str = "manual"):
         """Log une irrigation"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO irrigation_history (user_id, duration, reason)
-                VALUES (?, ?, ?)
-            """, (user_id, duration, reason))
-            
-            conn.commit()
-            conn.close()
+            with self.pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO irrigation_history (user_id, duration, reason)
+                    VALUES (?, ?, ?)
+                """, (user_id, duration, reason))
+                bump_versions(cursor, "irrigation_history")
             
         except Exception as e:
             logger.error(f"❌ Erreur log irrigation: {e}")
     
     def get_user_stats(self, user_id: int) -> Dict:
-        """Statistiques utilisateur"""
+        """Statistiques utilisateur (en cache jusqu'à la prochaine irrigation / plante)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Total irrigation
-            cursor.execute("""
-                SELECT COUNT(*), SUM(duration) 
-                FROM irrigation_history 
-                WHERE user_id = ?
-            """, (user_id,))
-            
-            count, total_duration = cursor.fetchone()
-            
-            # Dernière irrigation
-            cursor.execute("""
-                SELECT timestamp, duration, reason
-                FROM irrigation_history 
-                WHERE user_id = ?
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """, (user_id,))
-            
-            last_irrigation = cursor.fetchone()
-            
-            conn.close()
-            
-            return {
-                "total_irrigations": count or 0,
-                "total_water_time": total_duration or 0,
-                "last_irrigation": {
-                    "timestamp": last_irrigation[0] if last_irrigation else None,
-                    "duration": last_irrigation[1] if last_irrigation else 0,
-                    "reason": last_irrigation[2] if last_irrigation else None
-                },
-                "plant_count": len(self.get_user_plants(user_id))
-            }
-            
+            return self.cache.get("user_stats", (user_id,), ("irrigation_history", "user_plants"),
+                                  lambda: self._query_user_stats(user_id))
         except Exception as e:
             logger.error(f"❌ Erreur statistiques: {e}")
             return {}
+    
+    def _query_user_stats(self, user_id: int) -> Dict:
+        conn = self.pool.connection()
+        
+        # Total irrigation
+        count, total_duration = conn.execute("""
+            SELECT COUNT(*), SUM(duration) 
+            FROM irrigation_history 
+            WHERE user_id = ?
+        """, (user_id,)).fetchone()
+        
+        # Dernière irrigation
+        last_irrigation = fetch_one(conn, """
+            SELECT timestamp, duration, reason
+            FROM irrigation_history 
+            WHERE user_id = ?
+            ORDER BY timestamp DESC 
+            LIMIT 1
+        """, (user_id,), LastIrrigation)
+        
+        return {
+            "total_irrigations": count or 0,
+            "total_water_time": total_duration or 0,
+            "last_irrigation": last_irrigation._asdict() if last_irrigation else {
+                "timestamp": None, "duration": 0, "reason": None
+            },
+            "plant_count": len(self._query_user_plants(user_id))
+        }
 
 # Instance globale
-user_manager = UserManager()
\ No newline at end of file
+user_manager = LazyInstance(UserManager, "user_manager")
\ No newline at end of file
@@ -2,10 +2,13 @@
 Classe de base pour tous les capteurs - UTILISE GPIO CENTRAL
 """
 from abc import ABC, abstractmethod
+import math
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import time
+import threading
 from core.gpio_manager import gpio_central
+from sensors.filters import FilterChain
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,43 @@ class BaseSensor(ABC):
         self.max_errors = 3
         self.last_read_time = 0
         self.read_interval = 2
+        # Instantané GPIO fourni par SensorManager.read_all (pin -> valeur)
+        self._snapshot: Optional[Dict[int, bool]] = None
+        # Chaînes de filtrage par champ (configurées par SensorManager)
+        self.filters: Dict[str, FilterChain] = {}
+        # read() et sample_raw() (thread de capture) partagent _snapshot
+        self._read_lock = threading.Lock()
+    
+    def configure_filters(self, spec: Dict[str, List[Tuple[str, Dict[str, float]]]]):
+        """Installe les chaînes de filtrage {champ: [(filtre, paramètres), ...]}"""
+        self.filters = {field: FilterChain.from_spec(chain) for field, chain in spec.items()}
+        if self.filters:
+            logger.info(f"🎚️ {self.name}: filtres sur {list(self.filters)}")
+    
+    def apply_filters(self, data: Dict[str, Any], timestamp: float) -> Dict[str, Any]:
+        """
+        Remplace les champs configurés par leur valeur filtrée
+        Les valeurs brutes restent disponibles dans data['unfiltered']
+        """
+        if not self.filters:
+            return data
+        
+        unfiltered = {}
+        for field, chain in self.filters.items():
+            value = data.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                continue
+            unfiltered[field] = value
+            data[field] = round(chain.update(float(value), timestamp), 1)
+        
+        if unfiltered:
+            data['unfiltered'] = unfiltered
+            self.derive_filtered(data)
+        return data
+    
+    def derive_filtered(self, data: Dict[str, Any]):
+        """Recalcule les champs dérivés (état, booléens) à partir des valeurs filtrées"""
+        pass
     
     @abstractmethod
     def read_raw(self) -> Optional[Dict[str, Any]]:
@@ -30,10 +70,20 @@ class BaseSensor(ABC):
         """
         pass
     
-    def read(self) -> Optional[Dict[str, Any]]:
+    def read_pin(self) -> bool:
+        """
+        Lit la broche du capteur
+        Utilise l'instantané GPIO en cours s'il contient la broche
+        """
+        if self._snapshot is not None and self.pin in self._snapshot:
+            return self._snapshot[self.pin]
+        return gpio_central.read(self.pin)
+    
+    def read(self, snapshot: Optional[Dict[int, bool]] = None) -> Optional[Dict[str, Any]]:
         """
         Lecture avec gestion de cache et intervalle minimum
         Utilise le GPIO central pour la lecture
+        snapshot: valeurs lues au même instant par gpio_central.read_inputs_snapshot()
         """
         current_time = time.time()
         
@@ -44,9 +94,16 @@ class BaseSensor(ABC):
             
         try:
             # Lecture de la valeur brute du capteur
-            data = self.read_raw()
+            with self._read_lock:
+                self._snapshot = snapshot
+                try:
+                    data = self.read_raw()
+                finally:
+                    self._snapshot = None
             
             if data is not None:
+                # Filtrage (valeurs brutes conservées dans 'unfiltered')
+                data = self.apply_filters(data, current_time)
                 # Ajout du timestamp à la donnée
                 data['timestamp'] = current_time
                 # Mise en cache
@@ -68,6 +125,18 @@ class BaseSensor(ABC):
             logger.error(f"Erreur lecture capteur {self.name}: {str(e)} (erreur {self.error_count}/{self.max_errors})")
             return None
     
+    def sample_raw(self, snapshot: Optional[Dict[int, bool]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lecture brute pour la capture haute fréquence: sans filtre, sans cache,
+        sans effet sur last_value ni sur l'état des filtres
+        """
+        with self._read_lock:
+            self._snapshot = snapshot
+            try:
+                return self.read_raw()
+            finally:
+                self._snapshot = None
+    
     def is_healthy(self) -> bool:
         """
         Vérifie si le capteur est fonctionnel
@@ -85,7 +154,8 @@ class BaseSensor(ABC):
             "healthy": self.is_healthy(),
             "error_count": self.error_count,
             "last_value": self.last_value,
-            "last_read_time": self.last_read_time
+            "last_read_time": self.last_read_time,
+            "filters": {field: chain.get_state() for field, chain in self.filters.items()}
         }
     
     def cleanup(self):
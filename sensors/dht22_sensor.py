@@ -91,6 +91,12 @@ class DHT22Sensor(BaseSensor):
             "method": "simulated"
         }
     
+    def sample_raw(self, snapshot: Optional[Dict[int, bool]] = None) -> Optional[Dict[str, Any]]:
+        """Dernière lecture brute (le DHT22 ne supporte pas plus d'une lecture toutes les 2 s)"""
+        if self.last_value is None:
+            return None
+        return {**self.last_value, **self.last_value.get("unfiltered", {})}
+    
     def cleanup(self):
         """Nettoyage du capteur"""
         if self._sensor and self.method == "adafruit_dht":
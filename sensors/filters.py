@@ -0,0 +1,220 @@
+"""
+Filtrage des mesures capteurs
+Chaîne composable par champ: médiane glissante, EMA, rejet Hampel, limite de variation
+Tampons circulaires préalloués: coût constant par échantillon (fenêtres de taille fixe)
+"""
+import math
+from array import array
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Facteur de cohérence MAD -> écart-type (loi normale)
+MAD_SCALE = 1.4826
+
+
+class RingWindow:
+    """Fenêtre glissante préallouée, avec copie triée pour la médiane"""
+    __slots__ = ("size", "_values", "_sorted", "_index", "count")
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("Fenêtre de taille >= 1 requise")
+        self.size = size
+        self._values = array("d", [0.0]) * size
+        self._sorted: List[float] = []
+        self._index = 0
+        self.count = 0
+
+    def push(self, value: float):
+        if self.count == self.size:
+            # Retirer la valeur la plus ancienne de la copie triée
+            oldest = self._values[self._index]
+            del self._sorted[bisect_left(self._sorted, oldest)]
+        else:
+            self.count += 1
+        self._values[self._index] = value
+        insort(self._sorted, value)
+        self._index = (self._index + 1) % self.size
+
+    def median(self) -> float:
+        n = len(self._sorted)
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2.0
+
+    def mad(self, center: float) -> float:
+        """Écart absolu médian autour de center"""
+        deviations = sorted(abs(v - center) for v in self._sorted)
+        n = len(deviations)
+        mid = n // 2
+        return deviations[mid] if n % 2 else (deviations[mid - 1] + deviations[mid]) / 2.0
+
+    def clear(self):
+        self._sorted.clear()
+        self._index = 0
+        self.count = 0
+
+
+class SignalFilter:
+    """Interface commune des filtres"""
+    name = "filter"
+
+    def update(self, value: float, timestamp: float) -> float:
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"filter": self.name}
+
+
+class MedianFilter(SignalFilter):
+    """Médiane glissante (anti-rebond des capteurs numériques, pics isolés)"""
+    name = "median"
+
+    def __init__(self, window: int = 5):
+        self.window = RingWindow(int(window))
+
+    def update(self, value: float, timestamp: float) -> float:
+        self.window.push(value)
+        return self.window.median()
+
+    def reset(self):
+        self.window.clear()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"filter": self.name, "window": self.window.size, "samples": self.window.count}
+
+
+class EMAFilter(SignalFilter):
+    """Moyenne mobile exponentielle"""
+    name = "ema"
+
+    def __init__(self, alpha: float = 0.3):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha doit être dans ]0, 1]")
+        self.alpha = float(alpha)
+        self.value: Optional[float] = None
+
+    def update(self, value: float, timestamp: float) -> float:
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def reset(self):
+        self.value = None
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"filter": self.name, "alpha": self.alpha}
+
+
+class HampelFilter(SignalFilter):
+    """Rejet des valeurs aberrantes: remplacée par la médiane si |x - médiane| > n_sigmas * σ(MAD)"""
+    name = "hampel"
+
+    def __init__(self, window: int = 7, n_sigmas: float = 3.0, min_samples: int = 3):
+        self.window = RingWindow(int(window))
+        self.n_sigmas = float(n_sigmas)
+        self.min_samples = int(min_samples)
+        self.rejected = 0
+
+    def update(self, value: float, timestamp: float) -> float:
+        # Fenêtre incluant l'échantillon courant (médiane robuste à un pic isolé)
+        self.window.push(value)
+        if self.window.count >= self.min_samples:
+            median = self.window.median()
+            sigma = MAD_SCALE * self.window.mad(median)
+            if sigma > 0 and abs(value - median) > self.n_sigmas * sigma:
+                self.rejected += 1
+                return median
+        return value
+
+    def reset(self):
+        self.window.clear()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"filter": self.name, "window": self.window.size,
+                "n_sigmas": self.n_sigmas, "rejected": self.rejected}
+
+
+class RateLimitFilter(SignalFilter):
+    """Limite la variation par seconde (un capteur physique ne saute pas de 10°C en 5 s)"""
+    name = "rate_limit"
+
+    def __init__(self, max_rate: float):
+        self.max_rate = float(max_rate)
+        self.value: Optional[float] = None
+        self.timestamp = 0.0
+        self.clamped = 0
+
+    def update(self, value: float, timestamp: float) -> float:
+        if self.value is None:
+            self.value, self.timestamp = value, timestamp
+            return value
+
+        max_delta = self.max_rate * max(timestamp - self.timestamp, 0.0)
+        delta = value - self.value
+        if abs(delta) > max_delta:
+            self.clamped += 1
+            value = self.value + math.copysign(max_delta, delta)
+
+        self.value, self.timestamp = value, timestamp
+        return value
+
+    def reset(self):
+        self.value = None
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"filter": self.name, "max_rate": self.max_rate, "clamped": self.clamped}
+
+
+FILTER_TYPES = {
+    MedianFilter.name: MedianFilter,
+    EMAFilter.name: EMAFilter,
+    HampelFilter.name: HampelFilter,
+    RateLimitFilter.name: RateLimitFilter,
+}
+
+FilterSpec = Tuple[str, Dict[str, float]]
+
+
+class FilterChain:
+    """Filtres appliqués dans l'ordre à un même signal"""
+
+    def __init__(self, filters: Sequence[SignalFilter]):
+        self.filters = list(filters)
+        self.last_raw: Optional[float] = None
+        self.last_value: Optional[float] = None
+
+    @classmethod
+    def from_spec(cls, spec: Sequence[FilterSpec]) -> 'FilterChain':
+        filters = []
+        for filter_name, params in spec:
+            filter_class = FILTER_TYPES.get(filter_name)
+            if filter_class is None:
+                raise ValueError(f"Filtre inconnu: {filter_name} ({', '.join(FILTER_TYPES)})")
+            filters.append(filter_class(**params))
+        return cls(filters)
+
+    def update(self, value: float, timestamp: float) -> float:
+        self.last_raw = value
+        for signal_filter in self.filters:
+            value = signal_filter.update(value, timestamp)
+        self.last_value = value
+        return value
+
+    def reset(self):
+        for signal_filter in self.filters:
+            signal_filter.reset()
+        self.last_raw = self.last_value = None
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "raw": self.last_raw,
+            "filtered": self.last_value,
+            "filters": [f.get_state() for f in self.filters]
+        }
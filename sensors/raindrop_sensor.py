@@ -6,7 +6,6 @@ Logique: 0 = pluie détectée, 1 = sec
 import logging
 from typing import Optional, Dict, Any
 from sensors.base_sensor import BaseSensor
-from core.gpio_manager import gpio_central
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +23,7 @@ class RaindropSensor(BaseSensor):
         """
         try:
             # Lecture via GPIO central
-            raw_value = gpio_central.read(self.pin)
+            raw_value = self.read_pin()
             
             # 0 = pluie détectée (gouttes sur le capteur)
             # 1 = sec (pas de gouttes)
@@ -3,8 +3,10 @@ Manager central pour tous les capteurs - HARDWARE RÉEL
 """
 import time
 import logging
+import threading
 from typing import Dict, Any, List, Optional
 from config.settings import config
+from core.startup import LazyInstance
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,11 @@ class SensorManager:
         self.sensors = {}
         # Liste des capteurs disponibles
         self.available_sensors = []
+        # Capture brute haute fréquence (fichier circulaire, core/ring_file.py)
+        self._ring = None
+        self._capture_thread: Optional[threading.Thread] = None
+        self._capture_stop = threading.Event()
+        self.capture_errors = 0
         # Initialisation
         self.initialize_sensors()
     
@@ -48,6 +55,10 @@ class SensorManager:
             print(f"💦 Niveau Eau -> GPIO{config.gpio.WATER_LEVEL_PIN}")
             self.sensors['water'] = WaterLevelSensor(pin=config.gpio.WATER_LEVEL_PIN)
             
+            # Filtrage des mesures par capteur (config.filters)
+            for key, sensor in self.sensors.items():
+                sensor.configure_filters(config.filters.chains.get(key, {}))
+            
             # Mise à jour de la liste des capteurs disponibles
             self.available_sensors = list(self.sensors.keys())
             
@@ -72,9 +83,13 @@ class SensorManager:
         }
         
         try:
+            # Instantané des entrées digitales (sol, pluie, eau) en un seul appel
+            from core.gpio_manager import gpio_central
+            snapshot = gpio_central.read_inputs_snapshot()
+            
             # Lecture de chaque capteur
             for name, sensor in self.sensors.items():
-                data = sensor.read()
+                data = sensor.read(snapshot=snapshot)
                 readings["sensors"][name] = data
                 
                 if data is not None:
@@ -160,8 +175,85 @@ class SensorManager:
         
         return report
     
+    # === CAPTURE BRUTE ===
+    
+    def start_capture(self) -> bool:
+        """
+        Démarre la capture des échantillons bruts à config.capture.RATE_HZ dans le fichier
+        circulaire (sans SQL, sans filtre; le DHT22 fournit sa dernière lecture)
+        """
+        settings = config.capture
+        if not settings.ENABLED or settings.RATE_HZ <= 0:
+            return False
+        if self._capture_thread is not None and self._capture_thread.is_alive():
+            return True
+        
+        from core.ring_file import RingWriter
+        if self._ring is None:
+            self._ring = RingWriter(settings.PATH, capacity=settings.CAPACITY,
+                                    flush_interval=settings.FLUSH_INTERVAL)
+        self._capture_stop.clear()
+        self._capture_thread = threading.Thread(target=self._capture_loop, args=(1.0 / settings.RATE_HZ,),
+                                                daemon=True, name="RawCapture")
+        self._capture_thread.start()
+        logger.info(f"📼 Capture brute {settings.RATE_HZ} Hz -> {settings.PATH}")
+        return True
+    
+    def stop_capture(self):
+        self._capture_stop.set()
+        if self._capture_thread is not None:
+            self._capture_thread.join(timeout=5)
+            self._capture_thread = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+    
+    def capture_sample(self) -> Dict[str, Any]:
+        """Un échantillon brut de tous les capteurs ({colonne: valeur})"""
+        from core.gpio_manager import gpio_central
+        from core.compact_schema import reading_values
+        snapshot = gpio_central.read_inputs_snapshot()
+        samples = {}
+        for name, sensor in self.sensors.items():
+            data = sensor.sample_raw(snapshot=snapshot)
+            if data is not None:
+                samples[name] = data
+        values = reading_values({"sensors": samples})
+        # Capteur sans lecture: NaN dans le fichier plutôt qu'une valeur par défaut
+        if "dht22" not in samples:
+            values["temperature"] = values["air_humidity"] = None
+        return values
+    
+    def get_capture_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": config.capture.ENABLED,
+            "running": self._capture_thread is not None and self._capture_thread.is_alive(),
+            "rate_hz": config.capture.RATE_HZ,
+            "errors": self.capture_errors,
+            **(self._ring.get_stats() if self._ring is not None else {"path": config.capture.PATH}),
+        }
+    
+    def _capture_loop(self, period: float):
+        # Cadence fixe: la durée d'une lecture (rafale du sol) ne décale pas les suivantes
+        next_tick = time.monotonic()
+        while not self._capture_stop.is_set():
+            try:
+                self._ring.append(time.time(), self.capture_sample())
+            except Exception as e:
+                self.capture_errors += 1
+                if self.capture_errors % 100 == 1:
+                    logger.error(f"❌ Erreur capture brute: {e}")
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Retard: on saute les échéances manquées
+                next_tick = time.monotonic()
+                delay = 0
+            self._capture_stop.wait(delay)
+    
     def cleanup(self):
         """Nettoie toutes les ressources des capteurs"""
+        self.stop_capture()
         for name, sensor in self.sensors.items():
             try:
                 sensor.cleanup()
@@ -171,5 +263,5 @@ class SensorManager:
         
         logger.info("✅ Tous les capteurs nettoyés")
 
-# Instance globale unique
-sensor_manager = SensorManager()
\ No newline at end of file
+# Instance globale unique (capteurs initialisés au premier accès)
+sensor_manager = LazyInstance(SensorManager, "sensor_manager")
\ No newline at end of file
@@ -3,16 +3,27 @@ Capteur digital d'humidité du sol - UTILISE GPIO CENTRAL
 """
 import logging
 from typing import Optional, Dict, Any
-from sensors.base_sensor import BaseSensor
+from config.settings import config
 from core.gpio_manager import gpio_central
+from sensors.base_sensor import BaseSensor
 
 logger = logging.getLogger(__name__)
 
+# Sol sec à humidité <= 50 % (rapport cyclique 'sec' >= 0.5): lecture brute et filtrée
+DRY_MOISTURE_PERCENT = 50.0
+
+def is_dry_moisture(moisture_percent: float) -> bool:
+    return moisture_percent <= DRY_MOISTURE_PERCENT
+
 class SoilMoistureSensor(BaseSensor):
     """Capteur digital d'humidité du sol - UTILISE GPIO CENTRAL"""
     
     def __init__(self, pin: int = 24):
         super().__init__(name="SoilMoisture", pin=pin)
+        # Rafale: la sortie numérique oscille près du seuil, son rapport cyclique
+        # donne une humidité continue bien plus stable qu'une lecture unique
+        self.burst_samples = config.irrigation.SOIL_BURST_SAMPLES
+        self.burst_window = config.irrigation.SOIL_BURST_WINDOW
         logger.info(f"✅ SoilMoisture initialisé sur GPIO{pin} - UTILISE GPIO CENTRAL")
     
     def read_raw(self) -> Optional[Dict[str, Any]]:
@@ -21,8 +32,11 @@ class SoilMoistureSensor(BaseSensor):
         Returns: dict avec état et pourcentage d'humidité
         """
         try:
+            if self.burst_samples > 1:
+                return self.read_burst()
+            
             # Lecture via GPIO central
-            raw_value = gpio_central.read(self.pin)
+            raw_value = self.read_pin()
             # Conversion en booléen: 1 = sec, 0 = humide
             is_dry = bool(raw_value)
             
@@ -39,4 +53,38 @@ class SoilMoistureSensor(BaseSensor):
             
         except Exception as e:
             logger.error(f"❌ Erreur lecture SoilMoisture: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+    
+    def read_burst(self) -> Optional[Dict[str, Any]]:
+        """
+        Lecture en rafale agrégée sur place (seul l'agrégat est conservé)
+        - duty_cycle: part des lectures 'sec' (1)
+        - variance: variance de Bernoulli p(1-p)
+        - confidence: accord des lectures sur l'état majoritaire |2p - 1|
+        """
+        burst = gpio_central.sample_burst(self.pin, self.burst_samples, self.burst_window)
+        n = burst["samples"]
+        if n == 0:
+            return None
+        
+        duty_cycle = burst["high"] / n
+        moisture_percent = round((1.0 - duty_cycle) * 100.0, 1)
+        is_dry = is_dry_moisture(moisture_percent)
+        
+        return {
+            "is_dry": is_dry,
+            "moisture_percent": moisture_percent,
+            "raw_value": is_dry,
+            "state": "DRY" if is_dry else "WET",
+            "duty_cycle": round(duty_cycle, 4),
+            "variance": round(duty_cycle * (1.0 - duty_cycle), 4),
+            "confidence": round(abs(2.0 * duty_cycle - 1.0), 3),
+            "samples": n,
+            "transitions": burst["transitions"]
+        }
+    
+    def derive_filtered(self, data: Dict[str, Any]):
+        """État sec/humide issu du vote majoritaire (médiane) plutôt que de la lecture brute"""
+        is_dry = is_dry_moisture(data["moisture_percent"])
+        data["is_dry"] = is_dry
+        data["state"] = "DRY" if is_dry else "WET"
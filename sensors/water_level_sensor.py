@@ -2,7 +2,6 @@
 import logging
 from typing import Optional, Dict, Any
 from sensors.base_sensor import BaseSensor
-from core.gpio_manager import gpio_central
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +12,7 @@ class WaterLevelSensor(BaseSensor):
     
     def read_raw(self) -> Optional[Dict[str, Any]]:
         try:
-            raw_value = gpio_central.read(self.pin)
+            raw_value = self.read_pin()
             
             # ⚠️ LOGIQUE À ADAPTER SELON TON CAPTEUR ⚠️
             # Si ton capteur retourne 1 quand il y a de l'eau, et 0 quand il n'y en a pas
@@ -33,4 +32,10 @@ class WaterLevelSensor(BaseSensor):
             }
         except Exception as e:
             logger.error(f"❌ Erreur lecture WaterLevel: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+    
+    def derive_filtered(self, data: Dict[str, Any]):
+        """Détection d'eau issue de la médiane des dernières lectures"""
+        water_detected = data["water_percent"] >= 50.0
+        data["water_detected"] = water_detected
+        data["state"] = "WATER_OK" if water_detected else "WATER_LOW"
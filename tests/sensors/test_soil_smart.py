@@ -30,6 +30,34 @@ class SmartSoilSensor:
         
         return value
     
+    def read_burst(self, samples=200, window=0.1):
+        """Lecture en rafale: rapport cyclique, variance et confiance"""
+        interval = window / samples
+        high = transitions = 0
+        previous = None
+        start = time.perf_counter()
+        
+        for i in range(samples):
+            value = lgpio.gpio_read(self.chip, self.pin)
+            high += value
+            if previous is not None and value != previous:
+                transitions += 1
+            previous = value
+            
+            delay = start + (i + 1) * interval - time.perf_counter()
+            if delay > 0.0005:
+                time.sleep(delay)
+        
+        duty = high / samples
+        return {
+            "moisture": round((1 - duty) * 100, 1),
+            "duty_cycle": duty,
+            "variance": duty * (1 - duty),
+            "confidence": abs(2 * duty - 1),
+            "transitions": transitions,
+            "duration": time.perf_counter() - start
+        }
+    
     def get_trend(self):
         """Analyser la tendance"""
         if len(self.history) < 3:
@@ -99,6 +127,17 @@ class SmartSoilSensor:
             print(f"{i+1}s: {state} (valeur: {value})")
             time.sleep(1)
     
+    def burst_test(self, count=10):
+        """Test des rafales: humidité continue au lieu de SEC/HUMIDE"""
+        print(f"\n📊 TEST RAFALE ({count} mesures de 200 lectures)")
+        
+        for i in range(count):
+            burst = self.read_burst()
+            print(f"{i+1}: 💧 {burst['moisture']:5.1f}% | rapport cyclique {burst['duty_cycle']:.3f} "
+                  f"| variance {burst['variance']:.3f} | confiance {burst['confidence']:.2f} "
+                  f"| {burst['transitions']} transitions en {burst['duration']*1000:.0f} ms")
+            time.sleep(1)
+    
     def cleanup(self):
         lgpio.gpiochip_close(self.chip)
 
@@ -111,15 +150,18 @@ def main():
             print("\n🌱 MENU SIMPLE")
             print("1. 🔍 Surveillance continue")
             print("2. ⚡ Test rapide") 
-            print("3. 🚪 Quitter")
+            print("3. 📊 Test rafale (rapport cyclique)")
+            print("4. 🚪 Quitter")
             
-            choix = input("Choix (1-3): ")
+            choix = input("Choix (1-4): ")
             
             if choix == "1":
                 sensor.monitor(60)
             elif choix == "2":
                 sensor.quick_test()
             elif choix == "3":
+                sensor.burst_test()
+            elif choix == "4":
                 print("👋 Au revoir!")
                 break
             else:
@@ -1,34 +1,87 @@
 """
 API Flask finale pour système d'irrigation - VERSION COMPLÈTE ET STABLE
+Fabrique d'application unique (create_app), utilisée par:
+- main.py (système unifié, hardware dans le même processus)
+- web_server/wsgi.py (workers de production, hardware via IPC local)
 """
+import os
 import time
 import json
 import logging
 import threading
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, current_app, request, jsonify
 from flask_cors import CORS
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
+
+from web_server.hardware_ipc import LocalHardware
+from web_server.encoding import RequestTooLarge, decode_request, encoded_response, stream_response
 
 # Configuration logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialiser Flask
-app = Flask(__name__)
-CORS(app)
-
-# Verrou pour éviter les conflits GPIO
-gpio_lock = threading.Lock()
+# Routes de l'API (enregistrées par create_app)
+api = Blueprint('api', __name__)
 
-# Variables globales
+# Variables globales (par processus)
 SYSTEM_COMPONENTS = {}
 SYSTEM_READY = False
 AUTH_READY = False
 CHATBOT_READY = False
 
+HARDWARE_COMPONENTS = {
+    'gpio': 'gpio',
+    'sensor_manager': 'sensor_manager',
+    'water_pump': 'water_pump',
+    'status_led': 'status_led',
+    'irrigation_logic': 'irrigation_logic',
+    'db_manager': 'db_manager',
+    'network_manager': 'network_manager',
+    'weather_api': 'weather_api'
+}
+
+def _on_startup_complete(startup):
+    """Appelé par le thread de démarrage quand tous les composants sont initialisés"""
+    global SYSTEM_READY, AUTH_READY, CHATBOT_READY
+    
+    # 2. Composants système
+    failed = [name for name in HARDWARE_COMPONENTS.values() if not startup.is_ready(name)]
+    if failed:
+        logger.error(f"❌ Erreur chargement hardware: {failed}")
+        SYSTEM_READY = False
+    else:
+        SYSTEM_COMPONENTS.update({key: startup.get(name) for key, name in HARDWARE_COMPONENTS.items()})
+        SYSTEM_READY = True
+        logger.info("✅ Système hardware chargé")
+    
+    # 3. Authentification
+    if startup.is_ready('user_manager'):
+        SYSTEM_COMPONENTS['user_manager'] = startup.get('user_manager')
+        AUTH_READY = True
+        logger.info("✅ Authentification chargée")
+    else:
+        logger.warning("⚠️ Authentification non disponible")
+        AUTH_READY = False
+    
+    # 4. Chatbot
+    try:
+        from web_server.chatbot import EnhancedChatBot
+        SYSTEM_COMPONENTS['chatbot'] = EnhancedChatBot()
+        CHATBOT_READY = True
+        logger.info("✅ Chatbot chargé")
+    except Exception as e:
+        logger.warning(f"⚠️ Chatbot non disponible: {e}")
+        CHATBOT_READY = False
+    
+    logger.info("✅ Initialisation terminée")
+
 def safe_initialize():
-    """Initialisation sécurisée des composants"""
-    global SYSTEM_COMPONENTS, SYSTEM_READY, AUTH_READY, CHATBOT_READY
+    """
+    Initialisation sécurisée des composants
+    Non bloquante: l'API répond tout de suite (503 tant que le hardware n'est pas prêt)
+    et les composants sont initialisés en parallèle en arrière-plan
+    """
+    global SYSTEM_READY
     
     try:
         logger.info("🔧 Initialisation du système...")
@@ -38,171 +91,273 @@ def safe_initialize():
         SYSTEM_COMPONENTS['config'] = config
         logger.info("✅ Configuration chargée")
         
-        # 2. Composants système
-        try:
-            from core.gpio_manager import gpio_central
-            from sensors.sensor_manager import sensor_manager
-            from actuators.water_pump import water_pump
-            from actuators.status_led import status_led
-            from decision_engine.irrigation_logic import irrigation_logic
-            from core.database_manager import db_manager
-            from core.network_manager import network_manager
-            from core.weather_api import weather_api
-            
-            SYSTEM_COMPONENTS.update({
-                'gpio': gpio_central,
-                'sensor_manager': sensor_manager,
-                'water_pump': water_pump,
-                'status_led': status_led,
-                'irrigation_logic': irrigation_logic,
-                'db_manager': db_manager,
-                'network_manager': network_manager,
-                'weather_api': weather_api
-            })
-            
-            SYSTEM_READY = True
-            logger.info("✅ Système hardware chargé")
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur chargement hardware: {e}")
-            SYSTEM_READY = False
-        
-        # 3. Authentification
-        try:
-            from mobile_backend.user_manager import user_manager
-            SYSTEM_COMPONENTS['user_manager'] = user_manager
-            AUTH_READY = True
-            logger.info("✅ Authentification chargée")
-        except Exception as e:
-            logger.warning(f"⚠️ Authentification non disponible: {e}")
-            AUTH_READY = False
-        
-        # 4. Chatbot
-        try:
-            from web_server.chatbot import EnhancedChatBot
-            SYSTEM_COMPONENTS['chatbot'] = EnhancedChatBot()
-            CHATBOT_READY = True
-            logger.info("✅ Chatbot chargé")
-        except Exception as e:
-            logger.warning(f"⚠️ Chatbot non disponible: {e}")
-            CHATBOT_READY = False
-            
-        logger.info("✅ Initialisation terminée")
+        # 2-4. Hardware, authentification, chatbot en arrière-plan
+        from core.startup import startup_manager
+        startup_manager.start(on_complete=_on_startup_complete)
         
     except Exception as e:
         logger.error(f"❌ Erreur initialisation: {e}")
         SYSTEM_READY = False
 
-# Initialiser au démarrage
-safe_initialize()
+def _initialize_worker():
+    """
+    Initialisation d'un worker de production: pas de GPIO ici,
+    seulement les composants sans hardware (BD, authentification, chatbot)
+    """
+    global AUTH_READY, CHATBOT_READY
+
+    from config.settings import config
+    from core.startup import resolve
+    SYSTEM_COMPONENTS['config'] = config
+
+    try:
+        from core.database_manager import db_manager
+        SYSTEM_COMPONENTS['db_manager'] = resolve(db_manager)
+    except Exception as e:
+        logger.error(f"❌ Base de données non disponible: {e}")
+
+    try:
+        from mobile_backend.user_manager import user_manager
+        SYSTEM_COMPONENTS['user_manager'] = resolve(user_manager)
+        AUTH_READY = True
+    except Exception as e:
+        logger.warning(f"⚠️ Authentification non disponible: {e}")
+        AUTH_READY = False
+
+    try:
+        from web_server.chatbot import EnhancedChatBot
+        SYSTEM_COMPONENTS['chatbot'] = EnhancedChatBot()
+        CHATBOT_READY = True
+    except Exception as e:
+        logger.warning(f"⚠️ Chatbot non disponible: {e}")
+        CHATBOT_READY = False
+
+    logger.info(f"✅ Worker {os.getpid()} initialisé")
+
+def create_local_hardware(snapshot_provider: Optional[Callable[[], Optional[Dict[str, Any]]]] = None) -> LocalHardware:
+    """Démarre l'initialisation et retourne l'accès direct au hardware (processus propriétaire)"""
+    safe_initialize()
+    return LocalHardware(SYSTEM_COMPONENTS, lambda: SYSTEM_READY, snapshot_provider)
+
+def create_app(hardware=None, snapshot_provider: Optional[Callable[[], Optional[Dict[str, Any]]]] = None) -> Flask:
+    """
+    Fabrique de l'application Flask
+    - hardware=None: ce processus possède le GPIO (initialisation en arrière-plan)
+    - hardware=HardwareClient: worker de production, le GPIO reste dans le processus propriétaire
+    snapshot_provider: dernière lecture capteurs du cycle principal (évite une lecture GPIO par requête)
+    """
+    app = Flask(__name__)
+    CORS(app)
+
+    if hardware is None:
+        hardware = create_local_hardware(snapshot_provider)
+    else:
+        threading.Thread(target=_initialize_worker, daemon=True, name="WorkerInitThread").start()
+
+    app.config['HARDWARE'] = hardware
+    app.register_blueprint(api)
+    return app
+
+def _hardware():
+    return current_app.config['HARDWARE']
+
+def __getattr__(name: str):
+    """`from web_server.api import app` reste valide: application créée au premier accès"""
+    global _default_app
+    if name == 'app':
+        with _default_app_lock:
+            if _default_app is None:
+                _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_default_app = None
+_default_app_lock = threading.Lock()
 
 # ==================== ROUTES API ====================
 
-@app.route('/api/test', methods=['GET'])
+@api.route('/api/test', methods=['GET'])
 def test_api():
     """Test simple de l'API"""
     return jsonify({
         "success": True,
         "message": "API Irrigation fonctionnelle",
         "timestamp": time.time(),
+        "pid": os.getpid(),
         "components": {
-            "system": SYSTEM_READY,
+            "system": _hardware().is_ready(),
             "auth": AUTH_READY,
             "chatbot": CHATBOT_READY
         }
     })
 
-@app.route('/api/status', methods=['GET'])
+@api.route('/api/status', methods=['GET'])
 def get_status():
     """Statut complet du système"""
     try:
-        if not SYSTEM_READY:
+        hardware = _hardware()
+        if not hardware.is_ready():
             return jsonify({"success": False, "error": "Système non initialisé"}), 503
-        
-        # Obtenir le statut réseau
-        network_info = SYSTEM_COMPONENTS['network_manager'].get_network_info()
-        
-        # Obtenir les données des capteurs
-        sensor_data = SYSTEM_COMPONENTS['sensor_manager'].read_all()
-        
-        # Obtenir le statut système
-        system_status = SYSTEM_COMPONENTS['irrigation_logic'].get_system_status()
-        
-        data = {
-            "timestamp": time.time(),
-            "online": network_info.get("is_online", False),
-            "local_ip": network_info.get("local_ip", "Unknown"),
-            "sensors": sensor_data.get("sensors", {}),
-            "system": {
-                "running": True,
-                "today_irrigation": SYSTEM_COMPONENTS['db_manager'].get_today_irrigation_time(),
-                "plant": system_status.get("plant", {}),
-                "offline_mode": system_status.get("system", {}).get("offline_mode", True)
-            }
-        }
-        
-        return jsonify({"success": True, "data": data})
-        
+
+        # Sérialisé une fois par version d'instantané (JSON/MessagePack/CBOR, gzip/brotli)
+        return encoded_response(
+            lambda: {"success": True, "data": hardware.get_status()},
+            name="status",
+            version=hardware.snapshot_version()
+        )
+
     except Exception as e:
         logger.error(f"❌ Erreur statut: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/sensors', methods=['GET'])
+@api.route('/api/sensors', methods=['GET'])
 def get_sensors():
     """Données des capteurs"""
     try:
-        if not SYSTEM_READY:
+        hardware = _hardware()
+        if not hardware.is_ready():
             return jsonify({"success": False, "error": "Système non initialisé"}), 503
-        
-        sensor_data = SYSTEM_COMPONENTS['sensor_manager'].read_all()
-        
-        if sensor_data['success']:
-            return jsonify({"success": True, "sensors": sensor_data.get("sensors", {})})
-        else:
-            return jsonify({"success": False, "error": "Échec lecture capteurs"}), 500
-        
+
+        def build():
+            sensor_data = hardware.read_sensors()
+            if not sensor_data['success']:
+                # Levée avant mise en cache: un échec n'est jamais servi depuis le cache
+                raise RuntimeError("Échec lecture capteurs")
+            return {"success": True, "sensors": sensor_data.get("sensors", {})}
+
+        return encoded_response(build, name="sensors", version=hardware.snapshot_version())
+
     except Exception as e:
         logger.error(f"❌ Erreur capteurs: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/control/pump', methods=['POST'])
+@api.route('/api/sensors/raw', methods=['GET'])
+def get_raw_samples():
+    """
+    Échantillons bruts haute fréquence (fichier circulaire, lu directement par ce processus)
+    Paramètres: seconds (défaut 60) ou last (nombre d'échantillons)
+    """
+    from config.settings import config
+    from core.ring_file import RingReader
+    try:
+        reader = RingReader(config.capture.PATH)
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "Capture brute inactive (config.capture.ENABLED)"}), 404
+    except (ImportError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    
+    try:
+        last = request.args.get('last', type=int)
+        seconds = request.args.get('seconds', default=60.0, type=float)
+        since = None if last is not None else time.time() - seconds
+        columns = reader.read_columns(last=last, since=since)
+        
+        def build():
+            return {"success": True, "count": int(len(columns["ts"])), "written": reader.count,
+                    "capacity": reader.capacity,
+                    # NaN (capteur sans lecture) -> null
+                    "samples": {name: [None if v != v else v for v in values.tolist()]
+                                for name, values in columns.items()}}
+        
+        return encoded_response(build, name="raw_samples")
+    finally:
+        reader.close()
+
+@api.route('/api/control/pump', methods=['POST'])
 def control_pump():
     """Contrôle de la pompe"""
     try:
         data = request.get_json()
         action = data.get('action', '').lower()
-        
-        if not SYSTEM_READY:
+
+        hardware = _hardware()
+        if not hardware.is_ready():
             return jsonify({"success": False, "error": "Système non initialisé"}), 503
-        
-        with gpio_lock:
-            if action == 'start':
-                duration = data.get('duration', 30)
-                success, message = SYSTEM_COMPONENTS['irrigation_logic'].manual_irrigation()
-                
-                if success:
-                    return jsonify({
-                        "success": True,
-                        "message": f"Pompe démarrée pour {duration}s",
-                        "duration": duration
-                    })
-                else:
-                    return jsonify({"success": False, "error": message}), 400
-                    
-            elif action == 'stop':
-                SYSTEM_COMPONENTS['water_pump'].stop()
-                return jsonify({"success": True, "message": "Pompe arrêtée"})
-                
+
+        # Les commandes sont sérialisées dans le processus propriétaire du GPIO
+        if action == 'start':
+            duration = data.get('duration', 30)
+            success, message = hardware.manual_irrigation()
+
+            if success:
+                return jsonify({
+                    "success": True,
+                    "message": f"Pompe démarrée pour {duration}s",
+                    "duration": duration
+                })
             else:
-                return jsonify({"success": False, "error": "Action invalide. Utilisez 'start' ou 'stop'"}), 400
-                
+                return jsonify({"success": False, "error": message}), 400
+
+        elif action == 'stop':
+            hardware.stop_pump()
+            return jsonify({"success": True, "message": "Pompe arrêtée"})
+
+        else:
+            return jsonify({"success": False, "error": "Action invalide. Utilisez 'start' ou 'stop'"}), 400
+
     except Exception as e:
         logger.error(f"❌ Erreur contrôle pompe: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+# ==================== ZONES ====================
+
+@api.route('/api/zones', methods=['GET'])
+def get_zones():
+    """Zones, vannes ouvertes, file d'attente et durée restante estimée"""
+    try:
+        hardware = _hardware()
+        if not hardware.is_ready():
+            return jsonify({"success": False, "error": "Système non initialisé"}), 503
+        return jsonify({"success": True, "data": hardware.get_zone_status()})
+    except Exception as e:
+        logger.error(f"❌ Erreur statut zones: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@api.route('/api/zones/water', methods=['POST'])
+def water_zones():
+    """
+    Arrosage des zones: {"zones": [...] (toutes par défaut), "only_dry": bool, "duration": s}
+    Réponse immédiate, l'orchestrateur arrose en arrière-plan
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        zones = data.get('zones')
+        if zones is not None and (not isinstance(zones, list) or
+                                  not all(isinstance(zone, str) for zone in zones)):
+            return jsonify({"success": False, "error": "zones doit être une liste de noms"}), 400
+        duration = data.get('duration')
+        if duration is not None and (isinstance(duration, bool) or not isinstance(duration, (int, float))):
+            return jsonify({"success": False, "error": "duration doit être un nombre"}), 400
+
+        hardware = _hardware()
+        if not hardware.is_ready():
+            return jsonify({"success": False, "error": "Système non initialisé"}), 503
+
+        success, message, plan = hardware.water_zones(zones, bool(data.get('only_dry', False)), duration)
+        status = 202 if success else 400
+        return jsonify({"success": success, "message": message, "plan": plan}), status
+
+    except Exception as e:
+        logger.error(f"❌ Erreur arrosage zones: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@api.route('/api/zones/cancel', methods=['POST'])
+def cancel_zones():
+    """Annule une zone ({"zone": nom}) ou toute la file; vannes concernées fermées"""
+    try:
+        data = request.get_json(silent=True) or {}
+        hardware = _hardware()
+        if not hardware.is_ready():
+            return jsonify({"success": False, "error": "Système non initialisé"}), 503
+        cancelled = hardware.cancel_zones(data.get('zone'))
+        return jsonify({"success": True, "cancelled": cancelled})
+    except Exception as e:
+        logger.error(f"❌ Erreur annulation zones: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # ==================== AUTHENTIFICATION ====================
 
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
 def register():
     """Inscription utilisateur"""
     if not AUTH_READY:
@@ -236,7 +391,7 @@ def register():
         logger.error(f"❌ Erreur inscription: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
 def login():
     """Connexion utilisateur"""
     if not AUTH_READY:
@@ -268,7 +423,7 @@ def login():
         logger.error(f"❌ Erreur connexion: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/auth/users', methods=['GET'])
+@api.route('/api/auth/users', methods=['GET'])
 def list_users():
     """Liste des utilisateurs (admin)"""
     if not AUTH_READY:
@@ -282,7 +437,7 @@ def list_users():
 
 # ==================== CHATBOT ====================
 
-@app.route('/api/chatbot/ask', methods=['POST'])
+@api.route('/api/chatbot/ask', methods=['POST'])
 def ask_chatbot():
     """Pose une question au chatbot"""
     if not CHATBOT_READY:
@@ -296,9 +451,10 @@ def ask_chatbot():
             return jsonify({"success": False, "error": "Question requise"}), 400
         
         # Vérifier si en ligne
-        is_online = False
-        if SYSTEM_READY:
-            is_online = SYSTEM_COMPONENTS['network_manager'].is_online
+        try:
+            is_online = _hardware().is_online()
+        except Exception:
+            is_online = False
         
         # Obtenir réponse
         if is_online:
@@ -322,7 +478,7 @@ def ask_chatbot():
 
 # ==================== PLANTES ====================
 
-@app.route('/api/plants', methods=['GET'])
+@api.route('/api/plants', methods=['GET'])
 def get_plants():
     """Liste des plantes disponibles"""
     try:
@@ -347,92 +503,126 @@ def get_plants():
 
 # ==================== DIAGNOSTIC ====================
 
-@app.route('/api/diagnostic', methods=['GET'])
+@api.route('/api/diagnostic', methods=['GET'])
 def diagnostic():
     """Diagnostic système"""
+    hardware = _hardware()
     diagnostic_data = {
         "timestamp": time.time(),
         "components": {
-            "system": SYSTEM_READY,
+            "system": hardware.is_ready(),
             "auth": AUTH_READY,
             "chatbot": CHATBOT_READY
         },
+        "pid": os.getpid(),
         "endpoints": [
             {"path": "/api/test", "method": "GET", "description": "Test API"},
             {"path": "/api/status", "method": "GET", "description": "Statut système"},
             {"path": "/api/sensors", "method": "GET", "description": "Données capteurs"},
+            {"path": "/api/sensors/raw", "method": "GET", "description": "Échantillons bruts haute fréquence"},
             {"path": "/api/control/pump", "method": "POST", "description": "Contrôle pompe"},
+            {"path": "/api/zones", "method": "GET", "description": "Zones d'arrosage et file"},
+            {"path": "/api/zones/water", "method": "POST", "description": "Arrosage multi-zones"},
+            {"path": "/api/zones/cancel", "method": "POST", "description": "Annulation arrosage zones"},
             {"path": "/api/auth/login", "method": "POST", "description": "Connexion"},
             {"path": "/api/auth/register", "method": "POST", "description": "Inscription"},
             {"path": "/api/chatbot/ask", "method": "POST", "description": "Chatbot"},
-            {"path": "/api/plants", "method": "GET", "description": "Liste plantes"}
+            {"path": "/api/plants", "method": "GET", "description": "Liste plantes"},
+            {"path": "/api/history/<sensors|irrigation|alerts>", "method": "GET", "description": "Historique paginé (NDJSON)"},
+            {"path": "/api/history/sensors/series", "method": "GET", "description": "Série capteurs interpolée (graphiques)"},
+            {"path": "/api/history/sensors/rollups", "method": "GET", "description": "Agrégats horaires capteurs"},
+            {"path": "/api/alerts", "method": "GET", "description": "Alertes ouvertes"},
+            {"path": "/api/ingest", "method": "POST", "description": "Ingestion lectures multi-appareils"},
+            {"path": "/api/ingest/stats", "method": "GET", "description": "File d'ingestion"},
+            {"path": "/api/export", "method": "GET", "description": "Export historique (Parquet/npz)"},
+            {"path": "/api/summaries", "method": "GET", "description": "Résumés jour / semaine"},
+            {"path": "/api/egress", "method": "GET", "description": "Données sortantes et budget mensuel"}
         ]
     }
     
-    if SYSTEM_READY:
-        diagnostic_data["hardware"] = SYSTEM_COMPONENTS['gpio'].get_gpio_status()
+    from web_server.encoding import available_codings, available_formats, encoded_cache
+    diagnostic_data["encoding"] = {
+        "formats": available_formats(),
+        "compression": available_codings(),
+        "cache": encoded_cache.get_stats()
+    }
+    
+    # Cache des lectures SQLite (propre à ce worker)
+    diagnostic_data["query_cache"] = {
+        name: SYSTEM_COMPONENTS[name].cache.get_stats()
+        for name in ('db_manager', 'user_manager')
+        if SYSTEM_COMPONENTS.get(name) is not None
+    }
+    if SYSTEM_COMPONENTS.get('db_manager') is not None:
+        diagnostic_data["storage"] = SYSTEM_COMPONENTS['db_manager'].snapshots.get_stats()
+    
+    try:
+        if diagnostic_data["components"]["system"]:
+            diagnostic_data["hardware"] = hardware.get_gpio_status()
+        diagnostic_data["startup"] = hardware.get_startup_report()
+    except Exception as e:
+        diagnostic_data["hardware_error"] = str(e)
     
     return jsonify({"success": True, "diagnostic": diagnostic_data})
 
 # ==================== GESTION DES ERREURS ====================
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({"success": False, "error": "Endpoint non trouvé"}), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     logger.error(f"Erreur interne: {error}")
     return jsonify({"success": False, "error": "Erreur interne du serveur"}), 500
 # ==================== FIREBASE ====================
 
-@app.route('/api/firebase/status', methods=['GET'])
+@api.route('/api/egress', methods=['GET'])
+def get_egress_usage():
+    """Données sortantes du mois par destination, budget et niveau de service (tous processus)"""
+    try:
+        from core.egress import egress_budget
+        return jsonify({"success": True, "egress": egress_budget.get_usage()})
+    except Exception as e:
+        logger.error(f"❌ Erreur budget données: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@api.route('/api/firebase/status', methods=['GET'])
 def get_firebase_status():
     """Statut Firebase"""
     try:
-        from firebase.firebase_config import firebase_manager
-        from core.sync_manager import sync_manager
-        
-        firebase_status = firebase_manager.get_status()
-        sync_status = sync_manager.get_sync_status()
+        status = _hardware().get_firebase_status()
         
         return jsonify({
             "success": True,
-            "firebase": firebase_status,
-            "sync": sync_status
+            "firebase": status["firebase"],
+            "sync": status["sync"]
         })
         
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/firebase/sync', methods=['POST'])
+@api.route('/api/firebase/sync', methods=['POST'])
 def trigger_sync():
     """Déclenche une synchronisation manuelle"""
     try:
-        from core.sync_manager import sync_manager
-        
-        if not firebase_manager.connected:
-            return jsonify({"success": False, "error": "Firebase non connecté"}), 400
+        hardware = _hardware()
         
-        # Synchroniser en arrière-plan
-        import threading
-        thread = threading.Thread(
-            target=sync_manager.sync_all_data,
-            daemon=True,
-            name="ManualSyncThread"
-        )
-        thread.start()
+        # Synchronisation lancée en arrière-plan dans le processus propriétaire
+        started, message = hardware.trigger_sync()
+        if not started:
+            return jsonify({"success": False, "error": message}), 400
         
         return jsonify({
             "success": True,
-            "message": "Synchronisation démarrée en arrière-plan",
-            "sync_status": sync_manager.get_sync_status()
+            "message": message,
+            "sync_status": hardware.get_firebase_status()["sync"]
         })
         
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/firebase/test', methods=['GET'])
+@api.route('/api/firebase/test', methods=['GET'])
 def test_firebase():
     """Test la connexion Firebase"""
     try:
@@ -453,6 +643,8 @@ def test_firebase():
                 }
                 
                 firebase_manager.db.collection("system_tests").add(test_data)
+                from core.egress import egress_budget, json_size
+                egress_budget.record("firebase", json_size(test_data))
                 
                 return jsonify({
                     "success": True,
@@ -477,10 +669,295 @@ def test_firebase():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
     
+# ==================== HISTORIQUE ====================
+
+HISTORY_TABLES = {
+    'sensors': 'sensor_readings',
+    'irrigation': 'irrigation_events',
+    'alerts': 'system_alerts'
+}
+
+def _int_arg(name: str):
+    value = request.args.get(name)
+    return int(value) if value not in (None, '') else None
+
+@api.route('/api/history/<kind>', methods=['GET'])
+def get_history(kind):
+    """
+    Historique paginé et diffusé ligne par ligne (sensors, irrigation, alerts)
+    Paramètres: after_id / before_id (curseur), start, end, fields=a,b,c,
+    limit (max 1000), order=asc|desc, format=ndjson|json,
+    device (sensors: appareil, local par défaut; id = horodatage en ms)
+    Accept: application/msgpack ou application/cbor pour un flux binaire
+    """
+    db = SYSTEM_COMPONENTS.get('db_manager')
+    if db is None:
+        return jsonify({"success": False, "error": "Système non initialisé"}), 503
+    
+    table = HISTORY_TABLES.get(kind)
+    if table is None:
+        return jsonify({"success": False, "error": f"Historique inconnu: {kind}"}), 404
+    
+    import itertools
+    from core.database_manager import MAX_HISTORY_PAGE
+    
+    try:
+        fields = [f for f in request.args.get('fields', '').split(',') if f]
+        limit = min(_int_arg('limit') or 100, MAX_HISTORY_PAGE)
+        descending = request.args.get('order', 'asc').lower() == 'desc'
+        fmt = request.args.get('format', 'ndjson').lower()
+        
+        rows = db.iter_history(
+            table,
+            fields=fields or None,
+            after_id=_int_arg('after_id'),
+            before_id=_int_arg('before_id'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            limit=limit,
+            descending=descending,
+            device=request.args.get('device') if table == 'sensor_readings' else None
+        )
+        # Première ligne lue ici pour signaler les erreurs avant de diffuser
+        first = next(rows, None)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Erreur historique: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    
+    cursor_param = 'before_id' if descending else 'after_id'
+    all_rows = itertools.chain([first] if first is not None else [], rows)
+    
+    def page_info(count, last_id):
+        has_more = count >= limit and last_id is not None
+        return {"count": count, "next": {cursor_param: last_id} if has_more else None}
+    
+    state = {"count": 0, "last_id": None}
+    
+    def records():
+        for row in all_rows:
+            state["count"] += 1
+            state["last_id"] = row["id"]
+            yield row
+    
+    def trailer():
+        return {"_page": page_info(state["count"], state["last_id"])}
+    
+    def generate_json():
+        yield '{"success":true,"rows":['
+        for row in records():
+            yield ("," if state["count"] > 1 else "") + json.dumps(row, separators=(',', ':'))
+        yield '],"page":' + json.dumps(page_info(state["count"], state["last_id"]), separators=(',', ':')) + '}'
+    
+    # NDJSON par défaut; flux MessagePack/CBOR selon Accept; gzip/brotli selon Accept-Encoding
+    return stream_response(records(), trailer, json_stream=generate_json if fmt == 'json' else None)
+
+def _float_arg(name: str):
+    value = request.args.get(name)
+    return float(value) if value not in (None, '') else None
+
+@api.route('/api/history/sensors/series', methods=['GET'])
+def get_sensor_series():
+    """
+    Série régulière pour les graphiques, reconstruite depuis les lignes enregistrées sur changement
+    Paramètres: fields=a,b,c, start / end (epoch secondes, 24 h par défaut), step (secondes, 300),
+    device (local par défaut)
+    """
+    db = SYSTEM_COMPONENTS.get('db_manager')
+    if db is None:
+        return jsonify({"success": False, "error": "Système non initialisé"}), 503
+    
+    try:
+        fields = [f for f in request.args.get('fields', '').split(',') if f]
+        series = db.get_sensor_series(
+            fields=fields or None,
+            start=_float_arg('start'),
+            end=_float_arg('end'),
+            step=_float_arg('step') or 300.0,
+            device=request.args.get('device')
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Erreur série capteurs: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    
+    return encoded_response(lambda: {"success": True, "series": series})
+
+@api.route('/api/history/sensors/rollups', methods=['GET'])
+def get_sensor_rollups():
+    """
+    Agrégats horaires (min/moyenne/max) conservés après la rétention des lectures brutes
+    Paramètres: start / end (epoch secondes, 30 jours par défaut), device (local par défaut)
+    """
+    db = SYSTEM_COMPONENTS.get('db_manager')
+    if db is None:
+        return jsonify({"success": False, "error": "Système non initialisé"}), 503
+    
+    try:
+        rollups = db.get_sensor_rollups(start=_float_arg('start'), end=_float_arg('end'),
+                                        device=request.args.get('device'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Erreur agrégats capteurs: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    
+    return encoded_response(lambda: {"success": True, "rollups": rollups})
+
+@api.route('/api/summaries', methods=['GET'])
+def get_summaries():
+    """
+    Résumés calculés sur l'appareil: jours (plus récent d'abord) et semaine ISO
+    Paramètres: days (7 par défaut, 366 max), week (YYYY-MM-DD d'un jour de la semaine, en cours
+    par défaut), device (local par défaut)
+    """
+    db = SYSTEM_COMPONENTS.get('db_manager')
+    if db is None:
+        return jsonify({"success": False, "error": "Système non initialisé"}), 503
+    
+    try:
+        days = min(int(request.args.get('days', 7)), 366)
+        device = request.args.get('device')
+        daily = db.get_daily_summaries(days=days, device=device)
+        weekly = db.get_weekly_summary(day=request.args.get('week'), device=device)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Erreur résumés: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    
+    return encoded_response(lambda: {"success": True, "daily": daily, "weekly": weekly})
+
+# ==================== INGESTION MULTI-APPAREILS ====================
+
+@api.route('/api/ingest', methods=['POST'])
+def ingest_readings():
+    """
+    Lectures groupées d'autres nœuds (agrégateur): {"device": ..., "readings": [...]}
+    ou {"batches": [...]}; JSON, MessagePack ou CBOR, gzip/brotli (Content-Encoding)
+    202: acceptées (écriture groupée en arrière-plan); 429 + Retry-After: file d'écriture pleine
+    """
+    from config.settings import config
+    from core.ingest import IngestError, validate_payload
+    
+    settings = config.ingest
+    if settings.TOKEN:
+        import hmac
+        token = request.headers.get('X-Ingest-Token') or request.headers.get('Authorization', '').replace('Bearer ', '', 1)
+        if not hmac.compare_digest(token.encode(), settings.TOKEN.encode()):
+            return jsonify({"success": False, "error": "Jeton d'ingestion invalide"}), 401
+    
+    try:
+        payload = decode_request(settings.MAX_REQUEST_BYTES)
+        batches, rejected, errors = validate_payload(payload, settings.MAX_REQUEST_READINGS,
+                                                     settings.MAX_CLOCK_SKEW)
+    except RequestTooLarge as e:
+        return jsonify({"success": False, "error": str(e)}), 413
+    except IngestError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    accepted = sum(len(rows) for rows in batches.values())
+    try:
+        queued, retry_after = _hardware().ingest(batches)
+    except Exception as e:
+        logger.error(f"❌ Erreur ingestion: {e}")
+        return jsonify({"success": False, "error": str(e)}), 503
+    
+    if not queued:
+        response = jsonify({"success": False, "error": "File d'écriture pleine", "retry_after": retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(int(retry_after))
+        return response
+    
+    return jsonify({"success": True, "accepted": accepted, "rejected": rejected, "errors": errors}), 202
+
+@api.route('/api/ingest/stats', methods=['GET'])
+def ingest_stats():
+    """File d'écriture de l'agrégateur (débit, lignes en attente, refus)"""
+    try:
+        return jsonify({"success": True, "ingest": _hardware().get_ingest_stats()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ==================== ALERTES ====================
+
+@api.route('/api/alerts', methods=['GET'])
+def get_open_alerts():
+    """Alertes ouvertes (dédupliquées), filtres optionnels type et sensor"""
+    db = SYSTEM_COMPONENTS.get('db_manager')
+    if db is None:
+        return jsonify({"success": False, "error": "Système non initialisé"}), 503
+    
+    try:
+        alerts = db.get_open_alerts(request.args.get('type'), request.args.get('sensor'))
+        return jsonify({"success": True, "count": len(alerts), "alerts": alerts})
+    except Exception as e:
+        logger.error(f"❌ Erreur alertes: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ==================== EXPORT ====================
+
+@api.route('/api/export', methods=['GET'])
+def export_history():
+    """
+    Export colonne de l'historique (Parquet ou .npz), partitionné par jour
+    Paramètres: table (sensor_readings|irrigation_events, toutes par défaut), start, end, format
+    """
+    db = SYSTEM_COMPONENTS.get('db_manager')
+    if db is None:
+        return jsonify({"success": False, "error": "Système non initialisé"}), 503
+    
+    import shutil
+    import tempfile
+    from flask import send_file
+    from core.database_manager import EXPORT_SCHEMAS
+    
+    tables = request.args.getlist('table') or list(EXPORT_SCHEMAS.keys())
+    unknown = [t for t in tables if t not in EXPORT_SCHEMAS]
+    if unknown:
+        return jsonify({"success": False, "error": f"Tables inconnues: {unknown}"}), 400
+    
+    fmt = request.args.get('format', 'auto')
+    if fmt not in ('auto', 'parquet', 'npz'):
+        return jsonify({"success": False, "error": "Format invalide (auto, parquet, npz)"}), 400
+    
+    work_dir = tempfile.mkdtemp(prefix="irrigation_export_")
+    try:
+        archive_path = f"{work_dir}.zip"
+        result = db.export_archive(
+            archive_path, work_dir,
+            tables=tables,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            fmt=fmt
+        )
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logger.error(f"❌ Erreur export: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    
+    # Le fichier reste lisible via le descripteur ouvert après suppression:
+    # il est envoyé par blocs depuis le disque, sans copie en mémoire
+    archive = open(archive_path, "rb")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.remove(archive_path)
+    
+    response = send_file(
+        archive,
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name=f"irrigation_export_{result['format']}_{int(time.time())}.zip"
+    )
+    return response
+
 # ==================== DÉMARRAGE ====================
 
-def run_server(host='0.0.0.0', port=5000, debug=False):
-    """Démarre le serveur"""
+def run_server(host='0.0.0.0', port=5000, debug=False, mode=None):
+    """Démarre le serveur (mode: dev, waitress, gunicorn, auto - voir web_server/serve.py)"""
     print(f"\n{'='*60}")
     print("🌐 SERVEUR IRRIGATION INTELLIGENT")
     print(f"{'='*60}")
@@ -502,7 +979,8 @@ def run_server(host='0.0.0.0', port=5000, debug=False):
     
     print(f"{'='*60}\n")
     
-    app.run(host=host, port=port, debug=debug, threaded=True, use_reloader=False)
+    from web_server.serve import serve
+    serve(host=host, port=port, mode='dev' if debug else mode, debug=debug)
 
 if __name__ == '__main__':
     run_server(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
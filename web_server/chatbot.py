@@ -27,9 +27,9 @@ class EnhancedChatBot:
                 config.api.OPENWEATHER_API_KEY == "your_api_key_here"):
                 return False
             
-            # Essayer d'importer Gemini
-            import google.generativeai as genai
-            return True
+            # Vérifier la présence de Gemini sans l'importer (import lourd)
+            import importlib.util
+            return importlib.util.find_spec("google.generativeai") is not None
         except ImportError:
             return False
         except Exception as e:
@@ -229,6 +229,11 @@ class EnhancedChatBot:
         if not self.gemini_available:
             return self.ask_offline(question, user_id)
         
+        # Liaison facturée, budget de données atteint: réponse locale
+        from core.egress import egress_budget
+        if not egress_budget.allow("gemini", "interactive"):
+            return self.ask_offline(question, user_id)
+        
         try:
             import google.generativeai as genai
             
@@ -253,7 +258,10 @@ class EnhancedChatBot:
             model = genai.GenerativeModel('gemini-pro')
             
             # Générer la réponse
-            response = model.generate_content(context.format(question=question))
+            prompt = context.format(question=question)
+            response = model.generate_content(prompt)
+            egress_budget.record("gemini", len(prompt.encode("utf-8")),
+                                 len((response.text or "").encode("utf-8")))
             
             if response.text:
                 # Ajouter à l'historique
@@ -0,0 +1,339 @@
+"""
+Encodage négocié des réponses de l'API
+- Format choisi via `Accept`: JSON (défaut), MessagePack ou CBOR (si installés)
+- Compression choisie via `Accept-Encoding`: brotli (si installé) ou gzip
+- Cache des réponses encodées par version d'instantané (une sérialisation par cycle)
+- Corps de requête décodés de la même façon (Content-Type / Content-Encoding)
+"""
+import json
+import zlib
+import gzip
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+# Pas de compression en dessous de cette taille (l'en-tête gzip coûterait plus qu'il ne gagne)
+MIN_COMPRESS_SIZE = 512
+
+# Type MIME -> format
+MEDIA_TYPES = {
+    "application/json": "json",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/cbor": "cbor",
+}
+
+# Format -> (type MIME unique, type MIME flux)
+CONTENT_TYPES = {
+    "json": ("application/json", "application/x-ndjson"),
+    "msgpack": ("application/msgpack", "application/msgpack"),
+    "cbor": ("application/cbor", "application/cbor-seq"),
+}
+
+
+def _load_msgpack():
+    try:
+        import msgpack
+        return msgpack
+    except ImportError:
+        return None
+
+
+def _load_cbor():
+    try:
+        import cbor2
+        return cbor2
+    except ImportError:
+        return None
+
+
+def _load_brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+_msgpack = _load_msgpack()
+_cbor = _load_cbor()
+_brotli = _load_brotli()
+
+if _msgpack is None and _cbor is None:
+    logger.debug("ℹ️ msgpack/cbor2 non installés: réponses en JSON uniquement")
+
+
+def available_formats() -> List[str]:
+    formats = ["json"]
+    if _msgpack is not None:
+        formats.append("msgpack")
+    if _cbor is not None:
+        formats.append("cbor")
+    return formats
+
+
+def available_codings() -> List[str]:
+    return (["br"] if _brotli is not None else []) + ["gzip"]
+
+
+def _parse_header(value: Optional[str]) -> List[Tuple[str, float]]:
+    """Liste (valeur, q) triée par préférence décroissante, q=0 exclus"""
+    items = []
+    for position, part in enumerate((value or "").split(",")):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            items.append((token.lower(), q, position))
+    items.sort(key=lambda item: (-item[1], item[2]))
+    return [(token, q) for token, q, _ in items]
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Format de sérialisation demandé (JSON si rien de compatible)"""
+    for media_type, _ in _parse_header(accept):
+        fmt = MEDIA_TYPES.get(media_type)
+        if fmt and fmt in available_formats():
+            return fmt
+    return "json"
+
+
+def negotiate_coding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Compression demandée: brotli de préférence à q égal, sinon gzip"""
+    offered = dict(_parse_header(accept_encoding))
+    best, best_q = None, 0.0
+    for coding in available_codings():
+        q = offered.get(coding, offered.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def serialize(payload: Any, fmt: str) -> bytes:
+    if fmt == "msgpack":
+        return _msgpack.packb(payload, use_bin_type=True)
+    if fmt == "cbor":
+        return _cbor.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def deserialize(data: bytes, fmt: str) -> Any:
+    if fmt == "msgpack":
+        return _msgpack.unpackb(data, raw=False)
+    if fmt == "cbor":
+        return _cbor.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+class RequestTooLarge(ValueError):
+    """Corps de requête décompressé au-delà de la limite"""
+
+
+def _decompress(data: bytes, coding: str, max_bytes: int) -> bytes:
+    """Décompression bornée: gzip s'arrête à la limite, brotli est vérifié après coup"""
+    if coding in ("", "identity"):
+        result = data
+    elif coding in ("gzip", "x-gzip", "deflate"):
+        decompressor = zlib.decompressobj(47)  # 47: gzip ou zlib, détection automatique
+        result = decompressor.decompress(data, max_bytes + 1)
+    elif coding == "br" and _brotli is not None:
+        decompressor = _brotli.Decompressor()
+        result = decompressor.process(data)
+    else:
+        raise ValueError(f"Content-Encoding non supporté: {coding} ({', '.join(available_codings())})")
+
+    if len(result) > max_bytes:
+        raise RequestTooLarge(f"Corps trop volumineux (> {max_bytes} octets décompressés)")
+    return result
+
+
+def decode_request(max_bytes: int = 8 * 1024 * 1024) -> Any:
+    """
+    Corps de la requête courante, décompressé puis désérialisé
+    Content-Encoding: gzip, br (si installé); Content-Type: JSON, MessagePack, CBOR
+    Lève ValueError (corps invalide) ou RequestTooLarge
+    """
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise RequestTooLarge(f"Corps trop volumineux (> {max_bytes} octets)")
+
+    coding = (request.headers.get("Content-Encoding") or "identity").strip().lower()
+    data = _decompress(request.get_data(cache=False), coding, max_bytes)
+
+    fmt = MEDIA_TYPES.get((request.mimetype or "application/json").lower(), "json")
+    if fmt not in available_formats():
+        raise ValueError(f"Content-Type non supporté: {request.mimetype}")
+    try:
+        return deserialize(data, fmt)
+    except Exception as e:
+        raise ValueError(f"Corps {fmt} invalide: {e}")
+
+
+def compress(data: bytes, coding: Optional[str]) -> bytes:
+    if coding == "br":
+        return _brotli.compress(data, quality=5)
+    if coding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+class EncodedCache:
+    """Cache LRU des réponses encodées, clé (nom, version, format, compression)"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[bytes, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, value: Tuple[bytes, Optional[str]]):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+# Instance globale
+encoded_cache = EncodedCache()
+
+
+def _encode(payload: Any, fmt: str, coding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    body = serialize(payload, fmt)
+    if coding and len(body) >= MIN_COMPRESS_SIZE:
+        return compress(body, coding), coding
+    return body, None
+
+
+def encoded_response(build: Callable[[], Any], name: Optional[str] = None,
+                     version: Any = None, status: int = 200) -> Response:
+    """
+    Réponse encodée selon les en-têtes de la requête
+    build: construit le contenu (appelé seulement si absent du cache)
+    name/version: clé de cache; version=None désactive le cache (pas d'instantané)
+    """
+    fmt = negotiate_format(request.headers.get("Accept"))
+    coding = negotiate_coding(request.headers.get("Accept-Encoding"))
+
+    if name is not None and version is not None:
+        etag = f'"{name}-{version}-{fmt}-{coding or "identity"}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = Response(status=304)
+            response.headers["ETag"] = etag
+            response.vary.update(("Accept", "Accept-Encoding"))
+            return response
+
+        key = (name, version, fmt, coding)
+        entry = encoded_cache.get(key)
+        if entry is None:
+            entry = _encode(build(), fmt, coding)
+            encoded_cache.put(key, entry)
+    else:
+        etag = None
+        entry = _encode(build(), fmt, coding)
+
+    body, applied = entry
+    response = Response(body, status=status, content_type=CONTENT_TYPES[fmt][0])
+    if applied:
+        response.headers["Content-Encoding"] = applied
+    if etag:
+        response.headers["ETag"] = etag
+    response.vary.update(("Accept", "Accept-Encoding"))
+    return response
+
+
+class _StreamCompressor:
+    """Compression incrémentale d'un flux (gzip ou brotli)"""
+
+    def __init__(self, coding: str):
+        self.coding = coding
+        if coding == "br":
+            self._compressor = _brotli.Compressor(quality=5)
+        else:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: en-tête gzip
+
+    def process(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.coding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def stream_response(records: Iterable[Any], trailer: Callable[[], Any],
+                    json_stream: Optional[Callable[[], Iterator[str]]] = None) -> Response:
+    """
+    Flux d'enregistrements encodé selon les en-têtes
+    - JSON: NDJSON (ou json_stream si fourni, pour format=json)
+    - MessagePack / CBOR: objets concaténés (flux msgpack / CBOR sequence)
+    trailer: dernier objet du flux (pagination), appelé après les enregistrements
+    """
+    fmt = negotiate_format(request.headers.get("Accept"))
+    coding = negotiate_coding(request.headers.get("Accept-Encoding"))
+
+    if fmt == "json" and json_stream is not None:
+        content_type = CONTENT_TYPES["json"][0]
+
+        def chunks():
+            for text in json_stream():
+                yield text.encode("utf-8")
+    else:
+        content_type = CONTENT_TYPES[fmt][1]
+
+        def chunks():
+            for record in records:
+                yield serialize(record, fmt) + (b"\n" if fmt == "json" else b"")
+            yield serialize(trailer(), fmt) + (b"\n" if fmt == "json" else b"")
+
+    if coding:
+        def body():
+            compressor = _StreamCompressor(coding)
+            for chunk in chunks():
+                data = compressor.process(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+    else:
+        body = chunks
+
+    response = Response(body(), content_type=content_type)
+    if coding:
+        response.headers["Content-Encoding"] = coding
+    response.vary.update(("Accept", "Accept-Encoding"))
+    return response
@@ -0,0 +1,292 @@
+"""
+Accès au hardware pour l'API
+- LocalHardware: appels directs aux singletons (processus propriétaire du GPIO)
+- HardwareServer / HardwareClient: même interface via IPC local (socket Unix authentifiée)
+  pour les workers gunicorn, qui n'ouvrent jamais le GPIO eux-mêmes
+"""
+import os
+import time
+import logging
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Méthodes exposées aux workers (liste blanche)
+HARDWARE_METHODS: Tuple[str, ...] = (
+    "is_ready",
+    "is_online",
+    "snapshot_version",
+    "read_sensors",
+    "get_status",
+    "manual_irrigation",
+    "stop_pump",
+    "water_zones",
+    "cancel_zones",
+    "get_zone_status",
+    "get_gpio_status",
+    "get_startup_report",
+    "get_firebase_status",
+    "trigger_sync",
+    "ingest",
+    "get_ingest_stats",
+)
+
+ENV_SOCKET = "IRRIGATION_HW_SOCKET"
+ENV_AUTHKEY = "IRRIGATION_HW_KEY"
+
+
+class LocalHardware:
+    """Accès direct aux composants (même processus)"""
+
+    def __init__(self, components: Dict[str, Any], ready: Callable[[], bool],
+                 snapshot_provider: Optional[Callable[[], Optional[Dict[str, Any]]]] = None):
+        self.components = components
+        self._ready = ready
+        # Dernière lecture du cycle (main.py): évite une lecture GPIO par requête
+        self._snapshot_provider = snapshot_provider
+        self._pump_lock = threading.Lock()
+
+        # Version de l'instantané: change à chaque nouveau cycle ou commande pompe
+        self._boot = int(time.time())
+        self._version = 0
+        self._last_snapshot = None
+        self._version_lock = threading.Lock()
+
+    def is_ready(self) -> bool:
+        return bool(self._ready())
+
+    def is_online(self) -> bool:
+        if not self.is_ready():
+            return False
+        return self.components['network_manager'].is_online
+
+    def snapshot_version(self) -> Optional[str]:
+        """Version des données servies (None: pas d'instantané, lecture directe à chaque requête)"""
+        if self._snapshot_provider is None:
+            return None
+        snapshot = self._snapshot_provider()
+        if not snapshot:
+            return None
+        with self._version_lock:
+            if snapshot is not self._last_snapshot:
+                self._last_snapshot = snapshot
+                self._version += 1
+            return f"{self._boot}.{self._version}"
+
+    def _bump_version(self):
+        with self._version_lock:
+            self._version += 1
+
+    def read_sensors(self) -> Dict[str, Any]:
+        """Lecture capteurs: instantané du cycle si disponible, sinon lecture directe"""
+        if self._snapshot_provider is not None:
+            snapshot = self._snapshot_provider()
+            if snapshot:
+                return snapshot
+        return self.components['sensor_manager'].read_all()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Statut complet du système (construit en une seule fois)"""
+        network_info = self.components['network_manager'].get_network_info()
+        sensor_data = self.read_sensors()
+        system_status = self.components['irrigation_logic'].get_system_status()
+
+        return {
+            "timestamp": time.time(),
+            "online": network_info.get("is_online", False),
+            "local_ip": network_info.get("local_ip", "Unknown"),
+            "sensors": sensor_data.get("sensors", {}),
+            "system": {
+                "running": True,
+                "today_irrigation": self.components['db_manager'].get_today_irrigation_time(),
+                "plant": system_status.get("plant", {}),
+                "offline_mode": system_status.get("system", {}).get("offline_mode", True)
+            }
+        }
+
+    def manual_irrigation(self) -> Tuple[bool, str]:
+        with self._pump_lock:
+            try:
+                return self.components['irrigation_logic'].manual_irrigation()
+            finally:
+                self._bump_version()
+
+    def stop_pump(self) -> bool:
+        from decision_engine.zones import zone_orchestrator
+        try:
+            # Arrêt d'urgence: la file des zones est vidée aussi (sinon la pompe redémarre)
+            zone_orchestrator.cancel()
+            return self.components['water_pump'].stop()
+        finally:
+            self._bump_version()
+
+    def water_zones(self, zones: Optional[list] = None, only_dry: bool = False,
+                    duration: Optional[float] = None) -> Tuple[bool, str, Dict[str, Any]]:
+        with self._pump_lock:
+            try:
+                return self.components['irrigation_logic'].water_garden(zones, only_dry, duration)
+            finally:
+                self._bump_version()
+
+    def cancel_zones(self, zone: Optional[str] = None) -> int:
+        from decision_engine.zones import zone_orchestrator
+        try:
+            return zone_orchestrator.cancel(zone)
+        finally:
+            self._bump_version()
+
+    def get_zone_status(self) -> Dict[str, Any]:
+        from decision_engine.zones import zone_orchestrator
+        return zone_orchestrator.get_status()
+
+    def get_gpio_status(self) -> Dict[str, Any]:
+        return self.components['gpio'].get_gpio_status()
+
+    def get_startup_report(self) -> Dict[str, Any]:
+        from core.startup import startup_manager
+        return startup_manager.get_report()
+
+    def get_firebase_status(self) -> Dict[str, Any]:
+        from firebase.firebase_config import firebase_manager
+        from core.sync_manager import sync_manager
+        return {"firebase": firebase_manager.get_status(), "sync": sync_manager.get_sync_status()}
+
+    def trigger_sync(self) -> Tuple[bool, str]:
+        from firebase.firebase_config import firebase_manager
+        from core.sync_manager import sync_manager
+
+        if not firebase_manager.connected:
+            return False, "Firebase non connecté"
+
+        return sync_manager.request_sync()
+
+
+    def ingest(self, batches: Dict[str, Any]) -> Tuple[bool, float]:
+        """Lectures d'autres appareils (validées par le worker), écrites par l'écrivain unique"""
+        from core.ingest import ingest_writer
+        return ingest_writer.submit(batches)
+
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        from core.ingest import ingest_writer
+        return ingest_writer.get_stats()
+
+
+class HardwareServer:
+    """Serveur IPC du processus propriétaire: exécute les appels des workers"""
+
+    def __init__(self, hardware: LocalHardware, address: str, authkey: bytes):
+        self.hardware = hardware
+        self.address = address
+        self.authkey = authkey
+        self._listener: Optional[Listener] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self) -> 'HardwareServer':
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True, name="HardwareIPC")
+        self._thread.start()
+        logger.info(f"🔌 Serveur IPC hardware: {self.address}")
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
+        if os.path.exists(self.address):
+            try:
+                os.remove(self.address)
+            except OSError:
+                pass
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._running:
+                    logger.warning(f"⚠️ Connexion IPC refusée: {e}")
+                continue
+
+            threading.Thread(target=self._serve, args=(conn,), daemon=True,
+                             name="HardwareIPCConn").start()
+
+    def _serve(self, conn):
+        with conn:
+            while self._running:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                if method not in HARDWARE_METHODS:
+                    conn.send((False, f"Méthode non autorisée: {method}"))
+                    continue
+
+                try:
+                    conn.send((True, getattr(self.hardware, method)(*args, **kwargs)))
+                except Exception as e:
+                    logger.error(f"❌ Erreur IPC {method}: {e}")
+                    conn.send((False, str(e)))
+
+
+class HardwareClient:
+    """Client IPC utilisé par les workers: même interface que LocalHardware"""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> 'HardwareClient':
+        address = os.environ.get(ENV_SOCKET)
+        authkey = os.environ.get(ENV_AUTHKEY)
+        if not address or not authkey:
+            raise RuntimeError(f"{ENV_SOCKET}/{ENV_AUTHKEY} non définis (lancer via le mode production)")
+        return cls(address, authkey.encode())
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        # Une reconnexion si le propriétaire a redémarré
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send((method, args, kwargs))
+                ok, result = conn.recv()
+                break
+            except (EOFError, OSError, ConnectionError):
+                self._local.conn = None
+                if attempt:
+                    raise
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def is_ready(self) -> bool:
+        try:
+            return bool(self._call("is_ready"))
+        except Exception:
+            return False
+
+    def __getattr__(self, item: str) -> Any:
+        if item in HARDWARE_METHODS:
+            return lambda *args, **kwargs: self._call(item, *args, **kwargs)
+        raise AttributeError(item)
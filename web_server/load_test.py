@@ -0,0 +1,177 @@
+"""
+Test de charge de l'API (stdlib uniquement)
+Connexions HTTP/1.1 keep-alive concurrentes, débit et latences p50/p90/p99 par endpoint
+
+Usage:
+    python -m web_server.load_test --url http://127.0.0.1:5000 \
+        --endpoints /api/status,/api/sensors,/api/test --concurrency 32 --duration 20
+"""
+import time
+import asyncio
+import argparse
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_ENDPOINTS = ("/api/test", "/api/status", "/api/sensors")
+
+
+@dataclass
+class EndpointStats:
+    """Mesures d'un endpoint"""
+    path: str
+    latencies: List[float] = field(default_factory=list)
+    status_codes: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    bytes_received: int = 0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def summary(self, elapsed: float) -> Dict[str, object]:
+        count = len(self.latencies)
+        return {
+            "path": self.path,
+            "requests": count,
+            "errors": self.errors,
+            "rps": round(count / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p90_ms": round(self.percentile(90) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "max_ms": round(max(self.latencies) * 1000, 2) if count else 0.0,
+            "status": dict(sorted(self.status_codes.items())),
+            "kb": round(self.bytes_received / 1024, 1)
+        }
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, int, bool]:
+    """Lit une réponse complète: (code, taille du corps, connexion conservée)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connexion fermée")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    size = 0
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            chunk_size = int((await reader.readline()).split(b";")[0], 16)
+            if chunk_size == 0:
+                await reader.readline()
+                break
+            size += len(await reader.readexactly(chunk_size))
+            await reader.readline()
+    elif "content-length" in headers:
+        size = len(await reader.readexactly(int(headers["content-length"])))
+    else:
+        size = len(await reader.read())
+        return status, size, False
+
+    keep_alive = headers.get("connection", "").lower() != "close"
+    return status, size, keep_alive
+
+
+async def _worker(host: str, port: int, paths, stats: Dict[str, EndpointStats], deadline: float):
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+
+    while time.perf_counter() < deadline:
+        path = next(paths)
+        entry = stats[path]
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+
+            request = (f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                       f"Connection: keep-alive\r\nAccept: */*\r\n\r\n").encode()
+            t0 = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, size, keep_alive = await _read_response(reader)
+            entry.latencies.append(time.perf_counter() - t0)
+            entry.status_codes[status] = entry.status_codes.get(status, 0) + 1
+            entry.bytes_received += size
+
+            if not keep_alive:
+                writer.close()
+                writer = None
+
+        except (OSError, ConnectionError, ValueError, IndexError, asyncio.IncompleteReadError):
+            entry.errors += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+            await asyncio.sleep(0.05)
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_load_test(url: str, endpoints=DEFAULT_ENDPOINTS, concurrency: int = 16,
+                        duration: float = 10.0) -> Dict[str, object]:
+    """Lance le test et retourne les résultats par endpoint"""
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    stats = {path: EndpointStats(path) for path in endpoints}
+    # Répartition circulaire des endpoints sur toutes les connexions
+    paths = itertools.cycle(endpoints)
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_worker(host, port, paths, stats, deadline) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(s.latencies) for s in stats.values())
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration": round(elapsed, 2),
+        "total_requests": total,
+        "total_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "endpoints": [s.summary(elapsed) for s in stats.values()]
+    }
+
+
+def format_results(results: Dict[str, object]) -> str:
+    lines = [
+        f"🎯 {results['url']} | {results['concurrency']} connexions | {results['duration']}s",
+        f"📈 {results['total_requests']} requêtes | {results['total_rps']} req/s",
+        f"{'endpoint':<28}{'req':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  status"
+    ]
+    for e in results["endpoints"]:
+        lines.append(
+            f"{e['path']:<28}{e['requests']:>8}{e['errors']:>6}{e['rps']:>9}"
+            f"{e['p50_ms']:>9}{e['p90_ms']:>9}{e['p99_ms']:>9}{e['max_ms']:>9}  {e['status']}"
+        )
+    lines.append("(latences en ms)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API irrigation")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help="chemins séparés par des virgules")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    endpoints = tuple(p.strip() for p in args.endpoints.split(",") if p.strip())
+    results = asyncio.run(run_load_test(args.url, endpoints, args.concurrency, args.duration))
+    print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Modes de service de l'API
+- dev: serveur Flask intégré (threaded), tout dans un seul processus
+- waitress: serveur WSGI multi-threads, tout dans un seul processus
+- gunicorn: N workers gthread; le GPIO reste dans ce processus (propriétaire)
+  et les workers passent par l'IPC local (web_server/hardware_ipc.py)
+- auto: gunicorn si installé, sinon waitress, sinon dev
+"""
+import os
+import sys
+import signal
+import logging
+import secrets
+import subprocess
+import importlib.util
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import config
+from web_server.hardware_ipc import ENV_AUTHKEY, ENV_SOCKET, HardwareServer
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_MODES = ('auto', 'dev', 'waitress', 'gunicorn')
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve_mode(mode: Optional[str] = None) -> str:
+    """Choisit le mode effectif selon la configuration et les paquets installés"""
+    mode = (mode or config.api.SERVER_MODE).lower()
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Mode serveur inconnu: {mode} ({', '.join(SERVER_MODES)})")
+
+    if mode == 'auto':
+        if _available('gunicorn'):
+            return 'gunicorn'
+        return 'waitress' if _available('waitress') else 'dev'
+
+    if mode != 'dev' and not _available(mode):
+        logger.warning(f"⚠️ {mode} non installé, repli sur le serveur Flask intégré")
+        return 'dev'
+    return mode
+
+
+def serve(host: str = None, port: int = None, mode: Optional[str] = None,
+          workers: Optional[int] = None, threads: Optional[int] = None,
+          snapshot_provider: Optional[Callable[[], Optional[Dict[str, Any]]]] = None,
+          debug: bool = False):
+    """Sert l'API (bloquant) dans le mode demandé"""
+    from web_server.api import create_app, create_local_hardware
+
+    host = host or config.api.SERVER_HOST
+    port = port or config.api.SERVER_PORT
+    workers = workers or config.api.SERVER_WORKERS
+    threads = threads or config.api.SERVER_THREADS
+    mode = resolve_mode(mode)
+
+    logger.info(f"🌐 Serveur API: mode {mode} sur {host}:{port}")
+
+    if mode == 'gunicorn':
+        hardware = create_local_hardware(snapshot_provider)
+        _serve_gunicorn(hardware, host, port, workers, threads)
+
+    elif mode == 'waitress':
+        from waitress import serve as waitress_serve
+        app = create_app(snapshot_provider=snapshot_provider)
+        waitress_serve(app, host=host, port=port, threads=threads)
+
+    else:
+        app = create_app(snapshot_provider=snapshot_provider)
+        # Désactiver le reloader pour éviter les problèmes de threads
+        app.run(host=host, port=port, debug=debug, threaded=True, use_reloader=False)
+
+
+def _serve_gunicorn(hardware, host: str, port: int, workers: int, threads: int):
+    """Lance gunicorn en sous-processus; ce processus garde le GPIO et répond à l'IPC"""
+    authkey = secrets.token_hex(32)
+    server = HardwareServer(hardware, config.api.HARDWARE_SOCKET, authkey.encode()).start()
+
+    env = dict(os.environ)
+    env[ENV_SOCKET] = config.api.HARDWARE_SOCKET
+    env[ENV_AUTHKEY] = authkey
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get('PYTHONPATH')]))
+
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--bind', f"{host}:{port}",
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--worker-class', 'gthread',
+        '--timeout', '120',
+        'web_server.wsgi:app'
+    ]
+    logger.info(f"🚀 gunicorn: {workers} workers x {threads} threads")
+
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+    try:
+        process.wait()
+    except KeyboardInterrupt:
+        # gunicorn reçoit aussi le Ctrl+C: attendre son arrêt propre
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+        raise
+    finally:
+        if process.poll() is None:
+            process.kill()
+        server.stop()
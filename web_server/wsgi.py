@@ -0,0 +1,8 @@
+"""
+Point d'entrée WSGI des workers de production (lancé par web_server/serve.py)
+Le GPIO n'est jamais ouvert ici: le hardware passe par l'IPC du processus propriétaire
+"""
+from web_server.api import create_app
+from web_server.hardware_ipc import HardwareClient
+
+app = create_app(hardware=HardwareClient.from_env())